@@ -1,22 +1,147 @@
-import fastf1.events
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context, url_for
+import asyncio
 import os
+import sys
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
-import traceback
-import numpy as np
-import fastf1
-from fastf1.ergast import Ergast
-import csv
+from datetime import datetime, timedelta, timezone
+import logging
+import click
+import championship
+import fastf1_cache
+import http_cache
+import lap_analytics
+import observability
+import threading
+import time
+from circuits import CircuitRegistry
+from compression import ResponseCompressor
+from concurrent.futures import ThreadPoolExecutor
+from incremental_store import FeedSpec, IncrementalStore
+from json_encoding import json_response
+from live_feed import LiveFeedFull, LiveFeedHub
+from position_state import PositionState
+import openf1_client
+import season_archive
+import session_store
+import shared_cache
+import telemetry
+import upstream_guard
+from session_catalogue import SessionCatalogue
+from static_assets import AssetManifest, build as build_static_assets
+from standings import CurrentRound, RoundUnavailable, StandingsService
+from warmup import WarmupScheduler, parse_date
+
+observability.configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Ako prvé, aby meraný čas zahŕňal aj ostatné after_request (kompresia)
+observability.instrument(app)
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-SEASON = 0
-ROUND = 0
+# Katalóg sessions z /v1/sessions, zdieľaný všetkými requestami v rámci workera
+session_catalogue = SessionCatalogue(
+    lambda: openf1_client.get_json("sessions"),
+    ttl=float(os.environ.get("SESSION_CATALOGUE_TTL", 120)),
+)
+
+# Inkrementálne buffre live endpointov - z OpenF1 sa sťahuje len to, čo pribudlo od kurzora
+live_store = IncrementalStore(
+    lambda endpoint, session_key, filters: openf1_client.get_json(endpoint, {"session_key": session_key}, filters=filters),
+    {
+        "team_radio": FeedSpec("date", ("driver_number", "date"), transform=lambda key, rows: enrich_radio_messages(key, rows)),
+        "race_control": FeedSpec("date", ("date", "category", "message", "driver_number"),
+                                 transform=lambda key, rows: format_race_control_events(key, rows)),
+        # Kolo bez lap_duration ešte prebieha - pýtame sa naň znova, kým ho OpenF1 nedoplní
+        "laps": FeedSpec("date_start", ("driver_number", "lap_number"), is_open=lambda lap: lap.get("lap_duration") is None),
+        "position": FeedSpec("date", ("driver_number", "date")),
+    },
+    min_interval=float(os.environ.get("LIVE_MIN_REFRESH", 2)),
+)
+
+# Aktuálne poradie a história pozícií pre každú sledovanú session
+position_states = {}
+position_states_lock = threading.Lock()
+
+# Metadáta a obrázky okruhov - načítané raz, pri zmene súborov sa znovu načítajú na pozadí
+circuit_registry = CircuitRegistry(
+    os.path.join(app.root_path, DATA_DIR, "circuits"),
+    os.path.join(app.static_folder, "circuits"),
+    reload_interval=float(os.environ.get("CIRCUITS_RELOAD_INTERVAL", 10)),
+)
+
+# Odtlačkované (fingerprinted) statické súbory z `flask build-static` a kompresia JSON odpovedí
+asset_manifest = AssetManifest(app.static_folder)
+response_compressor = ResponseCompressor()
+
+
+@app.template_global()
+def asset_url(path):
+    """URL of a static file: the immutable fingerprinted copy when built, else /static/<path>."""
+    return asset_manifest.url(path) or url_for("static", filename=path)
+
+
+@app.template_global()
+def thumbnail(path):
+    """(URL, width) of the downsized thumbnail of a static image, or None when not built."""
+    return asset_manifest.thumbnail(path)
+
+
+@app.after_request
+def compress_response(response):
+    return response_compressor(response, request)
+
+
+@app.before_request
+def collect_stale_upstream():
+    # Zoznam (nie hodnota), aby doň zapisovali aj vlákna z asyncio.to_thread (pracujú s kópiou kontextu)
+    upstream_guard.stale_marks.set([])
+
+
+@app.after_request
+def mark_stale_upstream(response):
+    """Flags responses built from stored OpenF1 data because OpenF1 failed or throttled."""
+    marks = upstream_guard.stale_marks.get()
+    if marks:
+        response.headers["X-Upstream-Stale"] = str(int(max(marks)))
+    return response
+
+
+@app.route("/assets/<path:filename>")
+def assets(filename):
+    return asset_manifest.send(filename)
+
+
+# Datasety sessions zdieľané všetkými workermi (súbory v DATA_DIR, SQLite alebo Redis)
+dataset_store = session_store.DatasetStore(
+    shared_cache.from_url(os.environ.get("CACHE_BACKEND", f"file://{DATA_DIR}")),
+    lock_ttl=float(os.environ.get("CACHE_LOCK_TTL", 120)),
+    lock_timeout=float(os.environ.get("CACHE_LOCK_TIMEOUT", 60)),
+)
+
+# Archív skončených sessions v jednej SQLite databáze pre dotazy naprieč sessions (ARCHIVE_PATH="" ho vypne)
+ARCHIVE_PATH = os.environ.get("ARCHIVE_PATH", os.path.join(DATA_DIR, "archive.db"))
+ARCHIVE_QUERY_LIMIT = int(os.environ.get("ARCHIVE_QUERY_LIMIT", 2000))
+archive = season_archive.SeasonArchive(ARCHIVE_PATH) if ARCHIVE_PATH else None
+
+# Rozparsované datasety sessions v pamäti workera (LRU obmedzená veľkosťou v bajtoch)
+frame_cache = session_store.SessionFrameCache(
+    max_bytes=int(os.environ.get("FRAME_CACHE_MB", 256)) * 1024 * 1024,
+)
+
+# Telemetria (car_data, location) jazdcov: sťahovanie po časových oknách a LRU v pamäti workera
+TELEMETRY_CHUNK = timedelta(minutes=float(os.environ.get("TELEMETRY_CHUNK_MINUTES", 15)))
+TELEMETRY_WORKERS = int(os.environ.get("TELEMETRY_WORKERS", 4))
+telemetry_cache = session_store.SessionFrameCache(
+    max_bytes=int(os.environ.get("TELEMETRY_CACHE_MB", 128)) * 1024 * 1024,
+)
+
+# Spôsob sťahovania kôl pri studenej cache: "bulk", "concurrent" alebo "sequential"
+LAPS_FETCH_MODE = os.environ.get("LAPS_FETCH_MODE", "bulk")
+LAPS_FETCH_WORKERS = int(os.environ.get("LAPS_FETCH_WORKERS", 8))
 
 def get_current_f1_round_number(season=None):
 
@@ -24,13 +149,13 @@ def get_current_f1_round_number(season=None):
         season = datetime.now().year
 
     try:
-        # Získanie kompletného rozvrhu udalostí pre danú sezónu
-        schedule = fastf1.events.get_event_schedule(season)
+        # Získanie kompletného rozvrhu udalostí pre danú sezónu (zdieľaný so standings)
+        schedule = standings_service.schedule(season)
         if schedule.empty:
             return (None, season)
     except Exception as e:
-        # Tichá chyba, ak sa nepodarí získať rozvrh
-        traceback.print_exc() # Pre debug, ak je potrebné
+        # Bez rozvrhu sa kolo nedá určiť - volajúci to rieši
+        logger.exception("Could not load the %s schedule", season)
         return (None, season)
 
     current_date = datetime.now()
@@ -64,19 +189,34 @@ def get_current_f1_round_number(season=None):
 
     return (current_round_number, season)
 
-if __name__ == "__main__":
-    round_num, current_season = get_current_f1_round_number()
-    SEASON = current_season
-    ROUND = round_num
+def _compute_season_round():
+    round_num, season = get_current_f1_round_number()
     if round_num is None:
-        round_num = 0
-    
-#round_num je cislo kola, current_season je aktualny rok sezony
-    
+        raise RoundUnavailable(f"Could not determine the current round of {season}.")
+    return int(season), int(round_num)
+
+
+# Aktuálna sezóna a kolo - jedno miesto pre celý proces, obnovuje sa na pozadí
+current_round = CurrentRound(_compute_season_round, ttl=float(os.environ.get("ROUND_REFRESH", 3600)))
+
+
+def get_season_round():
+    """(season, round) of the current race weekend; round is 0 when it can't be determined."""
+    return current_round.get()
+
+
+def _ergast():
+    # fastf1 (a s ním matplotlib/scipy) sa importuje až pri prvom použití, nie pri štarte workera
+    return fastf1_cache.fastf1().ergast.Ergast()
 
-def get_drivers_standings(season=SEASON, round=ROUND):
+
+def get_drivers_standings(season=None, round=None):
     """Gets the current driver standings from Ergast and returns a Pandas DataFrame."""
-    ergast = Ergast()
+    if season is None or round is None:
+        current_season, current = get_season_round()
+        season = current_season if season is None else season
+        round = current if round is None else round
+    ergast = _ergast()
     try:
         standings = ergast.get_driver_standings(season=season, round=round)
         if standings.content:
@@ -85,63 +225,83 @@ def get_drivers_standings(season=SEASON, round=ROUND):
         else:
             return pd.DataFrame()
     except Exception as e:
-        print(f"Error fetching driver standings: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching driver standings: %s", e)
         return pd.DataFrame()
 
 def get_latest_session_key():
     try:
-        url = "https://api.openf1.org/v1/sessions"
-        response = requests.get(url)
-        response.raise_for_status()
-        sessions = response.json()
-        valid_sessions = [s for s in sessions if s.get("session_key") is not None]
-        if not valid_sessions:
-            return None
-        # Zoradíme podľa dátumu a vrátime najnovšiu session_key
-        valid_sessions.sort(key=lambda x: x.get("date", ""), reverse=True)
-        return valid_sessions[0].get("session_key")
+        latest = session_catalogue.latest()
+        return latest.get("session_key") if latest else None
     except Exception as e:
-        print(f"Error fetching latest session: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching latest session: %s", e)
         return None
 
 
-def calculate_max_points_for_remaining_season(season=SEASON, round=ROUND):
-    """Calculates the maximum points possible in the remaining season."""
+def get_event_schedule(season):
+    return fastf1_cache.fastf1().events.get_event_schedule(season, backend='ergast')
+
+
+def get_constructors_standings(season=None, round=None):
+    """Gets the constructor standings from Ergast and returns a Pandas DataFrame."""
+    if season is None or round is None:
+        current_season, current = get_season_round()
+        season = current_season if season is None else season
+        round = current if round is None else round
+    ergast = _ergast()
     try:
-        POINTS_FOR_SPRINT = 8 + 25
-        POINTS_FOR_CONVENTIONAL = 25
+        standings = ergast.get_constructor_standings(season=season, round=round)
+        if standings.content:
+            return pd.DataFrame(standings.content[0])
+        return pd.DataFrame()
+    except Exception as e:
+        logger.exception("Error fetching constructor standings: %s", e)
+        return pd.DataFrame()
 
-        events = fastf1.events.get_event_schedule(season, backend='ergast')
-        events = events[events['RoundNumber'] > round]
-        sprint_events = len(events.loc[events["EventFormat"] == "sprint_shootout"])
-        conventional_events = len(events.loc[events["EventFormat"] == "conventional"])
 
-        sprint_points = sprint_events * POINTS_FOR_SPRINT
-        conventional_points = conventional_events * POINTS_FOR_CONVENTIONAL
+STANDINGS_COLUMNS = {
+    "drivers": ['position', 'givenName', 'familyName', 'points', 'can_win'],
+    "constructors": ['position', 'constructorName', 'points', 'can_win'],
+}
+OUTLOOK_COLUMNS = ['wins', 'max_points', 'clinched', 'points_needed', 'needed_per_event']
 
-        return sprint_points + conventional_points
-    except Exception as e:
-        print(f"Error calculating max points: {e}")
-        traceback.print_exc()
-        return 0
 
+def fetch_standings(kind, season, round):
+    if kind == "constructors":
+        return get_constructors_standings(season=season, round=round)
+    return get_drivers_standings(season=season, round=round)
 
-def calculate_who_can_win(driver_standings, max_points):
-    """Determines which drivers can still win the WDC and adds a 'can_win' column to the DataFrame."""
-    if driver_standings.empty:
-        return pd.DataFrame()
+
+def build_standings_table(kind, standings, schedule, season, round):
+    """Standings records with the championship outlook (can_win, clinched, points needed, ...)."""
     try:
-        leader_points = int(driver_standings.loc[0]['points'])
-        driver_standings['can_win'] = driver_standings.apply(
-            lambda row: 'Yes' if int(row["points"]) + max_points >= leader_points else 'No', axis=1
-        )
-        return driver_standings[['position', 'givenName', 'familyName', 'points', 'can_win']]  # Return only necessary columns
+        with observability.dataframe_timer("standings_outlook"):
+            df = championship.outlook(standings, schedule, season, round, cars=2 if kind == "constructors" else 1)
+            columns = [c for c in STANDINGS_COLUMNS[kind] + OUTLOOK_COLUMNS if c in df.columns]
+            df = df[columns]
+            return df.astype(object).where(df.notna(), None).to_dict(orient='records')
     except Exception as e:
-        print(f"Error determining who can win: {e}")
-        traceback.print_exc()
-        return pd.DataFrame()
+        logger.exception("Error determining who can win: %s", e)
+        return []
+
+
+# Rozvrh sezóny a tabuľky WDC v pamäti; po TTL sa vrátia staré a obnovia na pozadí
+standings_service = StandingsService(
+    get_event_schedule,
+    fetch_standings,
+    build_standings_table,
+    schedule_ttl=float(os.environ.get("SCHEDULE_TTL", 6 * 3600)),
+    standings_ttl=float(os.environ.get("STANDINGS_TTL", 900)),
+    missing_ttl=float(os.environ.get("STANDINGS_MISSING_TTL", 120)),
+)
+
+
+def get_standings_table(season, round, refresh=False, kind="drivers"):
+    """
+    Drivers' or constructors' standings for (season, round) from the standings
+    service. Raises standings.StandingsUnavailable (a ValueError) when the round
+    has no results yet.
+    """
+    return standings_service.table(season, round, refresh=refresh, kind=kind)
 
 
 def format_lap_time(seconds):
@@ -159,22 +319,8 @@ def format_lap_time(seconds):
 
 def get_all_sessions(exclude_latest=False):
     try:
-        url = "https://api.openf1.org/v1/sessions"
-        response = requests.get(url)
-        response.raise_for_status()
-        sessions = response.json()
-        valid_sessions = []
-        for s in sessions:
-            if s.get("session_key") is not None:
-                s["year"] = s.get("year", "Unknown")
-                s["country_name"] = s.get("country_name", "Unknown Country")
-                s["session_name"] = s.get("session_name", "Unknown Session")
-                s["location"] = s.get("location", "Unknown Location")
-                s["date"] = s.get("date", "")
-                valid_sessions.append(s)
-
-        # Zoradiť sessions podľa dátumu (najnovšie ako prvé)
-        valid_sessions.sort(key=lambda x: x.get("date", ""), reverse=True)
+        # Katalóg je už zoradený podľa dátumu (najnovšie ako prvé)
+        valid_sessions = session_catalogue.sessions()
 
         # ❗ Odstrániť najnovšiu session, ak je žiadané
         if exclude_latest and valid_sessions:
@@ -182,315 +328,420 @@ def get_all_sessions(exclude_latest=False):
 
         return valid_sessions
     except Exception as e:
-        print(f"Error fetching sessions: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching sessions: %s", e)
         return []
 
 # ... (existujúce funkcie pred touto) ...
 
+def get_position_state(session_key):
+    """
+    Returns the PositionState of a session, brought up to date with the
+    records that arrived in the incremental position feed since its last update.
+    """
+    with position_states_lock:
+        state = position_states.get(session_key)
+        if state is None:
+            state = position_states[session_key] = PositionState()
+
+    feed = live_store.feed("position", session_key)
+    feed.refresh()
+    with state.lock:
+        delta, next_cursor = feed.since(state.cursor)
+        state.update(delta)
+        state.cursor = next_cursor
+    return state
+
+
 def get_live_position_data(session_key):
     """
     Načíta dáta o pozíciách jazdcov z OpenF1 API pre danú session_key,
     vyberie najnovšiu pozíciu pre každého jazdca a vráti slovník
     {driver_number (str): position (int)}.
     """
-    url = "https://api.openf1.org/v1/position"
-    params = {"session_key": session_key}
-    
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if not data:
-            print(f"No position data for session {session_key}.")
-            return {}
-
-        latest_positions_raw = {} # Stores {driver_number: {'position': pos, 'date': datetime_obj}}
-
-        for item in data:
-            driver_num_str = str(item.get('driver_number')) # Ensure driver_number is string
-            position = item.get('position')
-            record_date_str = item.get('date') 
-
-            if driver_num_str is None or position is None or record_date_str is None:
-                continue
-
-            try:
-                record_date = datetime.fromisoformat(record_date_str.replace('Z', '+00:00'))
-                current_position_int = int(position)
-
-                if driver_num_str in latest_positions_raw:
-                    if record_date > latest_positions_raw[driver_num_str]['date']:
-                        latest_positions_raw[driver_num_str] = {
-                            'position': current_position_int,
-                            'date': record_date
-                        }
-                else:
-                    latest_positions_raw[driver_num_str] = {
-                        'position': current_position_int,
-                        'date': record_date
-                    }
-            except (ValueError, TypeError) as e:
-                print(f"Warning: Data issue for driver {driver_num_str} in position API: {e}. Item: {item}")
-                continue
-        
-        # Convert to final {driver_number: position} map
-        final_positions_map = {dn: info['position'] for dn, info in latest_positions_raw.items()}
-        return final_positions_map
+        positions = get_position_state(session_key).current_positions()
+        if not positions:
+            logger.info("No position data for session %s.", session_key)
+        return positions
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching live position data for session {session_key}: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching live position data for session %s: %s", session_key, e)
         return {}
     except ValueError:
-        print(f"Error: Invalid JSON data from position API for session {session_key}.")
-        traceback.print_exc()
+        logger.exception("Error: Invalid JSON data from position API for session %s.", session_key)
         return {}
     except Exception as e:
-        print(f"Unexpected error in get_live_position_data for session {session_key}: {e}")
-        traceback.print_exc()
+        logger.exception("Unexpected error in get_live_position_data for session %s: %s", session_key, e)
         return {}
 
 # ... (pokračovanie existujúcich funkcií) ...
 
-def get_drivers_data(session_key):
-    drivers_path = os.path.join(DATA_DIR, f"drivers_{session_key}.csv")
-    print(f"Attempting to load drivers from: {drivers_path}")
+def _load_dataset(kind, session_key, fetch):
+    """
+    Session dataset from the in-memory LRU, else from the shared cache, else
+    from the season archive, else ``fetch()`` (a DataFrame from the API) -
+    loaded by only one worker at a time and stored for all of them. Returns a
+    session_store.CachedDataset or None when there is nothing to load.
+    """
+    dataset = frame_cache.get(kind, session_key)
+    if dataset is not None:
+        observability.count_dataset_lookup(kind, "memory")
+        return dataset
+    source = []
+
+    def counted_fetch():
+        archived = archive.dataset(kind, session_key) if archive is not None else None
+        if archived is not None:
+            source.append("archive")
+            return archived
+        source.append("fetched")
+        return fetch()
+
+    df = dataset_store.get_or_populate(kind, session_key, counted_fetch)
+    observability.count_dataset_lookup(kind, "empty" if df is None else source[0] if source else "shared")
+    if df is None:
+        return None
+    with observability.dataframe_timer("cached_dataset"):
+        return frame_cache.put(kind, session_key, df)
 
-    if os.path.exists(drivers_path):
-        try:
-            print("CSV file exists. Attempting to read...")
-            df = pd.read_csv(drivers_path,
-                             encoding='utf-8',
-                             header=0,
-                             keep_default_na=False,
-                             na_values=['']
-                             )
-            print("CSV read successfully.")
-            print(f"Columns in CSV: {df.columns.tolist()}")
-
-            for col in ['driver_number', 'broadcast_name', 'team_name']:
-                if col not in df.columns:
-                    df[col] = 'N/A'
-
-            for col in df.columns:
-                if df[col].dtype == object:
-                    df[col] = df[col].replace({np.nan: None})
-                elif pd.api.types.is_numeric_dtype(df[col]):
-                    df[col] = df[col].apply(lambda x: None if pd.isna(x) else x)
-
-            drivers_data = df.to_dict("records")
-            print("Drivers data from CSV (after NaN handling):", drivers_data)
-            return drivers_data
 
-        except Exception as e:
-            print(f"Error reading drivers CSV: {e}")
-            traceback.print_exc()
-            print("Falling back to API for drivers.")
-            pass
+def _fetch_drivers_frame(session_key):
+    params = {"session_key": session_key}
+    logger.debug("Fetching drivers from API for session key: %s", session_key)
+    drivers = openf1_client.get_json("drivers", params)
 
-    else:
-        print("CSV file does not exist. Fetching from API.")
+    unique_drivers = {}
+    for driver in drivers:
+        if 'driver_number' in driver:
+            unique_drivers[driver['driver_number']] = driver
+    driver_list = list(unique_drivers.values())
+    if not driver_list:
+        return None
+
+    df = pd.DataFrame(driver_list)
+    for col in ['broadcast_name', 'team_name']:
+        if col not in df.columns:
+            df[col] = 'N/A'
+    return df
 
+
+def get_drivers_dataset(session_key):
+    """Drivers of a session as a session_store.CachedDataset, or None."""
     try:
-        url = "https://api.openf1.org/v1/drivers"
-        params = {"session_key": session_key}
-        print(f"Fetching drivers from API for session key: {session_key}")
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        drivers = response.json()
-
-        unique_drivers = {}
-        for driver in drivers:
-            if 'driver_number' in driver:
-                unique_drivers[driver['driver_number']] = driver
-        driver_list = list(unique_drivers.values())
-
-        df = pd.DataFrame(driver_list)
-        for col in ['driver_number', 'broadcast_name', 'team_name']:
-            if col not in df.columns:
-                df[col] = 'N/A'
-
-        df.to_csv(drivers_path, index=False)
-        drivers_data_api = df.to_dict("records")
-        print("Drivers data from API:", drivers_data_api)
-        return drivers_data_api
+        return _load_dataset("drivers", session_key, lambda: _fetch_drivers_frame(session_key))
+    except Exception as e:
+        logger.exception("Error loading drivers for session %s: %s", session_key, e)
+        return None
+
+
+def get_drivers_data(session_key):
+    dataset = get_drivers_dataset(session_key)
+    return dataset.records() if dataset is not None else []
+
+
+def get_session_laps(session_key, drivers=None):
+    """
+    Returns all laps of a session as a session_store.CachedDataset (memory ->
+    shared cache -> API), or None when nothing could be loaded. ``drivers`` is
+    only needed on a cold cache and is looked up when not given.
+    """
+    def fetch():
+        return fetch_session_laps(session_key, drivers if drivers is not None else get_drivers_data(session_key))
 
+    try:
+        return _load_dataset("laps", session_key, fetch)
     except Exception as e:
-        print(f"Error fetching drivers from API: {e}")
-        traceback.print_exc()
-        return []
+        logger.exception("Error loading laps for session %s: %s", session_key, e)
+        return None
 
 
-def get_lap_times_for_session(session_key, drivers):
-    laps_path = os.path.join(DATA_DIR, f"laps_{session_key}.csv")
-    if os.path.exists(laps_path):
+def get_lap_times_for_session(session_key, drivers, columns=None):
+    """All laps of a session as a DataFrame. The frame is shared with the cache - copy before mutating."""
+    dataset = get_session_laps(session_key, drivers)
+    if dataset is None:
+        return pd.DataFrame()
+    return dataset.frame[columns] if columns else dataset.frame
+
+
+def get_lap_analytics(session_key):
+    """
+    (laps dataset, lap_analytics.analyze result) of a session, or (None, None).
+    Computed once per cached laps dataset and shared by all requests.
+    """
+    dataset = get_session_laps(session_key)
+    if dataset is None:
+        return None, None
+    def analyze():
+        with observability.dataframe_timer("lap_analytics"):
+            return lap_analytics.analyze(dataset.frame)
+
+    return dataset, dataset.memo("lap_analytics", analyze)
+
+
+def _fetch_driver_laps(session_key, driver_number):
+    """Stiahne kolá jedného jazdca z /v1/laps."""
+    params = {"session_key": session_key, "driver_number": driver_number}
+    laps = openf1_client.get_json("laps", params)
+    if isinstance(laps, dict):
+        laps = [laps]
+    df = pd.DataFrame(laps)
+    df["driver_number"] = driver_number
+    return df
+
+
+def _fetch_laps_bulk(session_key):
+    """
+    Fetches all laps of a session with a single /v1/laps call.
+    Returns (DataFrame, complete) where complete is False when the upstream
+    response is paginated or otherwise not a plain list of laps.
+    """
+    response = openf1_client.client.get("laps", {"session_key": session_key})
+    laps = response.json()
+    if not isinstance(laps, list):
+        return pd.DataFrame(), False
+    complete = "next" not in response.links
+    return pd.DataFrame(laps), complete
+
+
+class IncompleteLaps(RuntimeError):
+    """Laps of some drivers could not be fetched; a partial session must not be stored."""
+
+
+def _fetch_laps_per_driver(session_key, driver_numbers, workers):
+    """
+    Fetches laps per driver, concurrently when workers > 1. Raises
+    IncompleteLaps when any driver fails (upstream error or throttled).
+    """
+    def fetch(driver_number):
         try:
-            df = pd.read_csv(laps_path)
-            df['lap_duration'] = pd.to_numeric(df['lap_duration'], errors='coerce')
-            df['lap_time'] = df['lap_duration'].apply(format_lap_time)
-            return df
+            return _fetch_driver_laps(session_key, driver_number), None
         except Exception as e:
-            print(f"Error reading laps CSV: {e}")
-            traceback.print_exc()
-            pass
+            logger.exception("Error fetching lap times for driver %s: %s", driver_number, e)
+            return None, e
 
-    all_laps = []
-    for driver in drivers:
-        driver_number = driver.get("driver_number")
-        if not driver_number:
-            continue
+    if workers <= 1 or len(driver_numbers) <= 1:
+        results = [fetch(dn) for dn in driver_numbers]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(driver_numbers))) as pool:
+            results = list(pool.map(fetch, driver_numbers))
+    failed = [(dn, e) for dn, (_, e) in zip(driver_numbers, results) if e is not None]
+    if failed:
+        raise IncompleteLaps(f"laps of drivers {[dn for dn, _ in failed]} of session {session_key} "
+                             f"could not be fetched") from failed[0][1]
+    return [df for df, _ in results]
+
+
+def fetch_session_laps(session_key, drivers, mode=None):
+    """
+    Fetches laps for all ``drivers`` of a session from OpenF1 and merges them
+    into one DataFrame.
+
+    mode:
+        "bulk"        one /v1/laps call for the whole session; drivers missing
+                      from a failed or paginated bulk response are fetched
+                      per driver with a bounded thread pool (default)
+        "concurrent"  per-driver calls on a bounded thread pool
+        "sequential"  per-driver calls one after another (old behaviour)
+
+    Raises IncompleteLaps when laps of any driver could not be fetched, so
+    that a partial session is never stored (the next request fetches again).
+    """
+    mode = mode or LAPS_FETCH_MODE
+    driver_numbers = [d.get("driver_number") for d in drivers if d.get("driver_number")]
+
+    frames = []
+    missing = driver_numbers
+    if mode == "bulk":
         try:
-            url = "https://api.openf1.org/v1/laps"
-            params = {"session_key": session_key, "driver_number": driver_number}
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            laps = response.json()
-            if isinstance(laps, dict):
-                laps = [laps]
-            df = pd.DataFrame(laps)
-            df["driver_number"] = driver_number
-            if "lap_duration" in df.columns:
-                df["lap_time"] = df["lap_duration"].apply(format_lap_time)
-            all_laps.append(df)
+            bulk_df, complete = _fetch_laps_bulk(session_key)
+            if not bulk_df.empty and "driver_number" in bulk_df.columns:
+                frames.append(bulk_df)
+                if complete:
+                    missing = []
+                else:
+                    # Stránkovaná odpoveď - dotiahneme jazdcov, ktorí v nej chýbajú
+                    present = set(bulk_df["driver_number"].dropna().astype(int))
+                    missing = [dn for dn in driver_numbers if int(dn) not in present]
         except Exception as e:
-            print(f"Error fetching lap times for driver {driver_number}: {e}")
-            traceback.print_exc()
+            logger.exception("Bulk lap fetch failed for session %s, falling back to per-driver fetch: %s",
+                             session_key, e)
 
-    if not all_laps:
+    if missing:
+        workers = 1 if mode == "sequential" else LAPS_FETCH_WORKERS
+        frames.extend(_fetch_laps_per_driver(session_key, missing, workers))
+
+    frames = [df for df in frames if not df.empty]
+    if not frames:
         return pd.DataFrame()
 
-    full_df = pd.concat(all_laps, ignore_index=True)
-    full_df.to_csv(laps_path, index=False)
+    with observability.dataframe_timer("laps_merge"):
+        full_df = pd.concat(frames, ignore_index=True)
+        if "lap_number" in full_df.columns:
+            full_df = full_df.sort_values(["driver_number", "lap_number"], kind="stable").reset_index(drop=True)
+        if "lap_duration" in full_df.columns:
+            full_df["lap_time"] = session_store.format_lap_times(full_df["lap_duration"]).values
     return full_df
 
+def enrich_radio_messages(session_key, radio_data):
+    """Adds session_name, driver_name and formatted_date to radio messages (in place)."""
+    session_name = session_catalogue.session_name(session_key)
+
+    all_drivers = get_drivers_data(session_key)
+    driver_map = {d['driver_number']: d['broadcast_name'] for d in all_drivers}
+
+    for radio_msg in radio_data:
+        radio_msg['session_name'] = session_name
+        dr_num = radio_msg.get('driver_number')
+        radio_msg['driver_name'] = driver_map.get(dr_num, f"Driver {dr_num}") if dr_num else 'Unknown Driver'
+        # Format date for display
+        if 'date' in radio_msg and radio_msg['date']:
+            try:
+                dt_object = datetime.fromisoformat(radio_msg['date'].replace('Z', '+00:00'))
+                radio_msg['formatted_date'] = dt_object.strftime('%Y-%m-%d %H:%M:%S UTC')
+            except ValueError:
+                radio_msg['formatted_date'] = radio_msg['date'] # Fallback
+        else:
+            radio_msg['formatted_date'] = 'N/A'
+
+    return radio_data
+
+
 def get_team_radio_from_api(session_key, driver_number=None):
     """
     Fetches team radio data directly from the OpenF1 API.
     Can filter by driver_number. Enriches data with session and driver names.
     """
     try:
-        url = "https://api.openf1.org/v1/team_radio"
         params = {"session_key": session_key}
         if driver_number:
             params["driver_number"] = driver_number
 
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        radio_data = response.json()
+        radio_data = openf1_client.get_json("team_radio", params)
 
         if isinstance(radio_data, dict): # Ensure it's a list
             radio_data = [radio_data]
 
-        # Enrich data with driver name and session name for display
-        all_sessions = get_all_sessions()
-        session_info = next((s for s in all_sessions if s['session_key'] == session_key), None)
-        session_name = session_info['session_name'] if session_info else 'Unknown Session'
-
-        all_drivers = get_drivers_data(session_key)
-        driver_map = {d['driver_number']: d['broadcast_name'] for d in all_drivers}
-
-        for radio_msg in radio_data:
-            radio_msg['session_name'] = session_name
-            dr_num = radio_msg.get('driver_number')
-            radio_msg['driver_name'] = driver_map.get(dr_num, f"Driver {dr_num}") if dr_num else 'Unknown Driver'
-            # Format date for display
-            if 'date' in radio_msg and radio_msg['date']:
-                try:
-                    dt_object = datetime.fromisoformat(radio_msg['date'].replace('Z', '+00:00'))
-                    radio_msg['formatted_date'] = dt_object.strftime('%Y-%m-%d %H:%M:%S UTC')
-                except ValueError:
-                    radio_msg['formatted_date'] = radio_msg['date'] # Fallback
-            else:
-                radio_msg['formatted_date'] = 'N/A'
-
-        return radio_data
+        return enrich_radio_messages(session_key, radio_data)
     except Exception as e:
-        print(f"Error fetching team radio from API for session {session_key}, driver {driver_number}: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching team radio from API for session %s, driver %s: %s",
+                         session_key, driver_number, e)
         return []
 
 
+def _fetch_radio_frame(session_key):
+    radio_data = openf1_client.get_json("team_radio", {"session_key": session_key})
+    if isinstance(radio_data, dict): # Ensure it's a list
+        radio_data = [radio_data]
+    return pd.DataFrame(radio_data) if radio_data else None
+
+
+def get_team_radio_dataset(session_key):
+    """Raw team radio of a session as a session_store.CachedDataset, or None."""
+    try:
+        return _load_dataset("radio", session_key, lambda: _fetch_radio_frame(session_key))
+    except Exception as e:
+        logger.exception("Error loading team radio for session %s: %s", session_key, e)
+        return None
+
+
 def get_team_radio_data(session_key, driver_number=None):
     """
-    Retrieves team radio data, prioritizing CSV.
-    This function is for historical data; it fetches from API and saves to CSV if not found.
+    Retrieves team radio data, prioritizing the shared session cache.
+    This function is for historical data; it fetches from API and caches it if not found.
     """
-    radio_path = os.path.join(DATA_DIR, f"radio_{session_key}.csv")
+    dataset = get_team_radio_dataset(session_key)
+    if dataset is None:
+        return []
 
-    if os.path.exists(radio_path):
-        try:
-            df = pd.read_csv(radio_path)
-            # Convert back to list of dicts
-            radio_data = df.to_dict("records")
-            # Ensure data is enriched if loaded from CSV (e.g., if columns were missing)
-            all_sessions = get_all_sessions()
-            session_info = next((s for s in all_sessions if s['session_key'] == session_key), None)
-            session_name = session_info['session_name'] if session_info else 'Unknown Session'
-
-            all_drivers = get_drivers_data(session_key)
-            driver_map = {d['driver_number']: d['broadcast_name'] for d in all_drivers}
-
-            for radio_msg in radio_data:
-                radio_msg['session_name'] = session_name
-                dr_num = radio_msg.get('driver_number')
-                radio_msg['driver_name'] = driver_map.get(dr_num, f"Driver {dr_num}") if dr_num else 'Unknown Driver'
-                if 'date' in radio_msg and radio_msg['date']:
-                    try:
-                        dt_object = datetime.fromisoformat(radio_msg['date'].replace('Z', '+00:00'))
-                        radio_msg['formatted_date'] = dt_object.strftime('%Y-%m-%d %H:%M:%S UTC')
-                    except ValueError:
-                        radio_msg['formatted_date'] = radio_msg['date'] # Fallback
-                else:
-                    radio_msg['formatted_date'] = 'N/A'
+    # Copy the cached records, they get enriched below
+    radio_data = [dict(r) for r in dataset.records()]
+    # Enrich messages (the cache stores only the raw API columns)
+    enrich_radio_messages(session_key, radio_data)
 
-            if driver_number:
-                radio_data = [r for r in radio_data if r.get('driver_number') == driver_number]
+    if driver_number:
+        radio_data = [r for r in radio_data if r.get('driver_number') == driver_number]
+    return radio_data
 
-            return radio_data
-        except Exception as e:
-            print(f"Error reading radio CSV for session {session_key}: {e}")
-            traceback.print_exc()
-            pass # Fall through to API fetch
 
-    # If CSV not found or failed, fetch from API and save
-    radio_data_from_api = get_team_radio_from_api(session_key) # Fetch all for session to cache
-    if radio_data_from_api:
-        df = pd.DataFrame(radio_data_from_api)
-        # Drop columns that might cause issues or are not needed for CSV cache
-        df_to_save = df.drop(columns=['session_name', 'driver_name', 'formatted_date'], errors='ignore')
-        df_to_save.to_csv(radio_path, index=False)
+def get_live_team_radio_data(session_key, driver_number=None, cursor=0):
+    """
+    Returns (messages, next_cursor) for a live session without CSV interaction.
+    Only messages newer than ``cursor`` are fetched from the API and returned.
+    """
+    try:
+        radio_data, next_cursor = live_store.get("team_radio", session_key, cursor)
+    except Exception as e:
+        logger.exception("Error fetching live team radio for session %s: %s", session_key, e)
+        return [], cursor
+    if driver_number:
+        radio_data = [r for r in radio_data if r.get('driver_number') == driver_number]
+    return radio_data, next_cursor
+
+
+def _fetch_telemetry_frame(source, session_key, driver_number):
+    """
+    All ``source`` samples (car_data or location) of one driver, fetched in
+    time windows of the session in parallel; None when there are none.
+    """
+    session = session_catalogue.get(session_key) or {}
+    start, end = parse_date(session.get("date_start")), parse_date(session.get("date_end"))
+    if start is not None and end is not None:
+        # Rezerva pred štartom a po konci (formation lap, jazda do boxov)
+        start, end = start - timedelta(minutes=30), end + timedelta(minutes=30)
+    params = {"session_key": session_key, "driver_number": driver_number}
+    logger.debug("Fetching %s from API for session %s, driver %s", source, session_key, driver_number)
+
+    def fetch_chunk(filters):
+        try:
+            return openf1_client.get_json(source, params, filters=filters) or []
+        except requests.exceptions.HTTPError as e:
+            # OpenF1 vracia 404, keď v časovom okne nie sú žiadne vzorky
+            if e.response is not None and e.response.status_code == 404:
+                return []
+            raise
 
-    if driver_number and radio_data_from_api:
-        return [r for r in radio_data_from_api if r.get('driver_number') == driver_number]
-    return radio_data_from_api
+    records = telemetry.fetch_chunked(fetch_chunk, start, end, chunk=TELEMETRY_CHUNK, workers=TELEMETRY_WORKERS)
+    return pd.DataFrame(records) if records else None
 
 
-def get_live_team_radio_data(session_key, driver_number=None):
+def get_telemetry_trace(source, session_key, driver_number):
     """
-    Fetches live team radio data directly from the API without CSV interaction.
+    telemetry.Trace of one driver (memory -> shared cache -> API), or None
+    when OpenF1 has no samples for it.
     """
-    return get_team_radio_from_api(session_key, driver_number)
+    trace = telemetry_cache.get(source, session_key, driver_number)
+    if trace is not None:
+        observability.count_dataset_lookup(source, "memory")
+        return trace
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        return _fetch_telemetry_frame(source, session_key, driver_number)
+
+    df = dataset_store.get_or_populate(source, f"{session_key}_{driver_number}", fetch)
+    observability.count_dataset_lookup(source, "empty" if df is None else "fetched" if fetched else "shared")
+    if df is None:
+        return None
+    with observability.dataframe_timer("telemetry_trace"):
+        trace = telemetry.Trace.from_frame(df, telemetry.CHANNELS[source])
+    return telemetry_cache.put(source, session_key, trace, driver_number)
 
-def get_qualifying_results(session_key):
+
+async def get_qualifying_results(session_key):
     """Gets and formats qualifying results for a given session, sorted by live positions."""
     try:
-        url_laps = "https://api.openf1.org/v1/laps"
-        url_drivers = "https://api.openf1.org/v1/drivers"
         params = {"session_key": session_key}
 
-        # Fetch laps data
-        response_laps = requests.get(url_laps, params=params)
-        response_laps.raise_for_status()
-        laps_data = response_laps.json()
+        # Kolá, jazdci a live pozície sú nezávislé - sťahujú sa súbežne
+        laps_data, drivers_data, live_positions_map = await asyncio.gather(
+            openf1_client.get_json_async("laps", params),
+            openf1_client.get_json_async("drivers", params),
+            asyncio.to_thread(get_live_position_data, session_key),
+        )
         df_laps = pd.DataFrame(laps_data)
         df_laps = df_laps[df_laps['lap_duration'].notna()]  # Filter out laps without time
 
-        # Fetch drivers data
-        response_drivers = requests.get(url_drivers, params=params)
-        response_drivers.raise_for_status()
-        drivers_data = response_drivers.json()
         # Ensure driver_number is string for consistent mapping
         driver_map = {str(d['driver_number']): d for d in drivers_data if 'driver_number' in d}
 
@@ -504,9 +755,7 @@ def get_qualifying_results(session_key):
         fastest_laps['Team'] = fastest_laps['driver_number'].apply(
             lambda x: driver_map.get(str(x), {}).get('team_name', 'N/A'))
 
-        # --- NOVÁ ČASŤ PRE ZÍSKANIE A APLIKOVANIE LIVE POZÍCIÍ ---
-        live_positions_map = get_live_position_data(session_key)
-
+        # --- NOVÁ ČASŤ PRE APLIKOVANIE LIVE POZÍCIÍ ---
         # Map live positions to fastest_laps DataFrame
         # Pre jazdcov, ktorí nemajú live pozíciu (napr. neboli na trati alebo API nevrátilo dáta),
         # priradíme veľké číslo, aby sa zoradili na koniec.
@@ -526,112 +775,79 @@ def get_qualifying_results(session_key):
         return fastest_laps[['Driver', 'Team', 'LapTime']].to_dict(orient='records')
 
     except Exception as e:
-        print(f"Error fetching qualifying results: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching qualifying results: %s", e)
         return []
     
 
 
 def get_circuit_details_from_csv(circuit_short_name):
     """
-    Reads circuit details from a CSV file located in data/circuits/.
-    The CSV is expected to have headers in the first row and values in the second.
-    Returns a dictionary of circuit properties.
+    Circuit details (the fields of data/circuits/<name>.csv) for any name of
+    the circuit, from the in-memory circuit registry. Returns {} if unknown.
     """
-    # Použite app.root_path pre získanie absolútnej cesty, aby ste sa vyhli problémom s relatívnymi cestami
-    csv_file_path = os.path.join(app.root_path, DATA_DIR, 'circuits', f"{circuit_short_name}.csv")
-    circuit_info = {}
-    print(f"Attempting to read circuit CSV from: {csv_file_path}") # Pre ladenie
-    if os.path.exists(csv_file_path):
-        try:
-            with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-                csv_reader = csv.reader(csvfile)
-                
-                # Prečíta prvý riadok ako hlavičky/kľúče
-                headers = next(csv_reader) 
-                
-                # Prečíta druhý riadok ako hodnoty
-                values = next(csv_reader)  
-
-                # Spojí hlavičky s hodnotami do slovníka
-                for i in range(len(headers)):
-                    if i < len(values): # Uistite sa, že existuje zodpovedajúca hodnota
-                        circuit_info[headers[i].strip()] = values[i].strip()
-            print(f"Successfully loaded circuit info: {circuit_info}") # Pre ladenie
-        except StopIteration:
-            print(f"CSV file {csv_file_path} is empty or contains only headers.")
-        except Exception as e:
-            print(f"Error reading circuit CSV {csv_file_path}: {e}")
-            traceback.print_exc()
-    else:
-        print(f"Circuit CSV file not found: {csv_file_path}") # Pre ladenie
-    return circuit_info
+    circuit = circuit_registry.get(circuit_short_name)
+    return dict(circuit.info) if circuit is not None else {}
 
 
-def get_race_control_data(session_key):
+def format_race_control_events(session_key, data):
+    """Pripraví race control záznamy na zobrazenie (formátovaný dátum, N/A pre chýbajúce polia)."""
+    processed_data = []
+    for item in data:
+        formatted_date = 'N/A'
+        if 'date' in item and item['date']:
+            try:
+                dt_object = datetime.fromisoformat(item['date'].replace('Z', '+00:00'))
+                formatted_date = dt_object.strftime('%Y-%m-%d %H:%M:%S UTC')
+            except ValueError:
+                formatted_date = item['date']
+
+        processed_data.append({
+            "date": formatted_date,
+            "category": item.get("category", "N/A"),
+            "message": item.get("message", "N/A"),
+            "flag": item.get("flag", "N/A"),
+            "scope": item.get("scope", "N/A"),
+            "sector": item.get("sector", "N/A")
+        })
+    return processed_data
+
+
+def get_race_control_data(session_key, cursor=0):
     """
     Načíta dáta z OpenF1 race_control API pre danú session_key.
+    Vráti (udalosti od najnovších po najstaršie, ďalší kurzor); s kurzorom len nové udalosti.
     """
-    url = "https://api.openf1.org/v1/race_control"
-    params = {"session_key": session_key}
-    
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Zoradíme dáta od najnovších po najstaršie
-        data.sort(key=lambda x: x.get('date', ''), reverse=True)
-
-        processed_data = []
-        for item in data:
-            formatted_date = 'N/A'
-            if 'date' in item and item['date']:
-                try:
-                    dt_object = datetime.fromisoformat(item['date'].replace('Z', '+00:00'))
-                    formatted_date = dt_object.strftime('%Y-%m-%d %H:%M:%S UTC')
-                except ValueError:
-                    formatted_date = item['date']
-
-            processed_data.append({
-                "date": formatted_date,
-                "category": item.get("category", "N/A"),
-                "message": item.get("message", "N/A"),
-                "flag": item.get("flag", "N/A"),
-                "scope": item.get("scope", "N/A"),
-                "sector": item.get("sector", "N/A")
-            })
-        return processed_data
+        feed = live_store.feed("race_control", session_key)
+        if not len(feed):
+            # Prázdny buffer - začneme z uloženej kópie, z API sa stiahne len to, čo pribudlo
+            table = dataset_store.read_table("race_control", session_key)
+            if table is not None:
+                feed.seed(table.to_pylist())
+        events, next_cursor = live_store.get("race_control", session_key, cursor)
+        # Buffer je zoradený od najstarších, zobrazujeme od najnovších
+        return events[::-1], next_cursor
     except requests.exceptions.RequestException as e:
-        print(f"Chyba pri načítavaní race control dát pre session {session_key}: {e}")
-        traceback.print_exc()
-        return []
+        logger.exception("Chyba pri načítavaní race control dát pre session %s: %s", session_key, e)
+        return [], cursor
     except Exception as e:
-        print(f"Neočakávaná chyba v get_race_control_data pre session {session_key}: {e}")
-        traceback.print_exc()
-        return []
+        logger.exception("Neočakávaná chyba v get_race_control_data pre session %s: %s", session_key, e)
+        return [], cursor
 
 # --- Flask Routes ---
 @app.route("/")
 def index():
     """Renders the index page with WDC standings, attempting to gracefully handle errors with ROUND."""
-    current_round = ROUND  # Store the original ROUND value
+    season, current_round = get_season_round()  # Store the original ROUND value
     error_message = None
 
     for attempt in range(2):  # Try twice: once with ROUND, once with ROUND - 1
         try:
-            driver_standings_df = get_drivers_standings(round=current_round)
-            if driver_standings_df.empty:
-                raise ValueError(f"No driver standings data available for round {current_round}.")
-
-            max_points = calculate_max_points_for_remaining_season(round=current_round)
-            standings_with_win_df = calculate_who_can_win(driver_standings_df, max_points)
-            standings_data = standings_with_win_df.to_dict(orient='records')
+            standings_data = get_standings_table(season, current_round)
             return render_template("index.html", standings=standings_data)
 
         except Exception as e:
-            print(f"Error fetching standings for round {current_round}: {e}")
-            traceback.print_exc()
+            logger.exception("Error fetching standings for round %s: %s", current_round, e)
             error_message = f"Failed to load WDC standings for round {current_round}."
             if attempt == 0 and current_round > 1:  # Only try ROUND - 1 if it's not the first round
                 current_round -= 1
@@ -661,41 +877,101 @@ def race_control_page():
     return render_template("race_control.html")
 
 @app.route("/live")
-def live_page():
+async def live_page():
     try:
-        url = "https://api.openf1.org/v1/sessions"
-        response = requests.get(url)
-        response.raise_for_status()
-        sessions = response.json()
-        valid_sessions = [s for s in sessions if s.get("session_key") is not None]
-        valid_sessions.sort(key=lambda x: x.get("date", ""))
-        latest = valid_sessions[-1] if valid_sessions else None
+        latest = await asyncio.to_thread(session_catalogue.latest)
 
         session_key = latest.get("session_key") if latest else None
-        qualifying_results = get_qualifying_results(session_key) if session_key else []
+        qualifying_results = await get_qualifying_results(session_key) if session_key else []
 
         circuit_info = None
-        if latest and latest.get("circuit_short_name"):
-            circuit_info = get_circuit_details_from_csv(latest["circuit_short_name"])
-
-        return render_template("live.html", latest_session=latest, qualifying_results=qualifying_results, circuit_info=circuit_info)
+        circuit_image = None
+        circuit = circuit_registry.get(latest.get("circuit_short_name")) if latest else None
+        if circuit is not None:
+            circuit_info = circuit.info or None
+            circuit_image = circuit.image_for(latest["circuit_short_name"])
+
+        return render_template("live.html", latest_session=latest, qualifying_results=qualifying_results,
+                               circuit_info=circuit_info, circuit_image=circuit_image)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in live_page")
         return render_template("live.html", latest_session=None, qualifying_results=[], error="Nepodarilo sa načítať dáta.")
 
 
+def _sessions_response(variant, select):
+    """Catalogue JSON encoded (and hashed for the ETag) once per catalogue snapshot."""
+    try:
+        snapshot = session_catalogue.snapshot()
+    except Exception as e:
+        logger.exception("Error fetching sessions: %s", e)
+        return json_response(sessions=[])
+    body, etag = snapshot.memo(variant, lambda: http_cache.encode(sessions=select(snapshot.sessions)))
+    return http_cache.cached_json(body, etag, None)
+
+
 @app.route("/get_sessions", methods=["GET"])
 def get_sessions_api():
-    sessions = get_all_sessions()
-    if sessions:
-        # odstráni poslednú session (ktorá bude v HTML ako prvá – najnovšia)
-        sessions = sessions[:-1]
-    return jsonify({"sessions": sessions})
+    # odstráni poslednú session (ktorá bude v HTML ako prvá – najnovšia)
+    return _sessions_response("get_sessions", lambda sessions: sessions[:-1])
 
 @app.route("/get_sessions_for_radio", methods=["GET"])
 def get_sessions_for_radio_api():
-    sessions = get_all_sessions()
-    return jsonify({"sessions": sessions})
+    return _sessions_response("get_sessions_for_radio", lambda sessions: sessions)
+
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss/eviction counters of the in-memory and shared session caches."""
+    return jsonify({"frame_cache": frame_cache.stats(), "shared_cache": dataset_store.stats(),
+                    "circuits": circuit_registry.stats(), "compression": response_compressor.stats(),
+                    "telemetry": telemetry_cache.stats(), "live_feed": live_feed_hub.stats(), "live_store": live_store.stats(),
+                    "standings": standings_service.stats(), "current_round": current_round.stats(),
+                    "upstream": openf1_client.get_stats(), "upstream_guard": openf1_client.get_guard_stats(),
+                    "archive": archive.stats() if archive is not None else None})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics (see observability.py)."""
+    body, content_type = observability.metrics_response()
+    return Response(body, content_type=content_type)
+
+
+@app.route("/championship_outlook", methods=["GET"])
+def championship_outlook():
+    """Who can still win the drivers' or constructors' title, with max points and points needed."""
+    kind = request.args.get("kind", "drivers")
+    if kind not in STANDINGS_COLUMNS:
+        return jsonify({"error": "kind must be 'drivers' or 'constructors'."}), 400
+    try:
+        current_season, current = get_season_round()
+        season = int(request.args.get("season", current_season))
+        round_num = int(request.args.get("round", current))
+    except ValueError:
+        return jsonify({"error": "Invalid season or round."}), 400
+    try:
+        return json_response(kind=kind, season=season, round=round_num,
+                             standings=get_standings_table(season, round_num, kind=kind))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        logger.exception("Error in championship_outlook")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/position_timeline", methods=["GET"])
+def position_timeline():
+    """Full position history of one driver in a session (from the position feed)."""
+    session_key = request.args.get("session_key")
+    driver_number = request.args.get("driver_number")
+    if not session_key or not driver_number:
+        return jsonify({"error": "Missing session key or driver number."}), 400
+    try:
+        state = get_position_state(int(session_key))
+        return json_response(driver_number=int(driver_number), **state.timeline(driver_number))
+    except Exception as e:
+        logger.exception("Error in position_timeline")
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route("/get_drivers", methods=["GET"])
@@ -704,18 +980,42 @@ def get_drivers_api():
     if not session_key:
         return jsonify({"error": "Missing session key."}), 400
     try:
-        drivers_data = get_drivers_data(int(session_key))
-        return jsonify({"drivers": drivers_data})
+        session_key = int(session_key)
+        dataset = get_drivers_dataset(session_key)
+        if dataset is None:
+            return json_response(drivers=[])
+        body, etag = dataset.memo("drivers_json", lambda: http_cache.encode(drivers=dataset.records()))
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key), stored_at=dataset.stored_at)
     except Exception as e:
-        print(f"Error in get_drivers_api: {e}")
-        traceback.print_exc()
+        logger.exception("Error in get_drivers_api: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/driver_laps", methods=["POST"])
+def _archive_filters():
+    """Cross-session filters of the archive queries from the request; raises ValueError on bad numbers."""
+    values = request.values
+    return {
+        "year": int(values["year"]) if values.get("year") else None,
+        "circuit": values.get("circuit") or None,
+        "session_type": values.get("session_type") or None,
+        "since": values.get("since") or None,
+        "until": values.get("until") or None,
+        "limit": min(int(values.get("limit") or ARCHIVE_QUERY_LIMIT), ARCHIVE_QUERY_LIMIT),
+    }
+
+
+@app.route("/driver_laps", methods=["GET", "POST"])
 def driver_laps():
-    session_key = request.form.get("session_key")
-    driver_number = request.form.get("driver_number")
+    """
+    Laps of one driver. GET (?session_key=&driver_number=) is cacheable, POST is kept for old clients.
+    Without session_key the laps come from all archived sessions, filtered by
+    year, circuit, session_type, since/until (lap start, ISO 8601) and limit;
+    best=1 orders them fastest first.
+    """
+    session_key = request.values.get("session_key")
+    driver_number = request.values.get("driver_number")
+    if driver_number and not session_key and archive is not None:
+        return archived_driver_laps(driver_number)
     if not session_key or not driver_number:
         return jsonify({"error": "Missing parameters."}), 400
 
@@ -723,43 +1023,155 @@ def driver_laps():
         session_key = int(session_key)
         driver_number = int(driver_number)
 
-        drivers_data = get_drivers_data(session_key)
+        session_laps = get_session_laps(session_key)
+        if session_laps is None:
+            if not get_drivers_data(session_key):
+                return jsonify({"laps": [], "error": "No driver data available for this session."})
+            return jsonify({"laps": []})
+        if driver_number not in session_laps.driver_slices:
+            # Neznámy jazdec sa nememoizuje, inak by ľubovoľné čísla plnili pamäť datasetu
+            return json_response(laps=[])
+
+        def build():
+            driver_laps = session_laps.for_driver(driver_number)
+            # NaN, numpy typy, timedelta a datetime rieši vektorový encoder po stĺpcoch
+            columns_to_display = [col for col in driver_laps.columns if col != "lap_duration"]
+            return http_cache.encode(laps=driver_laps[columns_to_display])
+
+        body, etag = session_laps.memo(("driver_laps_json", driver_number), build)
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key),
+                                      stored_at=session_laps.stored_at)
+    except Exception as e:
+        logger.exception("Error in driver_laps")
+        return jsonify({"error": str(e)}), 500
+    
 
-        if not drivers_data:
-            return jsonify({"laps": [], "error": "No driver data available for this session."})
+def archived_driver_laps(driver_number):
+    try:
+        driver_number = int(driver_number)
+        filters = _archive_filters()
+    except ValueError:
+        return jsonify({"error": "Invalid driver number, year or limit."}), 400
+    try:
+        best = request.values.get("best", "").lower() in ("1", "true", "yes")
+        df = archive.laps(driver_number, best=best, **filters)
+        body, etag = http_cache.encode(laps=df[[col for col in df.columns if col != "lap_duration"]])
+        return http_cache.cached_json(body, etag, None)
+    except Exception as e:
+        logger.exception("Error in archived_driver_laps")
+        return jsonify({"error": str(e)}), 500
 
-        lap_df = get_lap_times_for_session(session_key, drivers_data)
 
-        driver_laps = lap_df[lap_df["driver_number"] == driver_number].copy()
+@app.route("/lap_analytics", methods=["GET"])
+def lap_analytics_api():
+    """
+    Best laps, theoretical bests, stints with pace, gaps to the leader and
+    speed trap rankings of a session: ?session_key=&drivers=1,44,16 (all drivers when omitted).
+    """
+    session_key = request.args.get("session_key")
+    if not session_key:
+        return jsonify({"error": "Missing session key."}), 400
+    try:
+        session_key = int(session_key)
+        drivers = [int(d) for d in request.args.get("drivers", "").split(",") if d.strip()]
+    except ValueError:
+        return jsonify({"error": "Invalid session key or driver numbers."}), 400
 
-        for col in driver_laps.columns:
-            driver_laps[col] = driver_laps[col].replace({np.nan: None})
+    try:
+        dataset, analytics = get_lap_analytics(session_key)
+        if dataset is None:
+            return jsonify({"error": "No lap data available for this session."}), 404
 
-            if pd.api.types.is_timedelta64_dtype(driver_laps[col]):
-                driver_laps[col] = driver_laps[col].astype(str)
+        def build(selected):
+            return http_cache.encode(session_key=session_key, laps=analytics["laps"], session=analytics["session"],
+                                     drivers=[analytics["drivers"][d] for d in selected if d in analytics["drivers"]])
 
-            if pd.api.types.is_numeric_dtype(driver_laps[col]):
-                driver_laps[col] = driver_laps[col].apply(lambda x: x.item() if pd.notna(x) and isinstance(x, np.number) else x)
+        if drivers:
+            # Podmnožiny jazdcov sa nememoizujú (kombinácií je priveľa), kódovanie je lacné
+            body, etag = build(drivers)
+        else:
+            body, etag = dataset.memo("lap_analytics_json", lambda: build(sorted(analytics["drivers"])))
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key), stored_at=dataset.stored_at)
+    except Exception as e:
+        logger.exception("Error in lap_analytics_api: %s", e)
+        return jsonify({"error": str(e)}), 500
 
-            if pd.api.types.is_datetime64_any_dtype(driver_laps[col]):
-                driver_laps[col] = driver_laps[col].apply(lambda x: x.isoformat() if pd.notna(x) else None)
 
-        columns_to_display = [col for col in driver_laps.columns if col != "lap_duration"]
-        laps_data = driver_laps[columns_to_display].to_dict("records")
+@app.route("/telemetry", methods=["GET"])
+def telemetry_api():
+    """
+    Downsampled telemetry of one driver:
+    ?session_key=&driver_number=&source=car_data|location&lap=&channels=speed,rpm&points=1500&method=lttb|minmax.
+    Without ``lap`` the whole session is returned. ``t`` is in seconds from the start of the lap (session).
+    """
+    session_key = request.args.get("session_key")
+    driver_number = request.args.get("driver_number")
+    source = request.args.get("source", "car_data")
+    method = request.args.get("method", "lttb")
+    if not session_key or not driver_number:
+        return jsonify({"error": "Missing parameters."}), 400
+    if source not in telemetry.CHANNELS:
+        return jsonify({"error": f"source must be one of {', '.join(telemetry.CHANNELS)}."}), 400
+    if method not in ("lttb", "minmax"):
+        return jsonify({"error": "method must be 'lttb' or 'minmax'."}), 400
+    try:
+        session_key = int(session_key)
+        driver_number = int(driver_number)
+        lap = request.args.get("lap", type=int)
+        points = min(max(request.args.get("points", telemetry.DEFAULT_POINTS, type=int), 10), telemetry.MAX_POINTS)
+    except ValueError:
+        return jsonify({"error": "Invalid session key, driver number or lap."}), 400
+    available = telemetry.CHANNELS[source]
+    channels = [c for c in request.args.get("channels", "").split(",") if c] or list(available)
+    unknown = [c for c in channels if c not in available]
+    if unknown:
+        return jsonify({"error": f"Unknown channels: {', '.join(unknown)}."}), 400
 
-        return jsonify({"laps": laps_data})
+    try:
+        trace = get_telemetry_trace(source, session_key, driver_number)
+        if trace is None or not len(trace):
+            return jsonify({"error": "No telemetry available for this driver."}), 404
+        window = slice(None)
+        stored_at = trace.stored_at
+        if lap is not None:
+            session_laps = get_session_laps(session_key)
+            windows = telemetry.lap_windows(session_laps.for_driver(driver_number)) if session_laps is not None else {}
+            if lap not in windows:
+                return jsonify({"error": f"Lap {lap} not found."}), 404
+            window = trace.window(*windows[lap])
+            # Odpoveď je finálna, len ak sú finálne aj kolá, ktoré určujú okno
+            stored_at = None if stored_at is None or session_laps.stored_at is None else min(stored_at,
+                                                                                               session_laps.stored_at)
+
+        t = trace.t[window]
+        values = {name: trace.channels[name][window] for name in channels}
+        if not len(t):
+            return jsonify({"error": "No telemetry in this lap."}), 404
+        with observability.dataframe_timer("telemetry_downsample"):
+            indices = telemetry.downsample(t, values, points=points, method=method)
+        body, etag = http_cache.encode(
+            session_key=session_key, driver_number=driver_number, source=source, lap=lap,
+            start=pd.Timestamp(int(t[0]), tz="UTC").isoformat(), samples=len(t), points=len(indices),
+            t=telemetry.encode_values((t[indices] - t[0]) / 1e9),
+            **{name: telemetry.encode_values(v[indices]) for name, v in values.items()},
+        )
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key), stored_at=stored_at)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in telemetry_api: %s", e)
         return jsonify({"error": str(e)}), 500
-    
-@app.route("/team_radio_data", methods=["POST"])
+
+
+@app.route("/team_radio_data", methods=["GET", "POST"])
 def team_radio_data():
     """
     API endpoint to get team radio data.
-    This endpoint handles historical data (CSV caching).
+    This endpoint handles historical data (shared session cache); GET responses are cacheable.
+    Without session_key the messages come from all archived sessions (filters as in /driver_laps).
     """
-    session_key = request.form.get("session_key")
-    driver_number = request.form.get("driver_number") # Optional driver filter
+    session_key = request.values.get("session_key")
+    driver_number = request.values.get("driver_number") # Optional driver filter
+    if not session_key and archive is not None:
+        return archived_team_radio(driver_number)
     if not session_key:
         return jsonify({"error": "Missing session key."}), 400
 
@@ -767,10 +1179,29 @@ def team_radio_data():
         session_key = int(session_key)
         driver_number = int(driver_number) if driver_number else None
 
-        radio_messages = get_team_radio_data(session_key, driver_number)
-        return jsonify({"radio_messages": radio_messages})
+        dataset = get_team_radio_dataset(session_key)
+        if dataset is None or (driver_number is not None and driver_number not in dataset.driver_slices):
+            # Neznámy jazdec sa nememoizuje, inak by ľubovoľné čísla plnili pamäť datasetu
+            return json_response(radio_messages=[])
+        body, etag = dataset.memo(("radio_json", driver_number), lambda: http_cache.encode(
+            radio_messages=get_team_radio_data(session_key, driver_number)))
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key), stored_at=dataset.stored_at)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in team_radio_data")
+        return jsonify({"error": str(e)}), 500
+
+
+def archived_team_radio(driver_number):
+    try:
+        driver_number = int(driver_number) if driver_number else None
+        filters = _archive_filters()
+    except ValueError:
+        return jsonify({"error": "Invalid driver number, year or limit."}), 400
+    try:
+        body, etag = http_cache.encode(radio_messages=archive.team_radio(driver_number, **filters))
+        return http_cache.cached_json(body, etag, None)
+    except Exception as e:
+        logger.exception("Error in archived_team_radio")
         return jsonify({"error": str(e)}), 500
 
 
@@ -789,41 +1220,59 @@ def live_team_radio_data():
         session_key = int(session_key)
         driver_number = int(driver_number) if driver_number else None
 
-        radio_messages = get_live_team_radio_data(session_key, driver_number)
-        return jsonify({"radio_messages": radio_messages})
+        cursor = request.form.get("cursor") or "0"
+
+        radio_messages, next_cursor = get_live_team_radio_data(session_key, driver_number, cursor)
+        return json_response(radio_messages=radio_messages, cursor=next_cursor)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in live_team_radio_data")
         return jsonify({"error": str(e)}), 500
     
 @app.route("/live_drivers", methods=["GET"])
-def live_drivers():
+async def live_drivers():
     try:
         # Najnovšia session
-        url = "https://api.openf1.org/v1/sessions"
-        response = requests.get(url)
-        response.raise_for_status()
-        sessions = response.json()
-        valid = [s for s in sessions if s.get("session_key") is not None]
-        valid.sort(key=lambda x: x.get("date", ""))
-        latest = valid[-1]
+        latest = await asyncio.to_thread(session_catalogue.latest)
+        if latest is None:
+            return jsonify({"error": "No sessions available."}), 503
         session_key = latest.get("session_key")
 
         # Live dáta jazdcov
-        url = "https://api.openf1.org/v1/drivers"
-        drivers_response = requests.get(url, params={"session_key": session_key})
-        drivers_response.raise_for_status()
-        drivers = drivers_response.json()
+        drivers = await openf1_client.get_json_async("drivers", {"session_key": session_key})
 
         unique = {}
         for d in drivers:
             if 'driver_number' in d:
                 unique[d['driver_number']] = d
 
-        return jsonify({"session_key": session_key, "drivers": list(unique.values())})
+        return json_response(session_key=session_key, drivers=list(unique.values()))
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in live_drivers")
         return jsonify({"error": str(e)}), 500
     
+def process_live_lap(lap):
+    """Reduces an OpenF1 lap record to the fields shown in the live lap table."""
+    # Výpočet lap_time
+    lap_time = "N/A"
+    try:
+        sec = float(lap.get("lap_duration", 0))
+        minutes = int(sec // 60)
+        rem_sec = sec % 60
+        lap_time = f"{minutes}:{rem_sec:06.3f}"
+    except:
+        pass
+
+    return {
+        "driver_number": lap.get("driver_number"),
+        "lap_number": lap.get("lap_number"),
+        "lap_time": lap_time,
+        "duration_sector_1": lap.get("duration_sector_1"),
+        "duration_sector_2": lap.get("duration_sector_2"),
+        "duration_sector_3": lap.get("duration_sector_3"),
+        "is_pit_out_lap": lap.get("is_pit_out_lap"),
+        "st_speed": lap.get("st_speed"),
+    }
+
 @app.route("/live_laps", methods=["POST"])
 def live_laps():
     try:
@@ -833,56 +1282,418 @@ def live_laps():
         if not session_key or not driver_number:
             return jsonify({"error": "Chýba session_key alebo driver_number"}), 400
 
-        url = "https://api.openf1.org/v1/laps"
-        params = {"session_key": session_key, "driver_number": driver_number}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        laps = response.json()
+        session_key = int(session_key)
+        driver_number = int(driver_number)
+        cursor = request.form.get("cursor") or "0"
 
-        processed = []
-        for lap in laps:
-            # Výpočet lap_time
-            lap_time = "N/A"
-            try:
-                sec = float(lap.get("lap_duration", 0))
-                minutes = int(sec // 60)
-                rem_sec = sec % 60
-                lap_time = f"{minutes}:{rem_sec:06.3f}"
-            except:
-                pass
-
-            processed.append({
-                "lap_number": lap.get("lap_number"),
-                "lap_time": lap_time,
-                "duration_sector_1": lap.get("duration_sector_1"),
-                "duration_sector_2": lap.get("duration_sector_2"),
-                "duration_sector_3": lap.get("duration_sector_3"),
-                "is_pit_out_lap": lap.get("is_pit_out_lap"),
-                "st_speed": lap.get("st_speed"),
-            })
-
-        return jsonify({"laps": processed})
+        # Jeden inkrementálny buffer kôl celej session pre všetkých jazdcov a divákov
+        laps, next_cursor = live_store.get("laps", session_key, cursor)
+        processed = [process_live_lap(lap) for lap in laps if lap.get("driver_number") == driver_number]
+        return json_response(laps=processed, cursor=next_cursor)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in live_laps")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/get_race_control_events", methods=["POST"])
+@app.route("/get_race_control_events", methods=["GET", "POST"])
 def get_race_control_events():
     """
     API endpoint na získanie race control dát pre danú session_key.
+    GET odpovede majú ETag a Cache-Control podľa toho, či session už skončila.
     """
-    session_key = request.form.get("session_key")
+    session_key = request.values.get("session_key")
     if not session_key:
         return jsonify({"error": "Chýba session_key."}), 400
 
     try:
         session_key = int(session_key)
-        race_control_events = get_race_control_data(session_key)
-        return jsonify({"events": race_control_events})
+        cursor = request.values.get("cursor") or "0"
+        race_control_events, next_cursor = get_race_control_data(session_key, cursor)
+        body, etag = http_cache.encode(events=race_control_events, cursor=next_cursor)
+        return http_cache.cached_json(body, etag, session_catalogue.get(session_key))
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error in get_race_control_events")
         return jsonify({"error": str(e)}), 500
 
 
+
+# --- Live feed (SSE) ---
+def _poll_live_radio(session_key, state):
+    """Live feed topic: team radio messages newer than the last one seen."""
+    records, state["cursor"] = live_store.get("team_radio", session_key, state.get("cursor", 0))
+    return records
+
+
+def _poll_live_laps(session_key, state):
+    """Live feed topic: laps that are new or changed since the last poll."""
+    laps, state["cursor"] = live_store.get("laps", session_key, state.get("cursor", 0))
+    return [process_live_lap(lap) for lap in laps]
+
+
+live_feed_hub = LiveFeedHub(
+    {"radio": _poll_live_radio, "laps": _poll_live_laps},
+    interval=float(os.environ.get("LIVE_FEED_INTERVAL", 5)),
+    # Každé spojenie drží vlákno workera (GUNICORN_THREADS) - zvyšok nechávame ostatným requestom
+    max_streams=int(os.environ.get("LIVE_FEED_MAX_STREAMS", 8)),
+)
+LIVE_FEED_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _live_feed_args():
+    """(session_key, topics, driver_number) of a /live_feed request, or an error response."""
+    session_key = request.args.get("session_key")
+    if not session_key:
+        return jsonify({"error": "Missing session key."}), 400
+    try:
+        session_key = int(session_key)
+        driver_number = request.args.get("driver_number")
+        driver_number = int(driver_number) if driver_number else None
+    except ValueError:
+        return jsonify({"error": "Invalid session key or driver number."}), 400
+    topics = [t for t in request.args.get("topics", "").split(",") if t] or None
+    return session_key, topics, driver_number
+
+
+@app.route("/live_feed", methods=["GET"])
+def live_feed():
+    """
+    Server-Sent Events stream of live deltas for a session.
+    Query: session_key, optional driver_number and topics (comma separated: radio,laps).
+    Served on a thread; past LIVE_FEED_MAX_STREAMS open streams answers 503
+    with Retry-After (clients then poll /live_laps, /live_team_radio_data).
+    """
+    args = _live_feed_args()
+    if isinstance(args[0], Response):
+        return args
+    try:
+        stream = live_feed_hub.stream(*args)
+    except LiveFeedFull:
+        return jsonify({"error": "Too many live feed connections."}), 503, {"Retry-After": "30"}
+    return Response(stream_with_context(stream), mimetype="text/event-stream", headers=LIVE_FEED_HEADERS)
+
+
+async def live_feed_async(**_):
+    """/live_feed for asgi.py: the same stream as an async generator, holding no thread and not capped."""
+    args = _live_feed_args()
+    if isinstance(args[0], Response):
+        return args
+    return Response(live_feed_hub.astream(*args), mimetype="text/event-stream", headers=LIVE_FEED_HEADERS)
+
+
+# Endpoint -> async view s async-generator telom; asgi.py ich streamuje na slučke
+ASYNC_STREAM_VIEWS = {"live_feed": live_feed_async}
+
+
+# --- Warm-up ---
+def final_dataset(kind, session, load):
+    """
+    ``load(session_key)`` of a finished session, made sure to be final
+    (fetched after http_cache.final_after): an older copy (or one fetched at
+    an unknown time) is dropped from this worker's memory and, if the shared
+    copy is not final either, from the shared cache, and fetched again.
+    Before that point the loaded dataset is returned as it is.
+    """
+    session_key = session["session_key"]
+    final = http_cache.final_after(session)
+    dataset = load(session_key)
+    if dataset is None or final is None or dataset.stored_after(final):
+        return dataset
+    if datetime.now(timezone.utc) < final:
+        # OpenF1 ešte dopĺňa dáta, nová kópia by nebola o nič finálnejšia
+        return dataset
+    # Kópia v pamäti workera môže byť staršia než zdieľaná - iný worker ju už mohol obnoviť
+    frame_cache.invalidate(kind, session_key)
+    dataset = load(session_key)
+    if dataset is None or dataset.stored_after(final):
+        return dataset
+    logger.info("Refetching %s of session %s stored before its data was final", kind, session_key)
+    frame_cache.invalidate(kind, session_key)
+    dataset_store.delete(kind, session_key)
+    return load(session_key)
+
+
+def _warm_drivers(session):
+    dataset = final_dataset("drivers", session, get_drivers_dataset)
+    if dataset is None:
+        raise ValueError("no drivers returned")
+    return len(dataset.frame)
+
+
+def _warm_laps(session):
+    final_dataset("laps", session, get_session_laps)
+    dataset, _ = get_lap_analytics(session["session_key"])
+    if dataset is None:
+        raise ValueError("no laps returned")
+    return len(dataset.frame)
+
+
+def _warm_radio(session):
+    final_dataset("radio", session, get_team_radio_dataset)
+    return len(get_team_radio_data(session["session_key"]))
+
+
+def _warm_race_control(session):
+    """Loads race control into the live buffer and persists the raw records next to the other datasets."""
+    session_key = session["session_key"]
+    get_race_control_data(session_key)
+    records = live_store.feed("race_control", session_key).raw_records()
+    if records:
+        dataset_store.write("race_control", session_key, pd.DataFrame(records))
+    return len(records)
+
+
+def archive_session(session, cached_only=False, allow_unverified=False):
+    """
+    Ingests drivers, laps and team radio of a finished session into the
+    season archive. Only final data is archived (fetched after
+    http_cache.final_after): datasets come through the cached getters and are
+    fetched again when the cached copy is older (see final_dataset); with
+    ``cached_only`` only the shared cache is read and such a copy is refused.
+    Datasets with an unknown fetch time (legacy CSVs) or session end are
+    refused unless ``allow_unverified``. Returns {kind: rows}.
+    """
+    session_key = session["session_key"]
+    final = http_cache.final_after(session)
+    if final is not None and datetime.now(timezone.utc) < final:
+        raise ValueError(f"data is not final before {final.isoformat()}")
+    loaders = {"drivers": get_drivers_dataset, "laps": get_session_laps, "radio": get_team_radio_dataset}
+    frames = {}
+    for kind, load in loaders.items():
+        if cached_only:
+            df = dataset_store.read(kind, session_key)
+            stored_at = df.attrs.get("stored_at") if df is not None else None
+        else:
+            dataset = final_dataset(kind, session, load)
+            df, stored_at = (dataset.frame, dataset.stored_at) if dataset is not None else (None, None)
+        # Archív sa číta pred OpenF1 a nikto ho znovu nenapĺňa, neúplná kópia by v ňom zostala navždy
+        if df is not None and final is not None and stored_at is not None and stored_at < final.timestamp():
+            raise ValueError(f"{kind} were fetched before the session data was final")
+        if df is not None and (final is None or stored_at is None) and not allow_unverified:
+            raise ValueError(f"{kind} have an unknown fetch time or session end (see --allow-unverified)")
+        frames[kind] = df
+    if frames["drivers"] is None and frames["laps"] is None:
+        raise ValueError("no drivers or laps to archive")
+    return archive.ingest(session, **frames)
+
+
+def _warm_archive(session):
+    if archive is None:
+        return "skipped"
+    return sum(archive_session(session).values())
+
+
+def _warm_standings(session):
+    if session.get("session_type") != "Race":
+        return "skipped"
+    try:
+        season, round_num = current_round.refresh()
+    except RoundUnavailable:
+        return "skipped"
+    # Nový výsledok - zahodíme uložené tabuľky sezóny a hneď načítame novú
+    standings_service.invalidate(season)
+    get_standings_table(season, int(round_num), refresh=True, kind="constructors")
+    return len(get_standings_table(season, int(round_num), refresh=True))
+
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") not in ("0", "false", "no")
+
+# Po skončení session stiahne a uloží jej dáta skôr, než o ne požiada prvý návštevník
+warmup_scheduler = WarmupScheduler(
+    session_catalogue.sessions,
+    [
+        {"drivers": _warm_drivers},
+        {"laps": _warm_laps, "radio": _warm_radio, "race_control": _warm_race_control,
+         "standings": _warm_standings},
+        {"archive": _warm_archive},
+    ],
+    interval=float(os.environ.get("WARMUP_INTERVAL", 300)),
+    # Skôr ako http_cache.final_after by zahriate dáta neboli finálne (a nikto by ich znovu nestiahol)
+    settle=max(float(os.environ.get("WARMUP_SETTLE", http_cache.COMPLETED_AFTER)), http_cache.COMPLETED_AFTER),
+    workers=int(os.environ.get("WARMUP_WORKERS", 2)),
+)
+
+
+@app.before_request
+def start_warmup_scheduler():
+    # Spúšťa sa až v procese, ktorý obsluhuje requesty (po forku gunicorn workera), nie v CLI
+    if WARMUP_ENABLED:
+        warmup_scheduler.start()
+
+
+@app.route("/warmup_status", methods=["GET"])
+def warmup_status():
+    """Progress of the background warm-up of the current race weekend."""
+    return json_response(**warmup_scheduler.status())
+
+
+# --- CLI ---
+@app.cli.command("migrate-csv-cache")
+@click.option("--remove-csv", is_flag=True, help="Delete each CSV after it was converted.")
+def migrate_csv_cache_command(remove_csv):
+    """Converts legacy data/*.csv session caches to the columnar format."""
+    results = session_store.migrate_csv_cache(DATA_DIR, remove_csv=remove_csv, store=dataset_store)
+    for csv_path, arrow_path, error in results:
+        if error:
+            click.echo(f"FAILED {csv_path}: {error}", err=True)
+        else:
+            click.echo(f"{csv_path} -> {arrow_path}")
+    click.echo(f"Migrated {sum(1 for r in results if r[2] is None)}/{len(results)} files.")
+
+
+@app.cli.command("build-static")
+@click.option("--thumbnail-width", type=int, default=480, show_default=True, help="Width of circuit thumbnails.")
+def build_static_command(thumbnail_width):
+    """Fingerprints, precompresses and thumbnails static/ into static/dist/."""
+    manifest = build_static_assets(app.static_folder, thumbnail_width=thumbnail_width, progress=click.echo)
+    original = sum(a["bytes"] for a in manifest["assets"].values())
+    thumbs = sum(t["bytes"] for t in manifest["thumbnails"].values())
+    click.echo(f"{len(manifest['assets'])} assets ({original} B), {len(manifest['thumbnails'])} thumbnails ({thumbs} B).")
+
+
+@app.cli.command("warm-cache")
+@click.option("--session-key", "session_keys", type=int, multiple=True,
+              help="Session to warm (repeatable). Default: every ended session of the current weekend.")
+@click.option("--force", is_flag=True, help="Re-run tasks that already succeeded.")
+def warm_cache_command(session_keys, force):
+    """Prefetches and persists drivers, laps, radio, race control and standings."""
+    sessions = None
+    if session_keys:
+        sessions = [session_catalogue.get(key) or {"session_key": key} for key in session_keys]
+    results = warmup_scheduler.warm(sessions, force=force)
+    if not results:
+        click.echo("Nothing to warm.")
+    for session_key, status in results.items():
+        click.echo(f"{session_key} {status['session_name'] or ''}: {status['state']}")
+        for name, task in status["tasks"].items():
+            line = f"  {name:<13}{task['state']:<8}{task.get('seconds', 0):>8.2f}s  {task.get('detail', '')}"
+            click.echo(line + (f"  {task['error']}" if task.get("error") else ""))
+    if any(status["state"] == "failed" for status in results.values()):
+        raise SystemExit(1)
+
+
+@app.cli.command("archive-ingest")
+@click.option("--session-key", "session_keys", type=int, multiple=True, help="Session to ingest (repeatable).")
+@click.option("--season", "seasons", type=int, multiple=True,
+              help="Every finished session of a season in the catalogue (repeatable).")
+@click.option("--cached-only", is_flag=True, help="Use only datasets already in the session cache, never OpenF1.")
+@click.option("--skip-archived", is_flag=True, help="Leave sessions that are already archived alone.")
+@click.option("--allow-unverified", is_flag=True,
+              help="Also archive datasets that may be partial: unknown fetch time (legacy CSVs) or session end.")
+def archive_ingest_command(session_keys, seasons, cached_only, skip_archived, allow_unverified):
+    """
+    Bulk-loads finished sessions into the season archive. Default: every
+    session with a cached dataset in data/ (Arrow files and legacy CSVs).
+    """
+    if archive is None:
+        raise click.ClickException("The archive is disabled (ARCHIVE_PATH is empty).")
+    try:
+        catalogue = {s["session_key"]: s for s in session_catalogue.sessions()}
+    except Exception as e:
+        click.echo(f"Session catalogue unavailable ({e}), archiving without session metadata.", err=True)
+        catalogue = {}
+    keys = list(session_keys)
+    if seasons:
+        keys += [key for key, s in catalogue.items() if s.get("year") in seasons and http_cache.session_end(s)]
+    if not session_keys and not seasons:
+        keys = session_store.cached_session_keys(DATA_DIR)
+
+    started = time.perf_counter()
+    archived = failed = 0
+    for session_key in sorted(set(keys)):
+        session = catalogue.get(session_key) or {"session_key": session_key}
+        if session.get("date_end") and not http_cache.session_end(session):
+            click.echo(f"{session_key}: not finished, skipped")
+            continue
+        if skip_archived and archive.has_session(session_key):
+            continue
+        try:
+            rows = archive_session(session, cached_only=cached_only, allow_unverified=allow_unverified)
+        except Exception as e:
+            failed += 1
+            click.echo(f"FAILED {session_key}: {e}", err=True)
+            continue
+        archived += 1
+        label = f"{session_key} {session['session_name']}" if session.get("session_name") else str(session_key)
+        click.echo(f"{label}: "
+                   + ", ".join(f"{count} {kind}" for kind, count in rows.items()))
+    click.echo(f"Archived {archived} sessions in {time.perf_counter() - started:.1f}s ({archive.path}).")
+    if failed:
+        raise SystemExit(1)
+
+
+@app.cli.group("fastf1-cache")
+def fastf1_cache_group():
+    """Inspect and manage the FastF1/Ergast on-disk cache."""
+
+
+@fastf1_cache_group.command("info")
+def fastf1_cache_info_command():
+    """Shows the cache directory, its size and budget."""
+    fastf1_cache.fastf1()
+    info = fastf1_cache.usage()
+    click.echo(f"Directory:  {info['cache_dir']}{' (offline)' if info['offline'] else ''}")
+    click.echo(f"Size:       {info['bytes'] / 2**20:.1f} MB of {info['max_bytes'] / 2**20:.0f} MB")
+    click.echo(f"HTTP cache: {info['http_cache_bytes'] / 2**20:.1f} MB, {info['http_responses']} responses")
+    for season, size in info["seasons"].items():
+        click.echo(f"  {season:<10}{size / 2**20:8.1f} MB")
+
+
+@fastf1_cache_group.command("prune")
+@click.option("--max-mb", type=float, default=None, help="Budget to prune to (default FASTF1_CACHE_MB).")
+def fastf1_cache_prune_command(max_mb):
+    """Evicts least recently used cache entries until the cache fits the budget."""
+    fastf1_cache.fastf1()
+    result = fastf1_cache.prune(None if max_mb is None else int(max_mb * 2**20))
+    click.echo(f"Removed {result['files_removed']} files, freed {result['bytes_freed'] / 2**20:.1f} MB"
+               + (f" (HTTP responses older than {result['http_pruned_older_than']})"
+                  if result["http_pruned_older_than"] else "")
+               + f"; cache is now {result['bytes'] / 2**20:.1f} MB.")
+
+
+@fastf1_cache_group.command("populate")
+@click.argument("season", type=int)
+@click.option("--round", "rounds", type=int, multiple=True, help="Only these rounds (repeatable).")
+def fastf1_cache_populate_command(season, rounds):
+    """Pre-fetches the schedule and standings of a season into the cache."""
+    calls = fastf1_cache.populate(season, list(rounds) or None, progress=click.echo)
+    click.echo(f"Done, {calls} lookups.")
+
+
+# --- Startup ---
+def create_app(preload=None):
+    """
+    Startup path for WSGI servers (``gunicorn -c gunicorn.conf.py``, which
+    calls ``app:create_app()``): resolves the current season/round once and,
+    when preloading (PRELOAD_HEAVY, default on), imports fastf1 and opens its
+    managed cache up front, so
+    workers forked from a preloading master start warm. Without preload the
+    heavy imports happen lazily on first use.
+    """
+    if preload is None:
+        preload = os.environ.get("PRELOAD_HEAVY", "1") not in ("0", "false", "no")
+    if preload:
+        fastf1_cache.fastf1()
+        season, round_num = get_season_round()
+        logger.info("Startup: season %s, round %s", season, round_num)
+    return app
+
+
+def after_fork():
+    """
+    Called in every forked worker (gunicorn post_fork): drops HTTP connections
+    (and the FastF1 cache and archive database handles) inherited from the master, so
+    workers never share a socket; fastf1_cache reopens the cache per process.
+    """
+    openf1_client.client.close()
+    dataset_store.backend.close()
+    if archive is not None:
+        archive.close()
+    req = sys.modules.get("fastf1.req")
+    if req is not None:
+        for session in (req.Cache._requests_session, req.Cache._requests_session_cached):
+            if session is not None:
+                session.close()
+
+
 if __name__ == "__main__":
+    create_app()
     app.run()
\ No newline at end of file
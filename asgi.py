@@ -0,0 +1,253 @@
+"""
+ASGI serving mode: ``uvicorn asgi:application --workers 2``
+
+The Flask app stays the single source of routes and templates; this module
+only changes how requests are executed:
+
+* ``async def`` views (those that wait on OpenF1, e.g. /live and
+  /live_drivers) run natively on the server's event loop with their own
+  request context, and their upstream calls go through one pooled
+  ``httpx.AsyncClient`` (openf1_client.AsyncOpenF1Client) - a request waiting
+  on OpenF1 holds no thread, and independent calls run concurrently;
+* /live_feed (Server-Sent Events) is served by the async variant registered
+  in ``app.ASYNC_STREAM_VIEWS``: its body is an async generator streamed on
+  the loop, so an open viewer holds no thread and is not subject to
+  ``LIVE_FEED_MAX_STREAMS``;
+* all other views run on a thread pool of ``ASGI_THREADS`` threads through a
+  small WSGI bridge, exactly as under gunicorn.
+
+Under gunicorn (``gunicorn -c gunicorn.conf.py``) the same async views run
+through Flask's own async support, one request per thread, and their
+upstream calls are still made concurrently.
+"""
+import asyncio
+import inspect
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+import app as flask_module
+import openf1_client
+
+flask_app = flask_module.create_app()
+THREADS = int(os.environ.get("ASGI_THREADS", 64))
+
+
+def build_environ(scope, body):
+    """WSGI environ of an ASGI HTTP request; ``body`` is a file-like object with the request body."""
+    script_name = scope.get("root_path", "").encode("utf-8").decode("latin-1")
+    path_info = scope["path"].encode("utf-8").decode("latin-1")
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return io.BytesIO(b"".join(chunks))
+
+
+def _start_message(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]) if isinstance(status, str) else int(status),
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    }
+
+
+class FlaskASGI:
+    """ASGI application around the Flask app (see the module docstring)."""
+
+    def __init__(self, app, threads=THREADS):
+        self.app = app
+        self.threads = threads
+        self.executor = None
+        self.async_client = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if self.executor is None:  # server bez lifespan udalostí
+                await self._startup()
+            environ = build_environ(scope, await read_body(receive))
+            view = self._async_view(environ)
+            if view is not None:
+                await self._run_async_view(environ, *view, receive, send)
+            else:
+                await self._run_wsgi(environ, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _startup(self):
+        loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="asgi")
+        # asyncio.to_thread v async views používa predvolený executor slučky
+        loop.set_default_executor(self.executor)
+        self.async_client = openf1_client.AsyncOpenF1Client.from_env()
+        openf1_client.install_async_client(self.async_client, loop)
+
+    async def _shutdown(self):
+        openf1_client.install_async_client(None, None)
+        if self.async_client is not None:
+            await self.async_client.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self._startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _async_view(self, environ):
+        """(view function, view args) when the URL maps to an ``async def`` view, else None."""
+        adapter = self.app.url_map.bind_to_environ(environ)
+        try:
+            endpoint, args = adapter.match()
+        except HTTPException:
+            return None
+        view = flask_module.ASYNC_STREAM_VIEWS.get(endpoint) or self.app.view_functions.get(endpoint)
+        return (view, args) if inspect.iscoroutinefunction(view) else None
+
+    async def _run_async_view(self, environ, view, args, receive, send):
+        """Flask's full_dispatch_request with the view awaited on this loop."""
+        app = self.app
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.finalize_request(app.handle_exception(e), from_error_handler=True)
+            headers = list(response.headers.items())
+            status = response.status_code
+            # Telo async view zo ASYNC_STREAM_VIEWS je async generátor - ten sa streamuje až mimo kontextu
+            stream = response.response if inspect.isasyncgen(response.response) else None
+            body = response.get_data() if stream is None else b""
+        await send(_start_message(status, headers))
+        if stream is not None:
+            await self._send_stream(stream, receive, send)
+        else:
+            await send({"type": "http.response.body", "body": body})
+
+    async def _send_stream(self, stream, receive, send):
+        """Sends the chunks of an async-generator body until it ends or the client disconnects."""
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        async def forward():
+            async for chunk in stream:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        watcher = asyncio.create_task(watch_disconnect())
+        sender = asyncio.create_task(forward())
+        try:
+            await asyncio.wait({watcher, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if sender.done():
+                sender.result()
+        finally:
+            watcher.cancel()
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            await stream.aclose()
+
+    async def _run_wsgi(self, environ, receive, send):
+        """Runs the WSGI app in the thread pool and forwards the (possibly streamed) response."""
+        loop = asyncio.get_running_loop()
+        # uvicorn po odpojení klienta zahadzuje send() bez chyby - nekonečný stream (SSE) treba zastaviť sami
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started[:] = [status, headers]
+
+            result = self.app.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if disconnected.is_set():
+                        return
+                    if not chunk:
+                        continue
+                    if started and started[0] is not None:
+                        send_from_thread(_start_message(*started))
+                        started[0] = None
+                    send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            if started and started[0] is not None:
+                send_from_thread(_start_message(*started))
+            send_from_thread({"type": "http.response.body", "body": b""})
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await loop.run_in_executor(self.executor, run)
+        finally:
+            watcher.cancel()
+
+
+application = FlaskASGI(flask_app)
@@ -0,0 +1,105 @@
+"""
+Cross-session queries: the season archive against loading every session file.
+
+Builds ``--sessions`` synthetic sessions (drivers, laps, radio) in a temp
+directory, once as per-session Arrow files of the session cache and once
+ingested into a SeasonArchive, then answers the same questions both ways:
+
+* best laps of one driver across all sessions,
+* all laps of one driver in a date window,
+* all radio of one driver.
+
+    python benchmarks/bench_archive.py --sessions 60 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from mock_openf1 import (DRIVER_NUMBERS, SESSION_START, make_drivers, make_laps, make_sessions,  # noqa: E402
+                         make_team_radio)
+
+import season_archive  # noqa: E402
+import session_store  # noqa: E402
+
+
+def timeit(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--laps", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    driver = DRIVER_NUMBERS[0]
+    sessions = make_sessions(args.sessions)
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = season_archive.SeasonArchive(os.path.join(tmp, "archive.db"))
+        ingest_seconds = 0.0
+        for i, session in enumerate(sessions):
+            key = session["session_key"]
+            frames = {
+                "drivers": pd.DataFrame(make_drivers(session_key=key)),
+                "laps": pd.DataFrame(make_laps(laps=args.laps, session_key=key, seed=i)),
+                "radio": pd.DataFrame(make_team_radio(session_key=key, seed=i)),
+            }
+            for kind, df in frames.items():
+                session_store.write_dataset(tmp, kind, key, df)
+            started = time.perf_counter()
+            archive.ingest(session, **frames)
+            ingest_seconds += time.perf_counter() - started
+        keys = [s["session_key"] for s in sessions]
+        print(f"{args.sessions} sessions, {args.sessions * args.laps * 20} laps; "
+              f"ingest {ingest_seconds * 1000 / args.sessions:.1f} ms per session, "
+              f"archive {archive.stats()['bytes'] / 2**20:.1f} MB")
+
+        since = (SESSION_START + timedelta(minutes=30)).isoformat()
+        until = (SESSION_START + timedelta(minutes=60)).isoformat()
+
+        def files_best():
+            frames = [session_store.read_dataset(tmp, "laps", key) for key in keys]
+            laps = pd.concat(frames, ignore_index=True)
+            laps = laps[(laps["driver_number"] == driver) & laps["lap_duration"].notna() & ~laps["is_pit_out_lap"]]
+            return laps.nsmallest(10, "lap_duration")
+
+        def files_window():
+            frames = [session_store.read_dataset(tmp, "laps", key) for key in keys]
+            laps = pd.concat(frames, ignore_index=True)
+            return laps[(laps["driver_number"] == driver) & (laps["date_start"] >= since) & (laps["date_start"] < until)]
+
+        def files_radio():
+            frames = [session_store.read_dataset(tmp, "radio", key) for key in keys]
+            radio = pd.concat(frames, ignore_index=True)
+            return radio[radio["driver_number"] == driver]
+
+        queries = [
+            ("best 10 laps of a driver", files_best, lambda: archive.laps(driver, best=True, limit=10)),
+            ("laps in a date window", files_window, lambda: archive.laps(driver, since=since, until=until)),
+            ("all radio of a driver", files_radio, lambda: archive.team_radio(driver)),
+        ]
+        print(f"{'query':<28}{'rows':>6}{'files ms':>10}{'archive ms':>12}")
+        for name, files, query in queries:
+            files_ms, expected = timeit(files, args.repeat)
+            archive_ms, result = timeit(query, args.repeat)
+            assert len(expected) == len(result), (name, len(expected), len(result))
+            print(f"{name:<28}{len(result):>6}{files_ms:>10.1f}{archive_ms:>12.2f}")
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
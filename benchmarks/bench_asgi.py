@@ -0,0 +1,152 @@
+"""
+Load test: sync gunicorn (gthread) against the ASGI mode (uvicorn asgi:application).
+
+Both servers run the same app with the same number of worker processes
+against the OpenF1 stand-in (in its own process) with ``--latency`` seconds
+added to every upstream response. ``--clients`` concurrent clients request
+``--paths`` in a loop for ``--duration`` seconds; reported are throughput,
+latency percentiles and errors (non-200 responses, timeouts).
+
+    python benchmarks/bench_asgi.py --clients 200 --latency 0.3 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def server_command(mode, port, workers, threads):
+    if mode == "sync":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                "--workers", str(workers), "--threads", str(threads), "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port), "--workers", str(workers),
+            "--no-access-log", "--log-level", "warning"]
+
+
+async def fetch(reader, writer, host, path):
+    """One keep-alive HTTP/1.1 GET on an open connection -> status. (httpx costs more CPU than the servers at 200 connections.)"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip, br\r\n\r\n".encode("ascii"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+
+async def run_load(base, paths, clients, duration, timeout):
+    host, port = base.split("//", 1)[1].split(":")
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(i):
+        nonlocal errors
+        n = i
+        connection = None
+        while time.perf_counter() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(host, int(port))
+                ok = await asyncio.wait_for(fetch(*connection, host, path), timeout) == 200
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                ok = False
+                if connection is not None:
+                    connection[1].close()
+                connection = None
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        if connection is not None:
+            connection[1].close()
+
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    return latencies, errors
+
+
+def percentile(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] * 1000 if len(values) > 1 else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds added to every upstream response")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=2, help="worker processes of both servers")
+    parser.add_argument("--threads", type=int, default=16, help="threads per gunicorn worker")
+    parser.add_argument("--paths", default="/live_drivers,/live")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+    paths = args.paths.split(",")
+
+    upstream_port = free_port()
+    upstream = subprocess.Popen([sys.executable, os.path.join(ROOT, "benchmarks", "mock_openf1.py"),
+                                 "--port", str(upstream_port), "--latency", str(args.latency)],
+                                stdout=subprocess.DEVNULL)
+    env = dict(os.environ, OPENF1_BASE_URL=f"http://127.0.0.1:{upstream_port}/v1", WARMUP_ENABLED="0",
+               PRELOAD_HEAVY="0", PYTHONPATH=ROOT)
+    print(f"{args.clients} clients, {args.duration:.0f} s, upstream latency {args.latency * 1000:.0f} ms, "
+          f"{args.workers} workers, paths {', '.join(paths)}")
+    print(f"{'mode':6} {'requests':>9} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    try:
+        wait_for(f"http://127.0.0.1:{upstream_port}/v1/sessions")
+        for mode in args.modes.split(","):
+            port = free_port()
+            server = subprocess.Popen(server_command(mode, port, args.workers, args.threads), cwd=ROOT, env=env,
+                                      stdout=subprocess.DEVNULL)
+            try:
+                base = f"http://127.0.0.1:{port}"
+                wait_for(base + "/get_sessions")
+                for path in paths:  # katalóg sessions a cache v každom workeri
+                    httpx.get(base + path, timeout=args.timeout)
+                latencies, errors = asyncio.run(run_load(base, paths, args.clients, args.duration, args.timeout))
+                print(f"{mode:6} {len(latencies):9d} {len(latencies) / args.duration:8.1f} "
+                      f"{percentile(latencies, 50):6.0f} ms {percentile(latencies, 95):6.0f} ms "
+                      f"{percentile(latencies, 99):6.0f} ms {errors:7d}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        upstream.terminate()
+        upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Championship engine check and benchmark.
+
+1. Exhaustive check on small seasons: for random standings (points and full
+   countback) every possible outcome of the remaining events is enumerated -
+   any subset of cars classified, in any order, with or without the fastest
+   lap point - and the set of possible champions is compared with
+   championship.evaluate (max points, eliminated, clinched), for drivers and
+   for two-car constructors.
+2. Timing of the old row-wise calculate_who_can_win against
+   championship.outlook on a 20-driver table, and of evaluate on a large field.
+
+    python benchmarks/bench_championship.py --cases 300 --repeat 200
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import championship  # noqa: E402
+
+SMALL_SYSTEM = {"race": [3, 2, 1], "sprint": [2, 1], "fastest_lap": 1}
+BASE = 64  # základ pre zakódovanie (body, countback) do jedného čísla
+
+
+def _event_outcomes(kind, teams, n_teams, places):
+    """Point and countback deltas (per team) of every possible result of one event."""
+    table = SMALL_SYSTEM[kind]
+    cars = range(len(teams))
+    points, counts = [], []
+    for length in range(min(len(table), len(teams)) + 1):
+        for order in itertools.permutations(cars, length):
+            fastest = [None]
+            if kind == "race" and SMALL_SYSTEM["fastest_lap"]:
+                fastest += list(order)
+            for fl in fastest:
+                p = np.zeros(n_teams, dtype=np.int64)
+                c = np.zeros((n_teams, places), dtype=np.int64)
+                for place, car in enumerate(order):
+                    p[teams[car]] += table[place]
+                    if kind == "race":
+                        c[teams[car], place] += 1
+                if fl is not None:
+                    p[teams[fl]] += SMALL_SYSTEM["fastest_lap"]
+                points.append(p)
+                counts.append(c)
+    return np.array(points), np.array(counts)
+
+
+def brute_force(points, countback, events, teams):
+    """(max_points, can_win, clinched) by enumerating every outcome."""
+    n_teams, places = countback.shape
+    total_p = points[None, :]
+    total_c = countback[None, :, :]
+    for kind in events:
+        p, c = _event_outcomes(kind, teams, n_teams, places)
+        total_p = (total_p[:, None, :] + p[None, :, :]).reshape(-1, n_teams)
+        total_c = (total_c[:, None, :, :] + c[None, :, :, :]).reshape(-1, n_teams, places)
+    weights = BASE ** np.arange(places - 1, -1, -1)
+    keys = total_p * BASE ** places + (total_c * weights).sum(axis=2)
+    best = keys == keys.max(axis=1, keepdims=True)
+    unique = best.sum(axis=1) == 1
+    return total_p.max(axis=0), best.any(axis=0), (best & unique[:, None]).all(axis=0)
+
+
+def check_small_seasons(cases, rng):
+    failures = 0
+    for case in range(cases):
+        constructors = case % 2 == 1
+        if constructors:
+            n_teams, teams = 2, [0, 0, 1, 1]
+        else:
+            n_teams = rng.randint(2, 4)
+            teams = list(range(n_teams))
+        events = [rng.choice(["race", "race", "sprint"]) for _ in range(rng.randint(0, 2))]
+        points = np.array([rng.randint(0, 12) for _ in range(n_teams)], dtype=np.int64)
+        countback = np.array([[rng.randint(0, 2) for _ in range(3)] for _ in range(n_teams)], dtype=np.int64)
+
+        cars = 2 if constructors else 1
+        event_max = championship.event_maximum([(kind, 0) for kind in events], SMALL_SYSTEM, cars=cars)
+        races = events.count("race")
+        result = championship.evaluate(points, countback, event_max, races, cars=cars)
+        max_points, can_win, clinched = brute_force(points, countback, events, teams)
+
+        if not (np.array_equal(result["max_points"], max_points)
+                and np.array_equal(~result["eliminated"], can_win)
+                and np.array_equal(result["clinched"], clinched)):
+            failures += 1
+            print(f"MISMATCH case {case}: points={points.tolist()} countback={countback.tolist()} "
+                  f"events={events} teams={teams}")
+            print(f"  engine  max={result['max_points'].tolist()} can_win={(~result['eliminated']).tolist()} "
+                  f"clinched={result['clinched'].tolist()}")
+            print(f"  brute   max={max_points.tolist()} can_win={can_win.tolist()} clinched={clinched.tolist()}")
+    return failures
+
+
+def legacy_who_can_win(driver_standings, remaining_sprints, remaining_conventional):
+    max_points = remaining_sprints * (8 + 25) + remaining_conventional * 25
+    leader_points = int(driver_standings.loc[0]["points"])
+    driver_standings["can_win"] = driver_standings.apply(
+        lambda row: "Yes" if int(row["points"]) + max_points >= leader_points else "No", axis=1
+    )
+    return driver_standings[["position", "givenName", "familyName", "points", "can_win"]]
+
+
+def make_standings(count, rng):
+    points = sorted((rng.randint(0, 400) for _ in range(count)), reverse=True)
+    return pd.DataFrame({
+        "position": [str(i + 1) for i in range(count)],
+        "givenName": [f"Driver{i}" for i in range(count)],
+        "familyName": [f"No{i}" for i in range(count)],
+        "points": [str(p) for p in points],
+        "wins": [rng.randint(0, 5) for _ in range(count)],
+    })
+
+
+def make_schedule():
+    formats = ["conventional", "conventional", "sprint_qualifying"] * 8
+    return pd.DataFrame({"RoundNumber": range(1, 25), "EventFormat": formats})
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=300, help="random small seasons to check exhaustively")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--field", type=int, default=100000, help="competitors in the scaling run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    failures = check_small_seasons(args.cases, rng)
+    print(f"exhaustive check: {args.cases - failures}/{args.cases} small seasons match")
+
+    standings = make_standings(20, rng)
+    schedule = make_schedule()
+    legacy = timed(lambda: legacy_who_can_win(standings.copy(), 4, 8), args.repeat)
+    engine = timed(lambda: championship.outlook(standings, schedule, 2025, 12), args.repeat)
+    points20 = pd.to_numeric(standings["points"]).to_numpy()
+    wins20 = standings[["wins"]].to_numpy()
+    events = championship.remaining_events(schedule, 12)
+    event_max = championship.event_maximum(events, championship.points_system(2025))
+    core = timed(lambda: championship.evaluate(points20, wins20, event_max, 8), args.repeat)
+    print(f"20 drivers, legacy apply      {legacy:8.3f} ms")
+    print(f"20 drivers, outlook()         {engine:8.3f} ms (DataFrame in/out)")
+    print(f"20 drivers, evaluate()        {core:8.3f} ms")
+
+    points = np.array([rng.randint(0, 800) for _ in range(args.field)])
+    wins = np.array([[rng.randint(0, 20)] for _ in range(args.field)])
+    large_max = np.array([26] * 16 + [8] * 4)
+    large = timed(lambda: championship.evaluate(points, wins, large_max, 16), max(1, args.repeat // 20))
+    print(f"{args.field} competitors, evaluate() {large:8.3f} ms")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
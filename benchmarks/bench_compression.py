@@ -0,0 +1,93 @@
+"""
+Bandwidth and time-to-first-byte of compressed responses and built assets.
+
+Runs the app on a local HTTP server (OpenF1 replaced by the stand-in) and
+fetches every URL with ``Accept-Encoding: identity`` (what was sent before)
+and with gzip / br. For static files it compares the plain ``/static`` file
+with the fingerprinted, precompressed ``/assets`` copy and the circuit image
+with its thumbnail. Bytes are measured on the wire (before decompression);
+TTFB is the median time until the response headers arrived.
+
+Run ``flask build-static`` first for the static part.
+
+    python benchmarks/bench_compression.py --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from mock_openf1 import SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+
+def measure(url, encoding, repeat):
+    timings, size = [], 0
+    with requests.Session() as session:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = session.get(url, headers={"Accept-Encoding": encoding}, stream=True)
+            timings.append(time.perf_counter() - started)
+            size = len(response.raw.read(decode_content=False))
+            response.close()
+    return size, statistics.median(timings) * 1000, response.headers.get("Content-Encoding", "-")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=1500, help="sessions in the stand-in catalogue")
+    args = parser.parse_args()
+
+    from mock_openf1 import make_drivers, make_laps, make_positions, make_race_control, make_sessions, make_team_radio
+    datasets = {"sessions": make_sessions(args.sessions), "drivers": make_drivers(), "laps": make_laps(),
+                "team_radio": make_team_radio(), "race_control": make_race_control(), "position": make_positions()}
+    with MockOpenF1Server(datasets=datasets) as upstream:
+        os.environ["OPENF1_BASE_URL"] = upstream.base_url
+        os.environ.setdefault("WARMUP_ENABLED", "0")
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        import app
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server("127.0.0.1", 0, app.app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        dynamic = ["/get_sessions", f"/driver_laps?session_key={SESSION_KEY}&driver_number=44",
+                   f"/team_radio_data?session_key={SESSION_KEY}", f"/get_drivers?session_key={SESSION_KEY}"]
+        print(f"{'url':58} {'encoding':8} {'bytes':>9} {'ttfb':>9}")
+        for path in dynamic:
+            requests.get(base + path)  # studená cache
+            for encoding in ("identity", "gzip", "br"):
+                size, ttfb, used = measure(base + path, encoding, args.repeat)
+                print(f"{path:58} {used:8} {size:9d} {ttfb:7.2f} ms")
+
+        app.asset_manifest.load()
+        pairs = [("style.css", "style.css"), ("logo_main.png", "logo_main.png"),
+                 ("circuits/Monza.avif", "circuits/Monza.avif")]
+        print()
+        for label, path in pairs:
+            plain = measure(f"{base}/static/{path}", "identity", args.repeat)
+            print(f"{'/static/' + path:58} {plain[2]:8} {plain[0]:9d} {plain[1]:7.2f} ms")
+            built = app.asset_manifest.url(path)
+            if built:
+                result = measure(base + built, "gzip, br", args.repeat)
+                print(f"{built:58} {result[2]:8} {result[0]:9d} {result[1]:7.2f} ms  (immutable)")
+            thumb = app.asset_manifest.thumbnail(path)
+            if thumb:
+                result = measure(base + thumb[0], "gzip, br", args.repeat)
+                print(f"{thumb[0]:58} {result[2]:8} {result[0]:9d} {result[1]:7.2f} ms  (thumbnail, {thumb[1]} px)")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
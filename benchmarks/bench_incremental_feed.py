@@ -0,0 +1,141 @@
+"""
+Live laps through the incremental feed (incremental_store.py) with drivers
+whose laps interleave, the way OpenF1 publishes them: a lap appears when it
+starts, without ``lap_duration``, and is completed when it ends - by which
+time other drivers have started later laps.
+
+Replays ``--drivers`` x ``--laps`` against an in-memory OpenF1 stand-in,
+polling every ``--interval`` seconds of race time, once with the plain date
+cursor and once re-requesting open laps. Then the same client polls
+``--workers`` worker processes (each with its own buffer, refreshed at its
+own pace, one of them periodically recreated) in random order, like behind
+gunicorn. Checks that every lap reaches the client with its duration; exits
+with 1 when a check fails.
+
+    python benchmarks/bench_incremental_feed.py --drivers 20 --laps 50
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental_store import FeedSpec, IncrementalStore  # noqa: E402
+
+START = datetime(2024, 9, 1, 13, 0, tzinfo=timezone.utc)
+
+
+def make_laps(drivers, laps, seed=1):
+    """[(start, end, driver_number, lap_number, duration)] with per-driver pace, so laps interleave."""
+    rng = random.Random(seed)
+    rows = []
+    for driver in range(1, drivers + 1):
+        t = START + timedelta(seconds=rng.uniform(0, 3))
+        pace = 80 + rng.random() * 2
+        for lap in range(1, laps + 1):
+            duration = round(pace + rng.gauss(0, 0.3), 3)
+            rows.append((t, t + timedelta(seconds=duration), driver, lap, duration))
+            t += timedelta(seconds=duration)
+    return rows
+
+
+class Upstream:
+    """OpenF1 /laps as seen at time ``now``, with the >= / > date_start filters of the client."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.now = START
+        self.returned = 0
+
+    def fetch(self, endpoint, session_key, filters):
+        records = []
+        for start, end, driver, lap, duration in self.rows:
+            if start > self.now:
+                continue
+            record = {"driver_number": driver, "lap_number": lap, "date_start": start.isoformat(),
+                      "lap_duration": duration if end <= self.now else None}
+            if all(self._match(record, f) for f in filters or ()):
+                records.append(record)
+        self.returned += len(records)
+        return records
+
+    @staticmethod
+    def _match(record, condition):
+        field, op, value = condition
+        return record[field] >= value if op == ">=" else record[field] > value
+
+
+def replay(rows, spec, interval, clock):
+    upstream = Upstream(rows)
+    store = IncrementalStore(upstream.fetch, {"laps": spec}, min_interval=0, clock=clock)
+    latest = {}
+    cursor = 0
+    end = max(r[1] for r in rows) + timedelta(seconds=interval)
+    while upstream.now <= end:
+        records, cursor = store.get("laps", 1, cursor)
+        for record in records:
+            latest[(record["driver_number"], record["lap_number"])] = record
+        upstream.now += timedelta(seconds=interval)
+    missing = sum(1 for record in latest.values() if record["lap_duration"] is None)
+    return missing, upstream.returned
+
+
+def replay_workers(rows, spec, interval, workers, seed=2):
+    """Like replay(), but every poll lands on a random worker; returns (laps without duration, laps never seen)."""
+    rng = random.Random(seed)
+    upstream = Upstream(rows)
+    clock = lambda: (upstream.now - START).total_seconds()  # noqa: E731
+    stores = [IncrementalStore(upstream.fetch, {"laps": spec}, min_interval=interval * rng.uniform(1, 3),
+                               clock=clock) for _ in range(workers)]
+    latest = {}
+    cursor = "0"
+    end = max(r[1] for r in rows) + timedelta(seconds=interval * 4)
+    polls = 0
+    while upstream.now <= end:
+        store = rng.choice(stores)
+        if polls % 50 == 49:
+            stores[0]._feeds.clear()  # nečinný feed zahodený a vytvorený znova
+        records, cursor = store.get("laps", 1, cursor)
+        for record in records:
+            latest[(record["driver_number"], record["lap_number"])] = record
+        upstream.now += timedelta(seconds=interval)
+        polls += 1
+    missing = sum(1 for record in latest.values() if record["lap_duration"] is None)
+    return missing, len(rows) - len(latest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds of race time between polls")
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_laps(args.drivers, args.laps)
+    clock = iter(range(10 ** 9)).__next__
+    ok = True
+    specs = {
+        "date cursor": FeedSpec("date_start", ("driver_number", "lap_number")),
+        "open laps": FeedSpec("date_start", ("driver_number", "lap_number"),
+                              is_open=lambda lap: lap.get("lap_duration") is None),
+    }
+    print(f"{args.drivers} drivers x {args.laps} laps, poll every {args.interval:g} s")
+    missing = {}
+    for name, spec in specs.items():
+        missing[name], returned = replay(rows, spec, args.interval, clock)
+        print(f"{name:12} laps without duration: {missing[name]:5d}, records fetched: {returned}")
+    ok &= missing["open laps"] == 0
+
+    missing, unseen = replay_workers(rows, specs["open laps"], args.interval, args.workers)
+    print(f"{args.workers} workers:    laps without duration: {missing:5d}, laps never delivered: {unseen}")
+    ok &= missing == 0 and unseen == 0
+    if not ok:
+        print("FAILED")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Multi-driver lap comparison: one /lap_analytics request against one
+/driver_laps request per driver (what the browser had to do before).
+
+Reports wall time and bytes of both on a warm laps cache, the cold
+computation of lap_analytics.analyze() for the whole session and the warm
+(memoized) response.
+
+    python benchmarks/bench_lap_analytics.py --drivers 20 --laps 70
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_openf1 import DRIVER_NUMBERS, SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=70)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with MockOpenF1Server(drivers=args.drivers, laps=args.laps) as upstream:
+        os.environ["OPENF1_BASE_URL"] = upstream.base_url
+        os.environ.setdefault("WARMUP_ENABLED", "0")
+        os.environ.setdefault("CACHE_BACKEND", f"file://{tempfile.mkdtemp(prefix='bench_lap_analytics_')}")
+        import app
+        import lap_analytics
+
+        client = app.app.test_client()
+        dataset = app.get_session_laps(SESSION_KEY)
+        _, analyze_ms = timed(lambda: lap_analytics.analyze(dataset.frame), args.repeat)
+        print(f"analyze(): {len(dataset.frame)} laps, {args.drivers} drivers: {analyze_ms:.2f} ms")
+
+        numbers = DRIVER_NUMBERS[:args.drivers]
+
+        def per_driver():
+            return sum(len(client.get(f"/driver_laps?session_key={SESSION_KEY}&driver_number={n}").data)
+                       for n in numbers)
+
+        def batch():
+            return len(client.get(f"/lap_analytics?session_key={SESSION_KEY}").data)
+
+        per_driver()
+        batch()
+        for label, fn, requests in (("/driver_laps per driver", per_driver, len(numbers)),
+                                    ("/lap_analytics (memoized)", batch, 1)):
+            size, ms = timed(fn, args.repeat)
+            print(f"{label:28} {requests:3d} requests {ms:8.2f} ms {size:9d} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Compares the cold-cache lap fetch modes of app.fetch_session_laps against the
+local mock OpenF1 server with injected latency.
+
+    python benchmarks/bench_lap_fetch.py --latency 0.15 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_openf1 import SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds of latency per upstream request")
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with MockOpenF1Server(latency=args.latency, drivers=args.drivers, laps=args.laps) as server:
+        os.environ["OPENF1_BASE_URL"] = server.base_url
+        import app
+
+        drivers = server.datasets["drivers"]
+        print(f"{args.drivers} drivers x {args.laps} laps, {args.latency * 1000:.0f} ms upstream latency")
+        print(f"{'mode':<12}{'median s':>10}{'min s':>10}{'requests':>10}{'rows':>8}")
+        for mode in ("sequential", "concurrent", "bulk"):
+            timings = []
+            for _ in range(args.repeat):
+                server.reset_counts()
+                started = time.perf_counter()
+                df = app.fetch_session_laps(SESSION_KEY, drivers, mode=mode)
+                timings.append(time.perf_counter() - started)
+            print(f"{mode:<12}{statistics.median(timings):>10.3f}{min(timings):>10.3f}"
+                  f"{server.requests['laps']:>10}{len(df):>8}")
+
+
+if __name__ == "__main__":
+    main()
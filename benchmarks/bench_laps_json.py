@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the /driver_laps serialization on a full race laps frame
+(20 drivers x 60 laps = 1,200 rows): the old per-column replace/apply +
+to_dict("records") + jsonify path against json_encoding.frame_to_json.
+
+    python benchmarks/bench_laps_json.py --repeat 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+
+import session_store  # noqa: E402
+from json_encoding import json_response  # noqa: E402
+from mock_openf1 import make_laps  # noqa: E402
+
+
+def legacy_encode(df):
+    df = df.copy()
+    for col in df.columns:
+        df[col] = df[col].replace({np.nan: None})
+        if pd.api.types.is_timedelta64_dtype(df[col]):
+            df[col] = df[col].astype(str)
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].apply(lambda x: x.item() if pd.notna(x) and isinstance(x, np.number) else x)
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].apply(lambda x: x.isoformat() if pd.notna(x) else None)
+    columns = [c for c in df.columns if c != "lap_duration"]
+    return jsonify({"laps": df[columns].to_dict("records")}).get_data()
+
+
+def vectorized_encode(df):
+    columns = [c for c in df.columns if c != "lap_duration"]
+    return json_response(laps=df[columns]).get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=60)
+    args = parser.parse_args()
+
+    raw = pd.DataFrame(make_laps(args.drivers, args.laps))
+    df = session_store.to_frame(session_store.normalize("laps", raw))
+    app = Flask(__name__)
+
+    with app.app_context():
+        results = {}
+        for name, fn in (("legacy", legacy_encode), ("vectorized", vectorized_encode)):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                body = fn(df)
+                timings.append(time.perf_counter() - started)
+            results[name] = (statistics.median(timings) * 1000, len(body))
+
+    print(f"{len(df)} rows x {len(df.columns)} columns")
+    for name, (ms, size) in results.items():
+        print(f"{name:<12}{ms:>9.2f} ms{size:>10} bytes")
+    print(f"speedup     {results['legacy'][0] / results['vectorized'][0]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
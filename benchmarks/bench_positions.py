@@ -0,0 +1,76 @@
+"""
+Latest-position reduction on a synthetic 50k-row /v1/position feed: the old
+per-row datetime.fromisoformat loop against position_state.PositionState, both
+as one batch and as a live stream of small batches.
+
+    python benchmarks/bench_positions.py --rows 50000 --batch 200
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_openf1 import make_positions  # noqa: E402
+from position_state import PositionState  # noqa: E402
+
+
+def legacy_latest_positions(data):
+    latest = {}
+    for item in data:
+        driver = str(item.get("driver_number"))
+        position = item.get("position")
+        date_str = item.get("date")
+        if driver is None or position is None or date_str is None:
+            continue
+        record_date = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        if driver not in latest or record_date > latest[driver]["date"]:
+            latest[driver] = {"position": int(position), "date": record_date}
+    return {d: info["position"] for d, info in latest.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=200, help="rows per live poll in the streaming scenario")
+    args = parser.parse_args()
+
+    data = make_positions(args.rows)
+
+    started = time.perf_counter()
+    expected = legacy_latest_positions(data)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    state = PositionState()
+    state.update(data)
+    one_batch = time.perf_counter() - started
+    assert state.current_positions() == expected
+
+    # Živý priebeh: starý kód by pri každom poll-e spracoval celú históriu znova
+    polls = range(0, len(data), args.batch)
+    started = time.perf_counter()
+    streaming = PositionState()
+    for start in polls:
+        streaming.update(data[start:start + args.batch])
+    incremental = time.perf_counter() - started
+    assert streaming.current_positions() == expected
+
+    started = time.perf_counter()
+    timeline = streaming.timeline(data[0]["driver_number"])
+    timeline_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{len(data)} position rows, {len(expected)} drivers")
+    print(f"legacy loop (whole feed)        {legacy * 1000:9.1f} ms")
+    print(f"engine, one batch               {one_batch * 1000:9.1f} ms")
+    print(f"engine, {len(polls)} polls of {args.batch:<6}  {incremental * 1000:9.1f} ms total, "
+          f"{incremental / len(polls) * 1000:.3f} ms/poll")
+    print(f"legacy, same polls (estimated)  {legacy * (len(polls) + 1) / 2 * 1000:9.1f} ms total")
+    print(f"timeline of one driver          {timeline_ms:9.3f} ms ({len(timeline['dates'])} points)")
+
+
+if __name__ == "__main__":
+    main()
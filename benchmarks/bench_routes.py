@@ -0,0 +1,303 @@
+"""
+Route benchmark suite: latency of every route of app.py in three cache states,
+written to JSON so that runs on different commits can be compared.
+
+The app talks to the fixture server (fixture_server.py: recorded OpenF1 and
+Ergast responses, synthetic where nothing was recorded) with ``--latency``
+and ``--jitter`` added to every upstream response. Every measurement runs in
+a fresh worker process through the Flask test client:
+
+* cold        - empty dataset store and FastF1 cache, nothing in memory; the
+                first request of each route (``--cold-runs`` processes);
+* warm_disk   - a new process on the disk caches filled by the cold run
+                before it; again the first request of each route;
+* warm_memory - one process after a warm-up pass; ``--repeat`` requests per route.
+
+Per route and state the JSON has n, p50/p99/mean/max in ms and the response
+statuses, plus the peak RSS of the worker processes and the number of upstream
+requests per state. /live_feed is timed to its first event. Routes run in a
+fixed order, so data an earlier route fetched (the session catalogue, the
+position feed of /live) is already cached for the later ones in every state.
+
+    python benchmarks/bench_routes.py run --out results.json --latency 0.05
+    python benchmarks/bench_routes.py compare baseline.json results.json --threshold 0.2
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+TIERS = ("cold", "warm_disk", "warm_memory")
+RESULT_PREFIX = "BENCH_ROUTES_RESULT "
+
+# (method, path template, form) - {s} session, {d} driver, {t} driver with telemetry
+ROUTES = [
+    ("GET", "/", None),
+    ("GET", "/laps", None),
+    ("GET", "/teamradio", None),
+    ("GET", "/race_control", None),
+    ("GET", "/wdc_standings", None),
+    ("GET", "/live", None),
+    ("GET", "/get_sessions", None),
+    ("GET", "/get_sessions_for_radio", None),
+    ("GET", "/championship_outlook", None),
+    ("GET", "/championship_outlook?kind=constructors", None),
+    ("GET", "/get_drivers?session_key={s}", None),
+    ("GET", "/driver_laps?session_key={s}&driver_number={d}", None),
+    ("POST", "/driver_laps", {"session_key": "{s}", "driver_number": "{d}"}),
+    ("GET", "/lap_analytics?session_key={s}", None),
+    ("GET", "/position_timeline?session_key={s}&driver_number={d}", None),
+    ("GET", "/telemetry?session_key={s}&driver_number={t}", None),
+    ("GET", "/telemetry?session_key={s}&driver_number={t}&source=location", None),
+    ("GET", "/team_radio_data?session_key={s}", None),
+    ("POST", "/live_team_radio_data", {"session_key": "{s}"}),
+    ("GET", "/get_race_control_events?session_key={s}", None),
+    ("GET", "/live_drivers", None),
+    ("POST", "/live_laps", {"session_key": "{s}", "driver_number": "{d}"}),
+    ("GET", "/live_feed?session_key={s}", None),
+    ("GET", "/warmup_status", None),
+    ("GET", "/cache_stats", None),
+]
+
+
+def route_label(method, path, form):
+    return f"{method} {path}" + (f" {json.dumps(form, sort_keys=True)}" if form else "")
+
+
+def percentile(values, p):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    return {"n": len(samples), "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 3), "max_ms": round(max(samples) * 1000, 3)}
+
+
+# --- worker process ---
+def request_once(client, method, path, form):
+    started = time.perf_counter()
+    if path.startswith("/live_feed"):
+        response = client.get(path, buffered=False)
+        next(iter(response.response), None)  # prvá udalosť streamu
+        elapsed = time.perf_counter() - started
+        response.close()
+        return elapsed, response.status_code
+    response = client.open(path, method=method, data=form)
+    response.get_data()
+    return time.perf_counter() - started, response.status_code
+
+
+def worker(tier, params, repeat):
+    """Runs in a fresh process: times every route, prints {label: (samples, statuses)} and the peak RSS as JSON."""
+    import app
+
+    client = app.app.test_client()
+    results = {}
+    for method, template, form in ROUTES:
+        path = template.format(**params)
+        data = {k: v.format(**params) for k, v in form.items()} if form else None
+        if tier == "warm_memory":
+            request_once(client, method, path, data)
+        samples, statuses = [], []
+        for _ in range(repeat if tier == "warm_memory" else 1):
+            elapsed, status = request_once(client, method, path, data)
+            samples.append(elapsed)
+            statuses.append(status)
+        results[route_label(method, template, form)] = (samples, statuses)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux: KiB
+    print(RESULT_PREFIX + json.dumps({"routes": results, "peak_rss_mb": round(peak_kb / 1024, 1)}), flush=True)
+
+
+# --- orchestration ---
+def run_worker(tier, params, repeat, env):
+    command = [sys.executable, os.path.abspath(__file__), "worker", tier, "--params", json.dumps(params),
+               "--repeat", str(repeat)]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"{tier} worker failed with exit code {completed.returncode}")
+    # app vypisuje na stdout aj vlastné hlásenia
+    line = next(line for line in reversed(completed.stdout.splitlines()) if line.startswith(RESULT_PREFIX))
+    return json.loads(line[len(RESULT_PREFIX):])
+
+
+def session_params(server):
+    """Session and drivers the routes ask for: the first recorded lap and telemetry rows."""
+    laps = server.datasets.get("laps") or [{}]
+    telemetry = server.datasets.get("car_data") or laps
+    return {"s": laps[0].get("session_key", ""), "d": laps[0].get("driver_number", ""),
+            "t": telemetry[0].get("driver_number", "")}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, None
+
+
+def run(args):
+    from fixture_server import FixtureServer
+
+    samples = {tier: {} for tier in TIERS}
+    statuses = {tier: {} for tier in TIERS}
+    peak_rss = dict.fromkeys(TIERS, 0.0)
+    upstream = {tier: {} for tier in TIERS}
+    scratch = tempfile.mkdtemp(prefix="bench_routes_")
+    with FixtureServer(args.fixtures, latency=args.latency, jitter=args.jitter) as server:
+        params = session_params(server)
+        print(f"upstream: {server.describe()}, latency {args.latency * 1000:.0f} ms "
+              f"+- {args.jitter * 1000:.0f} ms, session {params['s']}")
+
+        def measure(tier, cache_dir, repeat):
+            env = dict(os.environ, OPENF1_BASE_URL=server.base_url, ERGAST_BASE_URL=server.ergast_url,
+                       CACHE_BACKEND=f"file://{os.path.join(cache_dir, 'data')}",
+                       FASTF1_CACHE_DIR=os.path.join(cache_dir, "fastf1"), WARMUP_ENABLED="0", PRELOAD_HEAVY="0",
+                       PYTHONPATH=ROOT)
+            server.reset_counts()
+            result = run_worker(tier, params, repeat, env)
+            for label, (times, codes) in result["routes"].items():
+                samples[tier].setdefault(label, []).extend(times)
+                statuses[tier].setdefault(label, set()).update(codes)
+            peak_rss[tier] = max(peak_rss[tier], result["peak_rss_mb"])
+            for endpoint, count in server.requests.items():
+                upstream[tier][endpoint] = upstream[tier].get(endpoint, 0) + count
+            print(f"  {tier:12} done, peak RSS {result['peak_rss_mb']:.0f} MB")
+
+        try:
+            for i in range(args.cold_runs):
+                cache_dir = os.path.join(scratch, f"run{i}")
+                measure("cold", cache_dir, 1)
+                measure("warm_disk", cache_dir, 1)
+            measure("warm_memory", cache_dir, args.repeat)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    routes = {}
+    for method, template, form in ROUTES:
+        label = route_label(method, template, form)
+        routes[label] = {tier: dict(summarize(samples[tier][label]), statuses=sorted(statuses[tier][label]))
+                         for tier in TIERS if samples[tier].get(label)}
+    results = {
+        "schema": 1,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"fixtures": args.fixtures, "latency": args.latency, "jitter": args.jitter,
+                   "repeat": args.repeat, "cold_runs": args.cold_runs, "session": params},
+        "routes": routes,
+        "peak_rss_mb": peak_rss,
+        "upstream_requests": upstream,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print_table(results)
+    print(f"results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            return compare(json.load(f), results, args.threshold, args.min_ms)
+    return 0
+
+
+def print_table(results):
+    print(f"{'route':62} " + " ".join(f"{tier + ' p50/p99 ms':>24}" for tier in TIERS))
+    for label, tiers in results["routes"].items():
+        cells = []
+        for tier in TIERS:
+            stats = tiers.get(tier)
+            failed = stats and any(code >= 400 for code in stats["statuses"])
+            cells.append(f"{stats['p50_ms']:9.1f} / {stats['p99_ms']:9.1f}{'!' if failed else ' '}" if stats
+                         else f"{'-':>24}")
+        print(f"{label[:62]:62} " + " ".join(f"{c:>24}" for c in cells))
+    print("peak RSS MB: " + ", ".join(f"{tier} {mb:.0f}" for tier, mb in results["peak_rss_mb"].items()))
+
+
+def compare(old, new, threshold, min_ms):
+    """Prints p50/p99 and peak RSS changes beyond ``threshold``; returns 1 when anything regressed."""
+    print(f"compare {(old.get('commit') or '?')[:10]} -> {(new.get('commit') or '?')[:10]} "
+          f"(threshold {threshold:.0%}, min {min_ms} ms)")
+    regressions = 0
+    for label, tiers in new["routes"].items():
+        for tier, stats in tiers.items():
+            before = old.get("routes", {}).get(label, {}).get(tier)
+            if before is None:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                a, b = before[metric], stats[metric]
+                if b - a > min_ms and b > a * (1 + threshold):
+                    regressions += 1
+                    print(f"  REGRESSION {label} [{tier}] {metric}: {a:.1f} -> {b:.1f} ms (+{(b / a - 1) * 100:.0f}%)")
+                elif a - b > min_ms and a > b * (1 + threshold):
+                    print(f"  improved   {label} [{tier}] {metric}: {a:.1f} -> {b:.1f} ms ({(b / a - 1) * 100:.0f}%)")
+    for tier, mb in new["peak_rss_mb"].items():
+        before = old.get("peak_rss_mb", {}).get(tier)
+        if before and mb > before * (1 + threshold):
+            regressions += 1
+            print(f"  REGRESSION peak RSS [{tier}]: {before:.0f} -> {mb:.0f} MB")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("run", help="benchmark every route and write JSON results")
+    bench.add_argument("--out", default="bench_routes.json")
+    bench.add_argument("--fixtures", default=None, help="fixtures directory (synthetic data when omitted)")
+    bench.add_argument("--latency", type=float, default=0.05, help="seconds added to every upstream response")
+    bench.add_argument("--jitter", type=float, default=0.0)
+    bench.add_argument("--repeat", type=int, default=30, help="requests per route with a warm memory cache")
+    bench.add_argument("--cold-runs", type=int, default=3, help="fresh processes for the cold and warm_disk states")
+    bench.add_argument("--baseline", default=None, help="results JSON to compare against after the run")
+    bench.add_argument("--threshold", type=float, default=0.2)
+    bench.add_argument("--min-ms", type=float, default=1.0, help="ignore changes smaller than this")
+
+    diff = commands.add_parser("compare", help="compare two results files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=0.2)
+    diff.add_argument("--min-ms", type=float, default=1.0)
+
+    work = commands.add_parser("worker")  # interné: jeden meraný proces
+    work.add_argument("tier", choices=TIERS)
+    work.add_argument("--params", required=True)
+    work.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        worker(args.tier, json.loads(args.params), args.repeat)
+    elif args.command == "compare":
+        with open(args.old, encoding="utf-8") as f, open(args.new, encoding="utf-8") as g:
+            sys.exit(compare(json.load(f), json.load(g), args.threshold, args.min_ms))
+    else:
+        sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
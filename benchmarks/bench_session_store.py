@@ -0,0 +1,93 @@
+"""
+Read latency of the columnar session cache against the legacy CSV path.
+
+The CSV numbers reproduce what the app used to do per request: pd.read_csv
+followed by format_lap_time row by row (laps) or the per-column NaN-replacing
+applies (drivers). Runs against copies of the files in data/ in a temp dir.
+
+    python benchmarks/bench_session_store.py --repeat 50
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import session_store  # noqa: E402
+
+REPO_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def format_lap_time(seconds):
+    if seconds is None or pd.isna(seconds):
+        return "N/A"
+    minutes = int(seconds // 60)
+    return f"{minutes}:{seconds % 60:06.3f}"
+
+
+def legacy_laps(path):
+    df = pd.read_csv(path)
+    df["lap_duration"] = pd.to_numeric(df["lap_duration"], errors="coerce")
+    df["lap_time"] = df["lap_duration"].apply(format_lap_time)
+    return df
+
+
+def legacy_drivers(path):
+    df = pd.read_csv(path, encoding="utf-8", header=0, keep_default_na=False, na_values=[""])
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].replace({np.nan: None})
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].apply(lambda x: None if pd.isna(x) else x)
+    return df.to_dict("records")
+
+
+def timeit(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--data-dir", default=REPO_DATA)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in os.listdir(args.data_dir):
+            if name.endswith(".csv"):
+                shutil.copy(os.path.join(args.data_dir, name), tmp)
+        session_store.migrate_csv_cache(tmp)
+
+        print(f"{'dataset':<22}{'rows':>6}{'csv ms':>10}{'arrow ms':>10}{'projected ms':>14}")
+        for name in sorted(os.listdir(tmp)):
+            stem, ext = os.path.splitext(name)
+            kind, _, key = stem.partition("_")
+            if ext != ".csv" or kind not in ("laps", "drivers"):
+                continue
+            csv_path = os.path.join(tmp, name)
+            if kind == "laps":
+                csv_ms = timeit(lambda: legacy_laps(csv_path), args.repeat)
+                columns = ["driver_number", "lap_number", "lap_time"]
+            else:
+                csv_ms = timeit(lambda: legacy_drivers(csv_path), args.repeat)
+                columns = ["driver_number", "broadcast_name", "team_name"]
+            arrow_ms = timeit(lambda: session_store.read_dataset(tmp, kind, key), args.repeat)
+            projected_ms = timeit(lambda: session_store.read_dataset(tmp, kind, key, columns=columns), args.repeat)
+            rows = len(session_store.read_dataset(tmp, kind, key, columns=["driver_number"]))
+            print(f"{stem:<22}{rows:>6}{csv_ms:>10.2f}{arrow_ms:>10.2f}{projected_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
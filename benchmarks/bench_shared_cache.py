@@ -0,0 +1,105 @@
+"""
+Cold-session stampede across worker processes, per shared cache backend.
+
+--workers processes (like gunicorn workers) ask for the same uncached session
+at the same moment. For every backend the benchmark counts how many of them
+actually fetched the laps from the OpenF1 stand-in and how long the slowest
+one waited, with the cross-process lock (DatasetStore.get_or_populate) and
+without it (read, else fetch and write - the old behaviour). It also reports
+the encoded size of the dataset and the warm read time.
+
+    python benchmarks/bench_shared_cache.py --workers 8 --latency 0.3
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import requests  # noqa: E402
+
+import session_store  # noqa: E402
+import shared_cache  # noqa: E402
+from mock_openf1 import SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+
+def worker(url, base_url, locked, start, results):
+    store = session_store.DatasetStore(shared_cache.from_url(url))
+
+    def fetch():
+        rows = requests.get(f"{base_url}/laps", params={"session_key": SESSION_KEY}, timeout=30).json()
+        return pd.DataFrame(rows)
+
+    start.wait()
+    started = time.perf_counter()
+    if locked:
+        df = store.get_or_populate("laps", SESSION_KEY, fetch)
+    else:
+        df = store.read("laps", SESSION_KEY)
+        if df is None:
+            df = store.write("laps", SESSION_KEY, fetch())
+    results.put((time.perf_counter() - started, len(df)))
+
+
+def stampede(url, base_url, server, workers, locked):
+    server.reset_counts()
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(url, base_url, locked, start, results)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    time.sleep(0.2)
+    start.set()
+    outcomes = [results.get(timeout=120) for _ in processes]
+    for p in processes:
+        p.join()
+    rows = {n for _, n in outcomes}
+    return server.requests["laps"], max(t for t, _ in outcomes), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per OpenF1 request")
+    parser.add_argument("--repeat", type=int, default=20, help="warm reads to time")
+    parser.add_argument("--redis", default=None, help="also benchmark a Redis-compatible server at this URL")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="unif1ed-shared-")
+    try:
+        with MockOpenF1Server(latency=args.latency) as server:
+            backends = {"file": f"file://{tmp}/files", "sqlite": f"sqlite:///{tmp}/cache.db"}
+            if args.redis:
+                backends["redis"] = args.redis
+            print(f"{args.workers} workers, {args.latency * 1000:.0f} ms upstream latency")
+            print(f"{'backend':8} {'mode':9} {'fetches':>7} {'slowest':>10} {'size':>10} {'warm read':>10}")
+            for name, url in backends.items():
+                for locked in (False, True):
+                    backend = shared_cache.from_url(url)
+                    backend.delete(session_store.DatasetStore.key("laps", SESSION_KEY))
+                    fetches, slowest, rows = stampede(url, server.base_url, server, args.workers, locked)
+                    store = session_store.DatasetStore(backend)
+                    value = backend.get(store.key("laps", SESSION_KEY))
+                    size = len(value)
+                    timings = []
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        store.read("laps", SESSION_KEY)
+                        timings.append(time.perf_counter() - started)
+                    mode = "locked" if locked else "unlocked"
+                    print(f"{name:8} {mode:9} {fetches:7d} {slowest * 1000:8.0f} ms {size / 1024:7.0f} KiB "
+                          f"{statistics.median(timings) * 1000:7.2f} ms  rows={sorted(rows)}")
+                    backend.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
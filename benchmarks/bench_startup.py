@@ -0,0 +1,84 @@
+"""
+Cold-start benchmark and regression guard for worker startup.
+
+Every measurement runs in a fresh interpreter:
+
+* ``import app`` wall time (median of --runs),
+* time to the first served request (import + first /laps render),
+* the cost of the lazily imported fastf1 (paid on first use, or once in the
+  master with ``create_app()`` + gunicorn preload).
+
+Exits with status 1 when ``import app`` pulls in fastf1/matplotlib/scipy or
+takes longer than --max-import-ms.
+
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("fastf1", "matplotlib", "scipy")
+
+PROBES = {
+    "import": """
+import time, sys, json
+t = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t
+print(json.dumps({"ms": elapsed * 1000, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,),
+    "first_request": """
+import time, json
+t = time.perf_counter()
+import app
+client = app.app.test_client()
+status = client.get("/laps").status_code
+print(json.dumps({"ms": (time.perf_counter() - t) * 1000, "status": status}))
+""",
+    "fastf1": """
+import time, json
+import app
+t = time.perf_counter()
+import fastf1.events, fastf1.ergast
+print(json.dumps({"ms": (time.perf_counter() - t) * 1000}))
+""",
+}
+
+
+def probe(name):
+    env = dict(os.environ, WARMUP_ENABLED="0", PYTHONDONTWRITEBYTECODE="1")
+    output = subprocess.run([sys.executable, "-c", PROBES[name]], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="fail when the median `import app` time exceeds this")
+    args = parser.parse_args()
+
+    results = {name: [probe(name) for _ in range(args.runs)] for name in PROBES}
+    medians = {name: statistics.median(r["ms"] for r in runs) for name, runs in results.items()}
+    heavy = sorted({m for r in results["import"] for m in r["heavy"]})
+
+    print(f"import app              {medians['import']:8.1f} ms")
+    print(f"import + first request  {medians['first_request']:8.1f} ms")
+    print(f"lazy fastf1 import      {medians['fastf1']:8.1f} ms (deferred to first use / preload)")
+    print(f"heavy modules at import {', '.join(heavy) or 'none'}")
+
+    failed = bool(heavy)
+    if args.max_import_ms is not None and medians["import"] > args.max_import_ms:
+        print(f"FAIL: import app took {medians['import']:.1f} ms > {args.max_import_ms:.1f} ms")
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
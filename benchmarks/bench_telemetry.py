@@ -0,0 +1,130 @@
+"""
+Telemetry downsampling and the /telemetry endpoint.
+
+1. Algorithm: the vectorized LTTB in telemetry.py against a textbook
+   sequential LTTB (one Python loop iteration per bucket) on ``--samples``
+   synthetic speed samples - time per call and how much of the signal's
+   envelope (peaks and troughs) the kept points lose.
+2. Endpoint: the app against the OpenF1 stand-in with car_data for a few
+   drivers - cold request (chunked fetch + downsample), warm request (memory)
+   and one lap, with the response size next to the raw samples' JSON.
+
+    python benchmarks/bench_telemetry.py --samples 300000 --points 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import telemetry  # noqa: E402
+from mock_openf1 import SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+
+def lttb_reference(x, y, n_out):
+    """Sequential LTTB (Steinarsson 2013): the previous *selected* point is the triangle's first vertex."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected.append(a)
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def envelope_error(y, indices, windows=300):
+    """
+    How much of the signal's shape is lost: mean over ``windows`` equal time
+    windows of how far the kept points' max and min fall short of the raw ones.
+    """
+    edges = np.linspace(0, len(y), windows + 1).astype(np.int64)
+    kept = np.full(len(y), np.nan)
+    kept[indices] = y[indices]
+    error = 0.0
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        window = kept[lo:hi]
+        if np.isnan(window).all():
+            window = np.interp(np.arange(lo, hi), indices, y[indices])
+        error += (y[lo:hi].max() - np.nanmax(window)) + (np.nanmin(window) - y[lo:hi].min())
+    return error / windows
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, statistics.median(timings) * 1000
+
+
+def bench_algorithms(samples, points, repeat):
+    rng = np.random.default_rng(0)
+    x = np.arange(samples) / 3.7
+    phase = (x % 82.0) / 82.0
+    y = 215 + 60 * np.sin(phase * 2 * np.pi * 9) + 35 * np.sin(phase * 2 * np.pi * 4 + 1) + rng.normal(0, 1.5, samples)
+
+    print(f"{samples} samples -> {points} points")
+    print(f"{'method':24} {'time':>10} {'points':>7} {'envelope error':>15}")
+    for name, fn in (("sequential LTTB", lambda: lttb_reference(x, y, points)),
+                     ("vectorized LTTB", lambda: telemetry.lttb_indices(x, y, points)),
+                     ("vectorized min-max", lambda: telemetry.minmax_indices(y, points)),
+                     ("every n-th sample", lambda: np.linspace(0, samples - 1, points).astype(np.int64))):
+        indices, ms = timed(fn, repeat)
+        print(f"{name:24} {ms:7.2f} ms {len(indices):7d} {envelope_error(y, indices):15.3f}")
+
+
+def bench_endpoint(drivers, repeat):
+    from mock_openf1 import make_car_data, make_drivers, make_laps, make_sessions
+
+    car_data = make_car_data(drivers)
+    datasets = {"sessions": make_sessions(50), "drivers": make_drivers(), "laps": make_laps(),
+                "car_data": car_data}
+    raw_bytes = len(json.dumps([r for r in car_data if r["driver_number"] == 1]).encode("utf-8"))
+    with MockOpenF1Server(datasets=datasets) as upstream:
+        os.environ["OPENF1_BASE_URL"] = upstream.base_url
+        os.environ.setdefault("WARMUP_ENABLED", "0")
+        os.environ.setdefault("CACHE_BACKEND", f"file://{tempfile.mkdtemp(prefix='bench_telemetry_')}")
+        import app
+
+        client = app.app.test_client()
+        url = f"/telemetry?session_key={SESSION_KEY}&driver_number=1"
+        print(f"\nraw car_data of driver 1: {raw_bytes} B as JSON")
+        print(f"{'request':44} {'time':>10} {'bytes':>8} {'points':>7}")
+        for label, path in (("cold (fetch + store + downsample)", url), ("warm, whole session", url),
+                            ("warm, lap 10", url + "&lap=10"), ("warm, 500 points, speed", url + "&points=500&channels=speed")):
+            response, ms = timed(lambda: client.get(path), 1 if label.startswith("cold") else repeat)
+            payload = response.get_json()
+            print(f"{label:44} {ms:7.2f} ms {len(response.data):8d} {payload.get('points', 0):7d}")
+        print(f"upstream car_data requests: {upstream.requests['car_data']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=300000)
+    parser.add_argument("--points", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--drivers", type=int, default=2, help="drivers with car_data in the stand-in")
+    args = parser.parse_args()
+
+    bench_algorithms(args.samples, args.points, args.repeat)
+    bench_endpoint(args.drivers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+OpenF1 guard layer (upstream_guard.py): the same load with and without it.
+
+* coalescing - ``--viewers`` threads request the same
+  ``/laps?session_key=X&driver_number=Y`` at once, ``--rounds`` times;
+* rate limit - ``--distinct`` different requests fired at once; reported is
+  the highest number of upstream calls in any one second;
+* outage - the stand-in answers 503 to everything; ``--viewers`` threads
+  request data that was fetched before. Without the guard every request waits
+  for the retries and fails; with it the circuit opens and the last good
+  response is served marked stale.
+* recovery - after an outage the circuit turns half-open while the rate
+  budget is exhausted; the throttled trial call must not leave the circuit
+  stuck, the next call once a token is available has to close it (exits
+  with 1 when it does not).
+
+    python benchmarks/bench_upstream_guard.py --latency 0.2 --viewers 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_openf1 import DRIVER_NUMBERS, SESSION_KEY, MockOpenF1Server  # noqa: E402
+
+import openf1_client  # noqa: E402
+import upstream_guard  # noqa: E402
+
+
+def make_client(upstream, guarded, args):
+    guard = upstream_guard.UpstreamGuard(rate=args.rate, burst=args.burst, max_wait=args.max_wait,
+                                         failure_threshold=5, reset_timeout=30) if guarded else None
+    return openf1_client.OpenF1Client(upstream.base_url, pool_size=64, retries=args.retries, backoff=args.backoff,
+                                      read_timeout=5, guard=guard)
+
+
+def run_parallel(fn, items, workers):
+    """(results or exceptions, per-call seconds, wall seconds)."""
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            result = fn(item)
+        except Exception as e:
+            result = e
+        return result, time.perf_counter() - started, time.monotonic()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(timed, items))
+    return outcomes, time.perf_counter() - started
+
+
+def coalescing(upstream, client, args):
+    params = {"session_key": SESSION_KEY, "driver_number": DRIVER_NUMBERS[0]}
+    upstream.reset_counts()
+    walls = []
+    for _ in range(args.rounds):
+        _, wall = run_parallel(lambda _: client.get_json("laps", params), range(args.viewers), args.viewers)
+        walls.append(wall)
+    return sum(upstream.requests.values()), statistics.mean(walls) * 1000
+
+
+def rate_limit(upstream, client, args):
+    upstream.reset_counts()
+    calls = [{"session_key": SESSION_KEY, "driver_number": n, "lap_number": lap}
+             for lap in range(1, args.distinct // len(DRIVER_NUMBERS) + 2) for n in DRIVER_NUMBERS][:args.distinct]
+    outcomes, wall = run_parallel(lambda p: client.get_json("laps", p), calls, args.distinct)
+    finished = Counter(int(at) for result, _, at in outcomes if not isinstance(result, Exception))
+    errors = sum(isinstance(result, Exception) for result, _, _ in outcomes)
+    return sum(upstream.requests.values()), max(finished.values(), default=0), errors, wall
+
+
+def outage(upstream, client, args):
+    calls = [{"session_key": SESSION_KEY, "driver_number": n} for n in DRIVER_NUMBERS[:4]]
+    for params in calls:
+        client.get_json("laps", params)
+    upstream.fail_status = 503
+    upstream.reset_counts()
+    try:
+        outcomes, wall = run_parallel(lambda i: client.get_json("laps", calls[i % len(calls)]),
+                                      range(args.viewers * 4), args.viewers)
+    finally:
+        upstream.fail_status = None
+    errors = sum(isinstance(result, Exception) for result, _, _ in outcomes)
+    latency = statistics.median(seconds for _, seconds, _ in outcomes) * 1000
+    return sum(upstream.requests.values()), errors, latency
+
+
+def recovery(upstream, args):
+    """(outcome of the first call with a token after the outage, breaker state)."""
+    guard = upstream_guard.UpstreamGuard(rate=1, burst=1, max_wait=0, failure_threshold=1, reset_timeout=0.2)
+    client = openf1_client.OpenF1Client(upstream.base_url, retries=0, read_timeout=5, guard=guard)
+    params = {"session_key": SESSION_KEY, "driver_number": DRIVER_NUMBERS[1]}
+    upstream.fail_status = 503
+    try:
+        client.get_json("laps", params)  # otvorí breaker a minie jediný token
+    except Exception:
+        pass
+    finally:
+        upstream.fail_status = None
+    time.sleep(0.3)
+    try:
+        client.get_json("laps", params)  # half-open, ale bez tokenu - skúšobné volanie sa neuskutoční
+    except upstream_guard.UpstreamUnavailable:
+        pass
+    time.sleep(1.0)
+    try:
+        outcome = f"{len(client.get_json('laps', params))} laps"
+    except Exception as e:
+        outcome = str(e)
+    state = guard._endpoint("laps")[1].state
+    client.close()
+    return outcome, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every upstream response")
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--distinct", type=int, default=40)
+    parser.add_argument("--rate", type=float, default=5, help="guard budget per endpoint, calls per second")
+    parser.add_argument("--burst", type=float, default=10)
+    parser.add_argument("--max-wait", type=float, default=10)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--backoff", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with MockOpenF1Server(latency=args.latency) as upstream:
+        print(f"upstream latency {args.latency * 1000:.0f} ms, {args.viewers} viewers, "
+              f"budget {args.rate:g}/s burst {args.burst:g}")
+        for guarded in (False, True):
+            label = "guard" if guarded else "no guard"
+            client = make_client(upstream, guarded, args)
+            calls, ms = coalescing(upstream, client, args)
+            print(f"{label:9} coalescing: {args.viewers * args.rounds} requests -> {calls} upstream calls, "
+                  f"{ms:.0f} ms per round")
+            calls, peak, errors, wall = rate_limit(upstream, client, args)
+            print(f"{label:9} rate limit: {args.distinct} requests -> {calls} upstream calls, "
+                  f"peak {peak} per second, {wall:.1f} s, {errors} errors")
+            calls, errors, latency = outage(upstream, client, args)
+            print(f"{label:9} outage:     {args.viewers * 4} requests -> {calls} upstream calls, "
+                  f"{errors} errors, median {latency:.0f} ms")
+            if guarded:
+                print(f"{label:9} totals:     {client.guard.stats()['totals']}")
+            client.close()
+        outcome, state = recovery(upstream, args)
+        print(f"guard     recovery:   throttled trial, then {outcome}, circuit {state}")
+        if state != "closed":
+            print("FAILED")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
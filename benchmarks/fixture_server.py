@@ -0,0 +1,176 @@
+"""
+Fixture server: replays recorded OpenF1 and Ergast responses for the benchmarks.
+
+Recordings live in a fixtures directory::
+
+    <fixtures>/openf1/<endpoint>.json         all recorded rows of an endpoint (sessions, drivers,
+                                              laps, team_radio, race_control, position, ...)
+    <fixtures>/ergast/<season>.json           season schedule
+    <fixtures>/ergast/<season>/<round>/driverStandings.json
+    <fixtures>/ergast/<season>/<round>/constructorStandings.json
+
+OpenF1 requests are answered from the recorded rows with the same query
+filtering as the stand-in (``session_key=``, ``date>=`` ...). Without OpenF1
+recordings the synthetic datasets of mock_openf1 are served instead (with
+car_data and location of the first ``telemetry_drivers`` drivers), and
+Ergast paths that were not recorded fall back to the synthetic season, so
+every route has data either way. Latency and jitter are configurable as in
+mock_openf1.
+
+Record once (needs access to the live APIs), then replay offline::
+
+    python benchmarks/fixture_server.py record --out benchmarks/fixtures --sessions 9158,9159 --seasons 2024
+    python benchmarks/fixture_server.py serve --fixtures benchmarks/fixtures --port 8765 --latency 0.05
+"""
+import argparse
+import json
+import os
+
+import requests
+
+from mock_openf1 import MockOpenF1Server, default_datasets, make_car_data, make_ergast, make_location
+
+OPENF1_URL = "https://api.openf1.org/v1"
+ERGAST_URL = "https://api.jolpi.ca/ergast/f1"
+SESSION_ENDPOINTS = ("drivers", "laps", "team_radio", "race_control", "position")
+TELEMETRY_ENDPOINTS = ("car_data", "location")
+
+
+def load_openf1(fixtures_dir):
+    """{endpoint: rows} of the recorded OpenF1 endpoints (empty without recordings)."""
+    directory = os.path.join(fixtures_dir, "openf1")
+    if not os.path.isdir(directory):
+        return {}
+    datasets = {}
+    for name in sorted(os.listdir(directory)):
+        endpoint, ext = os.path.splitext(name)
+        if ext == ".json":
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                datasets[endpoint] = json.load(f)
+    return datasets
+
+
+class FixtureServer(MockOpenF1Server):
+    """:class:`MockOpenF1Server` serving the recordings of ``fixtures_dir`` (see the module docstring)."""
+
+    def __init__(self, fixtures_dir=None, telemetry_drivers=4, drivers=20, laps=60, **kwargs):
+        recorded = load_openf1(fixtures_dir) if fixtures_dir else {}
+        datasets = recorded
+        if not datasets:
+            datasets = default_datasets(drivers, laps)
+            if telemetry_drivers:
+                datasets["car_data"] = make_car_data(telemetry_drivers, laps)
+                datasets["location"] = make_location(telemetry_drivers, laps)
+        super().__init__(datasets=datasets, drivers=drivers, laps=laps, **kwargs)
+        self.fixtures_dir = fixtures_dir
+        self.recorded_openf1 = sorted(recorded)
+        self.replayed = 0
+
+    def ergast_response(self, path):
+        if self.fixtures_dir:
+            target = os.path.normpath(os.path.join(self.fixtures_dir, "ergast", path.lstrip("/")))
+            if target.startswith(os.path.join(os.path.normpath(self.fixtures_dir), "ergast")) and os.path.isfile(target):
+                with open(target, encoding="utf-8") as f:
+                    self.replayed += 1
+                    return json.load(f)
+        return make_ergast(path, drivers=self.drivers)
+
+    def describe(self):
+        if not self.fixtures_dir:
+            return "synthetic OpenF1 and Ergast data"
+        openf1 = f"recorded OpenF1 ({', '.join(self.recorded_openf1)})" if self.recorded_openf1 else "synthetic OpenF1"
+        return f"{openf1}, Ergast from {self.fixtures_dir} (synthetic where not recorded)"
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def record(out_dir, session_keys=(), seasons=(), telemetry_drivers=(), openf1_url=OPENF1_URL, ergast_url=ERGAST_URL,
+           timeout=60):
+    """
+    Downloads the responses the app asks for into ``out_dir``: the session
+    catalogue, the per-session endpoints of ``session_keys`` (car_data and
+    location only for ``telemetry_drivers``) and the schedule and standings of
+    every round of ``seasons``. Returns {fixture path: rows or standings count}.
+    """
+    http = requests.Session()
+    summary = {}
+
+    def get(url, params=None):
+        response = http.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    catalogue = get(f"{openf1_url}/sessions")
+    _write_json(os.path.join(out_dir, "openf1", "sessions.json"), catalogue)
+    summary["openf1/sessions.json"] = len(catalogue)
+
+    for endpoint in SESSION_ENDPOINTS + (TELEMETRY_ENDPOINTS if telemetry_drivers else ()):
+        rows = []
+        for session_key in session_keys:
+            if endpoint in TELEMETRY_ENDPOINTS:
+                for driver_number in telemetry_drivers:
+                    rows.extend(get(f"{openf1_url}/{endpoint}",
+                                    {"session_key": session_key, "driver_number": driver_number}))
+            else:
+                rows.extend(get(f"{openf1_url}/{endpoint}", {"session_key": session_key}))
+        _write_json(os.path.join(out_dir, "openf1", f"{endpoint}.json"), rows)
+        summary[f"openf1/{endpoint}.json"] = len(rows)
+
+    for season in seasons:
+        schedule = get(f"{ergast_url}/{season}.json", {"limit": 100})
+        _write_json(os.path.join(out_dir, "ergast", f"{season}.json"), schedule)
+        races = schedule["MRData"]["RaceTable"]["Races"]
+        summary[f"ergast/{season}.json"] = len(races)
+        for race in races:
+            for kind in ("driverStandings", "constructorStandings"):
+                path = f"{season}/{race['round']}/{kind}.json"
+                standings = get(f"{ergast_url}/{path}", {"limit": 100})
+                _write_json(os.path.join(out_dir, "ergast", *path.split("/")), standings)
+                summary[f"ergast/{path}"] = int(standings["MRData"].get("total", 0))
+    return summary
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v.strip()] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="download fixtures from the live APIs")
+    rec.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    rec.add_argument("--sessions", default="", help="comma-separated OpenF1 session keys")
+    rec.add_argument("--seasons", default="", help="comma-separated seasons for Ergast schedules and standings")
+    rec.add_argument("--telemetry-drivers", default="", help="driver numbers to record car_data/location for")
+    rec.add_argument("--openf1-url", default=OPENF1_URL)
+    rec.add_argument("--ergast-url", default=ERGAST_URL)
+
+    serve = commands.add_parser("serve", help="replay fixtures")
+    serve.add_argument("--fixtures", default=None, help="fixtures directory (synthetic data when omitted)")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        summary = record(args.out, _ints(args.sessions), _ints(args.seasons), _ints(args.telemetry_drivers),
+                         args.openf1_url.rstrip("/"), args.ergast_url.rstrip("/"))
+        for path, count in summary.items():
+            print(f"{path:50} {count:8d}")
+        return
+
+    server = FixtureServer(args.fixtures, latency=args.latency, jitter=args.jitter, port=args.port)
+    print(f"Fixture server: OpenF1 at {server.base_url}, Ergast at {server.ergast_url} ({server.describe()})")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Local stand-in for the OpenF1 REST API used by the benchmarks.
+
+Serves synthetic but realistically shaped data for one race session under the
+same paths as api.openf1.org (/v1/sessions, /v1/drivers, /v1/laps, ...), plus
+Ergast season schedules and driver/constructor standings of any season under
+/ergast/f1 (point FastF1 at it with ERGAST_BASE_URL=<server.ergast_url>), and can
+inject latency and jitter per request, or fail every request with
+``fail_status`` (an outage or throttling). Like OpenF1, car_data and
+location answer 404 when no samples match the filters. Point the app at it
+with OPENF1_BASE_URL=<server.base_url>.
+
+    with MockOpenF1Server(latency=0.2) as server:
+        os.environ["OPENF1_BASE_URL"] = server.base_url
+        ...
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+SESSION_KEY = 9999
+SESSION_START = datetime(2024, 9, 1, 13, 0, tzinfo=timezone.utc)
+TEAMS = ["Red Bull Racing", "Ferrari", "Mercedes", "McLaren", "Aston Martin",
+         "Alpine", "Williams", "RB", "Kick Sauber", "Haas F1 Team"]
+# Endpointy, ktoré na prázdny výsledok odpovedajú 404 "No results found." ako OpenF1
+NOT_FOUND_WHEN_EMPTY = ("car_data", "location")
+DRIVER_NUMBERS = [1, 11, 16, 55, 44, 63, 4, 81, 14, 18, 10, 31, 23, 2, 22, 3, 77, 24, 20, 27]
+
+
+def _iso(dt):
+    return dt.isoformat()
+
+
+def make_sessions(count=400, session_key=SESSION_KEY):
+    """Session catalogue; the requested session is the latest one."""
+    sessions = []
+    for i in range(count):
+        key = session_key - count + 1 + i
+        date = SESSION_START - timedelta(days=3 * (count - 1 - i))
+        sessions.append({
+            "session_key": key,
+            "meeting_key": 1000 + i // 5,
+            "session_name": ["Practice 1", "Practice 2", "Practice 3", "Qualifying", "Race"][i % 5],
+            "session_type": "Race" if i % 5 == 4 else "Practice",
+            "date_start": _iso(date),
+            "date_end": _iso(date + timedelta(hours=2)),
+            "year": date.year,
+            "location": "Monza",
+            "country_name": "Italy",
+            "circuit_short_name": "Monza",
+        })
+    return sessions
+
+
+def make_drivers(count=20, session_key=SESSION_KEY):
+    drivers = []
+    for i, number in enumerate(DRIVER_NUMBERS[:count]):
+        drivers.append({
+            "session_key": session_key,
+            "driver_number": number,
+            "broadcast_name": f"D. DRIVER{number}",
+            "first_name": "Driver",
+            "last_name": f"No{number}",
+            "full_name": f"Driver No{number}",
+            "name_acronym": f"D{number:02d}"[:3],
+            "team_name": TEAMS[i // 2 % len(TEAMS)],
+            "team_colour": "3671C6",
+            "country_code": "ITA",
+            "headshot_url": None,
+        })
+    return drivers
+
+
+def make_laps(drivers=20, laps=60, session_key=SESSION_KEY, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for number in DRIVER_NUMBERS[:drivers]:
+        base = 80 + rng.random() * 2
+        t = SESSION_START
+        for lap_number in range(1, laps + 1):
+            pit_out = lap_number in (1, laps // 2)
+            s1, s2, s3 = (base * f + rng.gauss(0, 0.15) for f in (0.32, 0.36, 0.32))
+            duration = None if lap_number == 1 else round(s1 + s2 + s3 + (20 if pit_out else 0), 3)
+            rows.append({
+                "session_key": session_key,
+                "meeting_key": 1229,
+                "driver_number": number,
+                "lap_number": lap_number,
+                "date_start": _iso(t),
+                "duration_sector_1": None if lap_number == 1 else round(s1, 3),
+                "duration_sector_2": round(s2, 3),
+                "duration_sector_3": round(s3, 3),
+                "i1_speed": rng.randint(250, 300),
+                "i2_speed": rng.randint(250, 300),
+                "st_speed": rng.randint(300, 345),
+                "is_pit_out_lap": pit_out,
+                "lap_duration": duration,
+                "segments_sector_1": [2049, 2049, 2051],
+                "segments_sector_2": [2049, 2051, 2049],
+                "segments_sector_3": [2048, 2049, 2049],
+            })
+            t += timedelta(seconds=duration or base)
+    return rows
+
+
+def make_team_radio(count=150, session_key=SESSION_KEY, seed=2):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        number = rng.choice(DRIVER_NUMBERS)
+        rows.append({
+            "session_key": session_key,
+            "meeting_key": 1229,
+            "driver_number": number,
+            "date": _iso(SESSION_START + timedelta(seconds=30 * i)),
+            "recording_url": f"https://livetiming.formula1.com/static/radio/{number}_{i}.mp3",
+        })
+    return rows
+
+
+def make_race_control(count=120, session_key=SESSION_KEY):
+    rows = []
+    for i in range(count):
+        rows.append({
+            "session_key": session_key,
+            "meeting_key": 1229,
+            "date": _iso(SESSION_START + timedelta(seconds=45 * i)),
+            "category": "Flag" if i % 3 else "Other",
+            "flag": "YELLOW" if i % 3 == 1 else ("GREEN" if i % 3 == 2 else None),
+            "scope": "Sector" if i % 3 == 1 else "Track",
+            "sector": (i % 20) + 1 if i % 3 == 1 else None,
+            "lap_number": i // 2 + 1,
+            "driver_number": None,
+            "message": f"MESSAGE {i}",
+        })
+    return rows
+
+
+def make_positions(count=5000, session_key=SESSION_KEY, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    order = list(DRIVER_NUMBERS)
+    t = SESSION_START
+    for i in range(count):
+        if i % 20 == 0:
+            a = rng.randrange(len(order) - 1)
+            order[a], order[a + 1] = order[a + 1], order[a]
+        number = order[i % 20]
+        t += timedelta(milliseconds=rng.randint(50, 900))
+        rows.append({
+            "session_key": session_key,
+            "meeting_key": 1229,
+            "driver_number": number,
+            "date": _iso(t),
+            "position": order.index(number) + 1,
+        })
+    return rows
+
+
+def _track_profile(phase):
+    """Speed (km/h) and throttle/brake over one lap; ``phase`` is 0..1 along the lap."""
+    corner = math.sin(phase * 2 * math.pi * 9) + 0.6 * math.sin(phase * 2 * math.pi * 4 + 1)
+    speed = 215 + 95 * corner / 1.6
+    braking = corner < -0.7
+    return speed, 0 if braking else min(100, 60 + 40 * corner), 100 if braking else 0
+
+
+def make_car_data(drivers=4, laps=60, hz=3.7, session_key=SESSION_KEY, seed=4):
+    """
+    /v1/car_data samples (~3.7 Hz like OpenF1) for the first ``drivers``
+    drivers, following the lap timing of make_laps(). Large: opt-in only.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for lap in make_laps(drivers, laps, session_key):
+        duration = lap["lap_duration"] or 82.0
+        start = datetime.fromisoformat(lap["date_start"])
+        for i in range(int(duration * hz)):
+            phase = i / (duration * hz)
+            speed, throttle, brake = _track_profile(phase)
+            speed += rng.gauss(0, 1.5)
+            rows.append({
+                "session_key": session_key,
+                "meeting_key": 1229,
+                "driver_number": lap["driver_number"],
+                "date": _iso(start + timedelta(seconds=i / hz + rng.uniform(0, 0.05))),
+                "speed": round(speed),
+                "throttle": round(throttle),
+                "brake": brake,
+                "n_gear": max(1, min(8, int(speed // 40))),
+                "rpm": round(9000 + 30 * (speed % 40) + rng.gauss(0, 80)),
+                "drs": 12 if speed > 300 else 0,
+            })
+    return rows
+
+
+def make_location(drivers=4, laps=60, hz=3.7, session_key=SESSION_KEY):
+    """/v1/location samples tracing an oval-ish lap, see make_car_data()."""
+    rows = []
+    for lap in make_laps(drivers, laps, session_key):
+        duration = lap["lap_duration"] or 82.0
+        start = datetime.fromisoformat(lap["date_start"])
+        for i in range(int(duration * hz)):
+            angle = 2 * math.pi * i / (duration * hz)
+            rows.append({
+                "session_key": session_key,
+                "meeting_key": 1229,
+                "driver_number": lap["driver_number"],
+                "date": _iso(start + timedelta(seconds=i / hz)),
+                "x": round(4000 * math.cos(angle) + 600 * math.cos(3 * angle)),
+                "y": round(2500 * math.sin(angle)),
+                "z": round(120 + 15 * math.sin(2 * angle)),
+            })
+    return rows
+
+
+ERGAST_ROUNDS = 24
+RACE_POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+SPRINT_POINTS = [8, 7, 6, 5, 4, 3, 2, 1]
+ERGAST_PATH = re.compile(r"^/(\d{4})(?:/(\d+)/(driverStandings|constructorStandings))?\.json$")
+
+
+def _mrdata(total, **table):
+    return {"MRData": {"xmlns": "", "series": "f1", "url": "", "limit": "100", "offset": "0", "total": str(total),
+                       **table}}
+
+
+def _race_date(season, round_num):
+    """Sunday races from early March, every 12 days."""
+    return datetime(season, 3, 1, 14, 0, tzinfo=timezone.utc) + timedelta(days=12 * (round_num - 1))
+
+
+def _is_sprint(round_num):
+    return round_num % 4 == 2
+
+
+def make_ergast_schedule(season, rounds=ERGAST_ROUNDS):
+    """Ergast /<season>.json: the race calendar with session times (every fourth weekend a sprint)."""
+    races = []
+    for round_num in range(1, rounds + 1):
+        race = _race_date(season, round_num)
+
+        def at(days, hour):
+            dt = (race - timedelta(days=days)).replace(hour=hour)
+            return {"date": dt.strftime("%Y-%m-%d"), "time": dt.strftime("%H:%M:%SZ")}
+
+        entry = {
+            "season": str(season),
+            "round": str(round_num),
+            "url": "",
+            "raceName": f"Grand Prix {round_num}",
+            "Circuit": {"circuitId": f"circuit_{round_num}", "url": "", "circuitName": f"Circuit {round_num}",
+                        "Location": {"lat": "45.6", "long": "9.28", "locality": "Monza", "country": "Italy"}},
+            "date": race.strftime("%Y-%m-%d"),
+            "time": race.strftime("%H:%M:%SZ"),
+            "FirstPractice": at(2, 11),
+            "Qualifying": at(1, 14),
+        }
+        if _is_sprint(round_num):
+            entry["Sprint"] = at(1, 10)
+        else:
+            entry["SecondPractice"] = at(2, 15)
+            entry["ThirdPractice"] = at(1, 10)
+        races.append(entry)
+    return _mrdata(len(races), RaceTable={"season": str(season), "Races": races})
+
+
+def _season_points(season, round_num, drivers=20):
+    """(points, wins) per driver number after ``round_num`` of ``season`` (seeded random results)."""
+    numbers = DRIVER_NUMBERS[:drivers]
+    points = dict.fromkeys(numbers, 0)
+    wins = dict.fromkeys(numbers, 0)
+    for r in range(1, round_num + 1):
+        rng = random.Random(season * 100 + r)
+        # Slabšie skreslené poradie: nižší index v DRIVER_NUMBERS jazdí spravidla vpredu
+        order = sorted(numbers, key=lambda n: numbers.index(n) + rng.uniform(0, 8))
+        for place, number in enumerate(order[:len(RACE_POINTS)]):
+            points[number] += RACE_POINTS[place]
+        wins[order[0]] += 1
+        if _is_sprint(r):
+            for place, number in enumerate(sorted(numbers, key=lambda n: numbers.index(n) + rng.uniform(0, 8))[:8]):
+                points[number] += SPRINT_POINTS[place]
+    return points, wins
+
+
+def make_ergast_standings(season, round_num, kind="driverStandings", drivers=20, now=None):
+    """
+    Ergast /<season>/<round>/driverStandings.json or constructorStandings.json;
+    empty (like Ergast) until the round's race is over.
+    """
+    if _race_date(season, round_num) + timedelta(hours=3) > (now or datetime.now(timezone.utc)):
+        return _mrdata(0, StandingsTable={"season": str(season), "round": str(round_num), "StandingsLists": []})
+    points, wins = _season_points(season, round_num, drivers)
+    teams = {number: TEAMS[i // 2 % len(TEAMS)] for i, number in enumerate(DRIVER_NUMBERS[:drivers])}
+
+    def constructor(team):
+        return {"constructorId": team.lower().replace(" ", "_"), "url": "", "name": team, "nationality": "Italian"}
+
+    if kind == "driverStandings":
+        rows = [{"points": points[n], "wins": wins[n],
+                 "Driver": {"driverId": f"driver{n}", "permanentNumber": str(n), "code": f"D{n:02d}"[:3], "url": "",
+                            "givenName": "Driver", "familyName": f"No{n}", "dateOfBirth": "1995-01-01",
+                            "nationality": "Italian"},
+                 "Constructors": [constructor(teams[n])]} for n in points]
+    else:
+        by_team = {}
+        for number, team in teams.items():
+            by_team.setdefault(team, {"points": 0, "wins": 0, "Constructor": constructor(team)})
+            by_team[team]["points"] += points[number]
+            by_team[team]["wins"] += wins[number]
+        rows = list(by_team.values())
+    rows.sort(key=lambda row: (-row["points"], -row["wins"]))
+    for position, row in enumerate(rows, 1):
+        row.update(position=str(position), positionText=str(position), points=str(row["points"]), wins=str(row["wins"]))
+    standings = {"season": str(season), "round": str(round_num),
+                 "DriverStandings" if kind == "driverStandings" else "ConstructorStandings": rows}
+    return _mrdata(len(rows), StandingsTable={"season": str(season), "round": str(round_num),
+                                              "StandingsLists": [standings]})
+
+
+def make_ergast(path, drivers=20, now=None):
+    """Synthetic Ergast response for ``path`` (below /ergast/f1), or None when not supported."""
+    match = ERGAST_PATH.match(path)
+    if match is None:
+        return None
+    season, round_num, kind = match.groups()
+    if round_num is None:
+        return make_ergast_schedule(int(season))
+    if not 1 <= int(round_num) <= ERGAST_ROUNDS:
+        return _mrdata(0, StandingsTable={"season": season, "StandingsLists": []})
+    return make_ergast_standings(int(season), int(round_num), kind, drivers=drivers, now=now)
+
+
+def default_datasets(drivers=20, laps=60):
+    return {
+        "sessions": make_sessions(),
+        "drivers": make_drivers(drivers),
+        "laps": make_laps(drivers, laps),
+        "team_radio": make_team_radio(),
+        "race_control": make_race_control(),
+        "position": make_positions(),
+    }
+
+
+def _coerce(value):
+    if value in ("true", "false"):
+        return value == "true"
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def filter_rows(rows, query):
+    """
+    Applies OpenF1-style filters. "date>=x" arrives as key "date>" with value x,
+    "date>x" arrives as key "date>x" with an empty value.
+    """
+    for raw_key, raw_value in query:
+        key, op = raw_key, "="
+        if raw_key[-1:] in (">", "<"):
+            key, op = raw_key[:-1], raw_key[-1] + "="
+        elif not raw_value:
+            for candidate in (">", "<"):
+                if candidate in raw_key:
+                    key, raw_value = raw_key.split(candidate, 1)
+                    op = candidate
+                    break
+        value = _coerce(raw_value)
+        if key == "session_key" and value == "latest":
+            continue
+        if op == "=":
+            rows = [r for r in rows if r.get(key) == value]
+        elif op == ">":
+            rows = [r for r in rows if r.get(key) is not None and r[key] > value]
+        elif op == ">=":
+            rows = [r for r in rows if r.get(key) is not None and r[key] >= value]
+        elif op == "<":
+            rows = [r for r in rows if r.get(key) is not None and r[key] < value]
+        elif op == "<=":
+            rows = [r for r in rows if r.get(key) is not None and r[key] <= value]
+    return rows
+
+
+class MockOpenF1Server:
+    """Threaded HTTP server that mimics the OpenF1 /v1 endpoints."""
+
+    def __init__(self, latency=0.0, jitter=0.0, drivers=20, laps=60, host="127.0.0.1", port=0, datasets=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_status = None
+        self.drivers = drivers
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self.datasets = datasets or default_datasets(drivers, laps)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def ergast_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/ergast/f1"
+
+    def ergast_response(self, path):
+        """Payload for an Ergast ``path`` (below /ergast/f1) or None for 404."""
+        return make_ergast(path, drivers=self.drivers)
+
+    def openf1_response(self, endpoint, query):
+        """Rows of an OpenF1 ``endpoint`` matching ``query`` (parse_qsl pairs), or None for 404."""
+        rows = self.datasets.get(endpoint)
+        if rows is None:
+            return None
+        rows = filter_rows(rows, query)
+        return None if not rows and endpoint in NOT_FOUND_WHEN_EMPTY else rows
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                ergast = parsed.path.startswith("/ergast/f1/")
+                endpoint = "ergast" if ergast else parsed.path.rstrip("/").rsplit("/", 1)[-1]
+                with server._lock:
+                    server.requests[endpoint] += 1
+
+                delay = server.latency + (random.uniform(-server.jitter, server.jitter) if server.jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if server.fail_status:
+                    self._send(server.fail_status, {"detail": "Injected failure"})
+                    return
+                if ergast:
+                    payload = server.ergast_response(parsed.path[len("/ergast/f1"):])
+                else:
+                    payload = server.openf1_response(endpoint, parse_qsl(parsed.query, keep_blank_values=True))
+                if payload is None:
+                    self._send(404, {"detail": "Not Found"})
+                    return
+                self._send(200, payload)
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local OpenF1 stand-in server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockOpenF1Server(latency=args.latency, jitter=args.jitter, port=args.port)
+    print(f"Mock OpenF1 serving at {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,180 @@
+"""
+Championship outlook: who can still win the title, who has clinched it.
+
+Everything is computed for all competitors (drivers or constructors) at once
+with NumPy. A competitor is compared by the key (points, wins, 2nd places,
+...), i.e. points with the FIA countback as tie-break, and:
+
+* its best case is winning every remaining race and sprint (plus the fastest
+  lap point where it exists) - finishing first dominates any other result,
+  because it maximizes its own points and countback and denies them to the
+  others; for constructors it is a 1-2 finish;
+* it is *eliminated* when the best rival's current key already beats its best
+  case - that rival can simply score nothing from here on;
+* it has *clinched* when its current key beats the best case of every rival.
+
+This is exact under the sporting rules (any car may be unclassified, so no
+points are forced onto a rival), unlike the old "leader points - 25 per GP"
+bound. Countback columns beyond what is known (Ergast only reports wins)
+are treated as equal; such a tie is never counted as eliminated or clinched.
+
+Points tables come from the season (race, sprint, fastest lap), the remaining
+events from the schedule's RoundNumber/EventFormat columns.
+"""
+import numpy as np
+import pandas as pd
+
+SPRINT_FORMATS = ("sprint", "sprint_shootout", "sprint_qualifying")
+
+
+def points_system(season):
+    """{"race": points by finishing place, "sprint": ..., "fastest_lap": bonus point} for a season."""
+    season = int(season)
+    if season >= 2010:
+        race = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+    elif season >= 2003:
+        race = [10, 8, 6, 5, 4, 3, 2, 1]
+    else:
+        race = [10, 6, 4, 3, 2, 1]
+    if season >= 2022:
+        sprint = [8, 7, 6, 5, 4, 3, 2, 1]
+    elif season == 2021:
+        sprint = [3, 2, 1]
+    else:
+        sprint = []
+    fastest_lap = 1 if 2019 <= season <= 2024 else 0
+    return {"race": race, "sprint": sprint, "fastest_lap": fastest_lap}
+
+
+def remaining_events(schedule, round):
+    """[("race" | "sprint", round_number), ...] for every scoring event after ``round``."""
+    if schedule is None or len(schedule) == 0:
+        return []
+    rounds = pd.to_numeric(schedule["RoundNumber"], errors="coerce").to_numpy()
+    formats = schedule["EventFormat"].astype(str).to_numpy() if "EventFormat" in schedule else \
+        np.full(len(rounds), "conventional")
+    events = []
+    for number, event_format in sorted(zip(rounds, formats), key=lambda e: e[0]):
+        # Testy majú RoundNumber 0
+        if not number > round or event_format == "testing":
+            continue
+        if event_format in SPRINT_FORMATS:
+            events.append(("sprint", int(number)))
+        events.append(("race", int(number)))
+    return events
+
+
+def event_maximum(events, system, cars=1):
+    """Most points one competitor (``cars`` = 1 for drivers, 2 for constructors) can take per event."""
+    maxima = []
+    for kind, _ in events:
+        table = system[kind]
+        best = sum(table[:cars])
+        if kind == "race":
+            best += system["fastest_lap"]
+        maxima.append(best)
+    return np.asarray(maxima, dtype=np.int64)
+
+
+def _lex_compare(a, b):
+    """Row-wise lexicographic comparison of two (n, k) arrays: -1, 0 or 1 per row."""
+    diff = np.sign(a - b)
+    first = np.argmax(diff != 0, axis=1)
+    return diff[np.arange(len(diff)), first]
+
+
+def _best_rival(keys):
+    """Index of the best competitor other than each row itself (by lexicographic key)."""
+    n = len(keys)
+    order = np.lexsort(keys.T[::-1])[::-1]  # najlepší prvý
+    best, second = order[0], order[1] if n > 1 else order[0]
+    rival = np.full(n, best)
+    rival[best] = second
+    return rival
+
+
+def evaluate(points, countback, event_max, races_remaining, step=1, cars=1):
+    """
+    Core engine. ``points`` (n,), ``countback`` (n, k) finishing-place counts
+    (column 0 = wins), ``event_max`` (e,) the most one competitor can score in
+    each remaining event and ``races_remaining`` the number of those events
+    that are Grands Prix (in the best case they add a win, or a 1-2 for
+    ``cars=2``, to the countback).
+
+    Returns a dict of (n,) arrays: max_points, eliminated, clinched,
+    points_needed (to get ahead of the best rival if it scores nothing; ``step``
+    is the smallest points difference) and needed_per_event (points_needed
+    spread over the remaining events).
+    """
+    points = np.asarray(points, dtype=np.int64)
+    countback = np.asarray(countback, dtype=np.int64).reshape(len(points), -1)
+    event_max = np.asarray(event_max, dtype=np.int64)
+    n, events = len(points), len(event_max)
+    remaining = int(event_max.sum())
+
+    current = np.column_stack([points, countback])
+    bonus = np.zeros(current.shape[1], dtype=np.int64)
+    bonus[0] = remaining
+    bonus[1:1 + cars] = races_remaining
+    best_case = current + bonus
+
+    if n < 2:
+        always = np.ones(n, dtype=bool)
+        return {"max_points": best_case[:, 0], "eliminated": ~always, "clinched": always,
+                "points_needed": np.zeros(n, dtype=np.int64), "needed_per_event": np.zeros(n)}
+
+    rival = _best_rival(current)
+    rival_current = current[rival]
+    # Poradie najlepších prípadov je rovnaké ako aktuálne (všetci môžu získať rovnako), takže
+    # najlepší súper v najhoršom prípade je ten istý súper
+    eliminated = _lex_compare(rival_current, best_case) > 0
+    clinched = _lex_compare(current, rival_current + bonus) > 0
+
+    # Bodový rozdiel na súpera; pri rovnosti bodov rozhoduje countback po víťazstve vo všetkých GP
+    gap = rival_current[:, 0] - points
+    tie_lost = _lex_compare(best_case[:, 1:], rival_current[:, 1:]) <= 0 if current.shape[1] > 1 \
+        else np.ones(n, dtype=bool)
+    points_needed = np.maximum(gap + tie_lost.astype(np.int64) * step, 0)
+    points_needed[eliminated] = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        needed_per_event = points_needed / events if events else np.zeros(n)
+    needed_per_event = np.where(eliminated, np.nan, needed_per_event)
+
+    return {"max_points": best_case[:, 0], "eliminated": eliminated, "clinched": clinched,
+            "points_needed": points_needed, "needed_per_event": needed_per_event}
+
+
+def outlook(standings, schedule, season, round, cars=1):
+    """
+    Adds max_points, eliminated, clinched, points_needed, needed_per_event and
+    can_win ("Yes"/"No") columns to an Ergast standings frame (drivers with
+    ``cars=1``, constructors with ``cars=2``). Returns a new DataFrame.
+    """
+    if standings.empty:
+        return standings.copy()
+    system = points_system(season)
+    events = remaining_events(schedule, round)
+    event_max = event_maximum(events, system, cars=cars)
+    races = sum(1 for kind, _ in events if kind == "race")
+
+    points = pd.to_numeric(standings["points"], errors="coerce").fillna(0).to_numpy()
+    wins = np.zeros(len(standings), dtype=np.int64)
+    if "wins" in standings:
+        wins = pd.to_numeric(standings["wins"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    # Polovičné body (skrátené preteky) - počítame v polbodoch, aby výpočet ostal celočíselný
+    scale = 2
+    result = evaluate(np.rint(points * scale).astype(np.int64), wins[:, None], event_max * scale, races,
+                      step=scale, cars=cars)
+
+    columns = pd.DataFrame({
+        "max_points": result["max_points"] / scale,
+        "eliminated": result["eliminated"],
+        "clinched": result["clinched"],
+        "points_needed": result["points_needed"] / scale,
+        "needed_per_event": np.round(result["needed_per_event"] / scale, 2),
+        "can_win": np.where(result["eliminated"], "No", "Yes"),
+    }, index=standings.index)
+    existing = [c for c in columns.columns if c in standings.columns]
+    if existing:
+        standings = standings.drop(columns=existing)
+    return pd.concat([standings, columns], axis=1)
@@ -0,0 +1,204 @@
+"""
+In-memory registry of circuit metadata and images.
+
+``data/circuits/<name>.csv`` files (a header row and one row of values) and
+``static/circuits/<name>.<ext>`` images are indexed once; afterwards a lookup
+by OpenF1 ``circuit_short_name`` is a dictionary access. Names are matched
+case-, accent- and punctuation-insensitively and every name of a circuit
+resolves to the same entry:
+
+* CSV files describing the same ``Circuit`` (e.g. Baku.csv and Azerbaijan.csv)
+  are merged into one entry known under both file names,
+* ``data/circuits/aliases.csv`` (``alias,circuit``) adds further names, e.g.
+  "Belgium" -> "Spa-Francorchamps" or "Bahrain" -> "Sakhir",
+* images are attached to the entry their file name resolves to.
+
+A background thread re-indexes both directories when a file is added, removed
+or modified, so edits show up without a restart and lookups never touch disk.
+"""
+import csv
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".avif", ".webp", ".png", ".jpg", ".jpeg", ".svg")
+ALIASES_FILE = "aliases.csv"
+
+
+def normalize_name(name):
+    """"Spa-Francorchamps" -> "spafrancorchamps", "São Paulo" -> "saopaulo"."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]", "", text.casefold())
+
+
+def read_circuit_csv(path):
+    """{header: value} from a circuit CSV. Tolerates a values row that was quoted as a single field."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    if len(rows) < 2:
+        return {}
+    headers, values = rows[0], rows[1]
+    if len(values) == 1 and len(headers) > 1 and "," in values[0]:
+        values = next(csv.reader([values[0]]))
+    return {h.strip(): v.strip() for h, v in zip(headers, values)}
+
+
+class Circuit:
+    """One circuit: ``info`` (CSV fields), ``image`` (path relative to static/) and all ``names``."""
+
+    __slots__ = ("name", "info", "image", "images", "names")
+
+    def __init__(self, name, info=None):
+        self.name = name
+        self.info = info or {}
+        self.image = None
+        self.images = {}
+        self.names = set()
+
+    def image_for(self, name):
+        """The image named after ``name`` if there is one, else the circuit's default image."""
+        return self.images.get(normalize_name(name), self.image)
+
+    def as_dict(self):
+        return {"name": self.name, "info": self.info, "image": self.image, "names": sorted(self.names)}
+
+
+class CircuitRegistry:
+    def __init__(self, data_dir, static_dir, static_prefix="circuits", reload_interval=10.0):
+        self.data_dir = data_dir
+        self.static_dir = static_dir
+        self.static_prefix = static_prefix
+        self.reload_interval = reload_interval
+        self._index = {}
+        self._signature = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.loads = 0
+        self.reload()
+
+    def _scan_signature(self):
+        signature = []
+        for directory in (self.data_dir, self.static_dir):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            st = entry.stat()
+                            signature.append((entry.path, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                continue
+        return tuple(sorted(signature))
+
+    def _build(self):
+        circuits = {}  # normalizované meno okruhu (stĺpec Circuit) -> Circuit
+        index = {}
+        names = sorted(os.listdir(self.data_dir)) if os.path.isdir(self.data_dir) else []
+        for file_name in names:
+            stem, ext = os.path.splitext(file_name)
+            if ext.lower() != ".csv" or file_name == ALIASES_FILE:
+                continue
+            try:
+                info = read_circuit_csv(os.path.join(self.data_dir, file_name))
+            except Exception as e:
+                logger.exception("Error reading circuit CSV %s: %s", file_name, e)
+                continue
+            if not info:
+                continue
+            canonical = info.get("Circuit") or stem
+            circuit = circuits.setdefault(normalize_name(canonical), Circuit(canonical, info))
+            circuit.names.add(stem)
+            index[normalize_name(stem)] = circuit
+        for circuit in circuits.values():
+            index.setdefault(normalize_name(circuit.name), circuit)
+
+        aliases_path = os.path.join(self.data_dir, ALIASES_FILE)
+        if os.path.exists(aliases_path):
+            with open(aliases_path, "r", encoding="utf-8-sig", newline="") as f:
+                for row in csv.DictReader(f):
+                    alias, target = (row.get("alias") or "").strip(), (row.get("circuit") or "").strip()
+                    if alias and normalize_name(alias) == normalize_name(target):
+                        # "Miami,Miami" nepridá nič - meno už vedie na okruh (alebo nikam)
+                        logger.warning("Ignoring identity alias %r in %s", alias, ALIASES_FILE)
+                        continue
+                    circuit = index.get(normalize_name(target))
+                    if alias and circuit is not None:
+                        circuit.names.add(alias)
+                        index.setdefault(normalize_name(alias), circuit)
+
+        images = sorted(os.listdir(self.static_dir)) if os.path.isdir(self.static_dir) else []
+        for file_name in images:
+            stem, ext = os.path.splitext(file_name)
+            if ext.lower() not in IMAGE_EXTENSIONS:
+                continue
+            key = normalize_name(stem)
+            circuit = index.get(key)
+            if circuit is None:
+                # Obrázok bez CSV - aspoň obrázok sa dá zobraziť
+                circuit = index[key] = Circuit(stem)
+            circuit.names.add(stem)
+            path = f"{self.static_prefix}/{file_name}"
+            # Pri viacerých formátoch toho istého mena má prednosť poradie v IMAGE_EXTENSIONS
+            previous = circuit.images.get(key)
+            if previous is None or IMAGE_EXTENSIONS.index(ext.lower()) < \
+                    IMAGE_EXTENSIONS.index(os.path.splitext(previous)[1].lower()):
+                circuit.images[key] = path
+        for circuit in set(index.values()):
+            if circuit.images:
+                preferred = [normalize_name(n) for n in sorted(circuit.names)]
+                circuit.image = next(circuit.images[k] for k in preferred if k in circuit.images)
+        return index
+
+    def reload(self, force=True):
+        """Re-indexes both directories (when ``force`` is false, only if a file changed). Returns True if it did."""
+        signature = self._scan_signature()
+        if not force and signature == self._signature:
+            return False
+        index = self._build()
+        with self._lock:
+            self._index = index
+            self._signature = signature
+            self.loads += 1
+        return True
+
+    def _ensure_watching(self):
+        if self.reload_interval <= 0 or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._watch, daemon=True, name="circuit-registry")
+            self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload(force=False)
+            except Exception as e:
+                logger.exception("Reloading circuits failed: %s", e)
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, name):
+        """Circuit for any of its names, or None."""
+        self._ensure_watching()
+        if not name:
+            return None
+        return self._index.get(normalize_name(name))
+
+    def circuits(self):
+        """Every distinct circuit."""
+        seen = {}
+        for circuit in self._index.values():
+            seen.setdefault(id(circuit), circuit)
+        return sorted(seen.values(), key=lambda c: c.name)
+
+    def stats(self):
+        return {"circuits": len(self.circuits()), "names": len(self._index), "loads": self.loads}
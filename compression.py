@@ -0,0 +1,127 @@
+"""
+gzip/brotli compression of dynamic JSON responses.
+
+:class:`ResponseCompressor` runs as an ``after_request`` hook: a JSON response
+of at least ``min_size`` bytes is compressed with the best encoding the client
+accepts (``br`` when the optional ``brotli`` package is installed, else
+``gzip``) and gets ``Vary: Accept-Encoding``. Smaller bodies are sent as they
+are - the header overhead and CPU time are not worth it.
+
+Responses with a strong ETag (the cacheable session data, see http_cache) are
+immutable for a given tag, so their compressed bodies are kept in a small LRU
+and compressed only once. The ETag of a compressed variant gets an encoding
+suffix (``"<hash>-br"``), as the bytes differ; http_cache ignores the suffix
+when it compares If-None-Match.
+"""
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli je voliteľný, bez neho sa používa len gzip
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+
+
+def compress(body, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+def negotiate(accept_encodings, available=ENCODINGS):
+    """Best of ``available`` the client accepts (werkzeug Accept header), or None."""
+    best = accept_encodings.best_match(available)
+    return best if best in available else None
+
+
+def strip_encoding_suffix(etag):
+    """``"<hash>-gzip"`` -> ``"<hash>"`` (unquoted tags, as werkzeug returns them)."""
+    for encoding in ("br", "gzip"):
+        if etag.endswith("-" + encoding):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+
+class ResponseCompressor:
+    def __init__(self, min_size=MIN_SIZE, encodings=ENCODINGS, cache_bytes=32 * 1024 * 1024,
+                 mimetypes=("application/json",)):
+        self.min_size = min_size
+        self.encodings = encodings
+        self.cache_bytes = cache_bytes
+        self.mimetypes = mimetypes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.cache_hits = 0
+        self.skipped_small = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _cached(self, key, body, encoding):
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return data
+        data = compress(body, encoding)
+        with self._lock:
+            if key not in self._cache and len(data) <= self.cache_bytes:
+                self._cache[key] = data
+                self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+        return data
+
+    def __call__(self, response, request):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or response.mimetype not in self.mimetypes or "Content-Encoding" in response.headers):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(request.accept_encodings, self.encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            with self._lock:
+                self.skipped_small += 1
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            data = self._cached((etag, encoding), body, encoding)
+            response.set_etag(f"{etag}-{encoding}")
+        else:
+            data = compress(body, encoding)
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(data)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "encodings": list(self.encodings),
+                "min_size": self.min_size,
+                "compressed": self.compressed,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._cache),
+                "skipped_small": self.skipped_small,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            }
@@ -0,0 +1,223 @@
+"""
+Managed on-disk cache for FastF1 and its Ergast client.
+
+FastF1 keeps two kinds of cached data in its cache directory: a requests-cache
+SQLite database with raw HTTP responses (``fastf1_http_cache.sqlite``; Ergast
+standings and schedules live here) and pickled, parsed API data under
+``<season>/<event>/<session>/``. This module points FastF1 at a directory we
+control (``FASTF1_CACHE_DIR``) before its first use, so restarts and new
+workers read from disk instead of refetching, and keeps the directory within
+a size budget (``FASTF1_CACHE_MB``):
+
+* parsed files are evicted least-recently-used first (by the later of access
+  and modification time),
+* if that is not enough, the oldest HTTP responses are dropped.
+
+The budget is enforced by a background thread of each process every
+``FASTF1_CACHE_PRUNE_INTERVAL`` seconds (0 = never, then only by the
+``flask fastf1-cache prune`` command), never inside a request.
+
+With ``FASTF1_OFFLINE=1`` FastF1 sends no requests at all and serves only
+what is cached. ``ERGAST_BASE_URL`` points the Ergast client (standings and
+schedules) at another server, e.g. the benchmark fixture server.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("FASTF1_CACHE_DIR", os.path.join("data", "fastf1_cache"))
+MAX_BYTES = int(float(os.environ.get("FASTF1_CACHE_MB", 1024)) * 1024 * 1024)
+OFFLINE = os.environ.get("FASTF1_OFFLINE", "0") not in ("0", "false", "no", "")
+PRUNE_INTERVAL = float(os.environ.get("FASTF1_CACHE_PRUNE_INTERVAL", 600))
+ERGAST_BASE_URL = os.environ.get("ERGAST_BASE_URL")
+
+HTTP_CACHE_NAME = "fastf1_http_cache.sqlite"
+# Postupne prísnejšie limity veku HTTP odpovedí, keď samotné súbory nestačia
+HTTP_AGE_STEPS = (timedelta(days=90), timedelta(days=30), timedelta(days=7), timedelta(days=1), timedelta(0))
+
+_lock = threading.Lock()
+_configured_pid = None
+_pruner_pid = None
+
+
+def fastf1():
+    """
+    Imports fastf1 (with its events and Ergast modules), enables the managed
+    cache on first call in this process and returns the module.
+    """
+    global _configured_pid
+    import fastf1 as module
+    import fastf1.events  # noqa: F401
+    import fastf1.ergast  # noqa: F401
+
+    if _configured_pid != os.getpid():
+        with _lock:
+            if _configured_pid != os.getpid():
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                module.Cache.enable_cache(CACHE_DIR)
+                if OFFLINE:
+                    module.Cache.offline_mode(True)
+                if ERGAST_BASE_URL:
+                    # interface číta BASE_URL pri každom volaní, legacy (rozvrh sezóny) si ho skopíroval pri importe
+                    module.ergast.interface.BASE_URL = ERGAST_BASE_URL.rstrip("/")
+                    module.ergast.legacy.base_url = ERGAST_BASE_URL.rstrip("/")
+                _configured_pid = os.getpid()
+                _start_pruner()
+    return module
+
+
+def _http_session():
+    req = sys.modules.get("fastf1.req")
+    return None if req is None else req.Cache._requests_session_cached
+
+
+def _walk(cache_dir):
+    """Yields (path, size, last_used) of every file below ``cache_dir``."""
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, st.st_size, max(st.st_atime, st.st_mtime)
+
+
+def usage(cache_dir=None):
+    """Size breakdown of the cache directory."""
+    cache_dir = cache_dir or CACHE_DIR
+    total = http = files = 0
+    seasons = {}
+    for path, size, _ in _walk(cache_dir):
+        total += size
+        relative = os.path.relpath(path, cache_dir)
+        if relative.startswith(HTTP_CACHE_NAME):
+            http += size
+            continue
+        files += 1
+        top = relative.split(os.sep, 1)[0]
+        seasons[top] = seasons.get(top, 0) + size
+    session = _http_session()
+    responses = None
+    if session is not None:
+        try:
+            responses = len(session.cache.responses)
+        except Exception:
+            responses = None
+    return {
+        "cache_dir": os.path.abspath(cache_dir),
+        "bytes": total,
+        "max_bytes": MAX_BYTES,
+        "http_cache_bytes": http,
+        "http_responses": responses,
+        "files": files,
+        "seasons": dict(sorted(seasons.items())),
+        "offline": OFFLINE,
+    }
+
+
+def prune(max_bytes=None, cache_dir=None):
+    """
+    Brings the cache under ``max_bytes`` (default FASTF1_CACHE_MB). Returns
+    {"files_removed", "bytes_freed", "http_pruned_older_than", "bytes"}.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = list(_walk(cache_dir))
+    total = sum(size for _, size, _ in entries)
+    result = {"files_removed": 0, "bytes_freed": 0, "http_pruned_older_than": None, "bytes": total}
+    if total <= max_bytes:
+        return result
+
+    http_path = os.path.join(cache_dir, HTTP_CACHE_NAME)
+    parsed = sorted((e for e in entries if not e[0].startswith(http_path)), key=lambda e: e[2])
+    for path, size, _ in parsed:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        result["files_removed"] += 1
+        result["bytes_freed"] += size
+    _remove_empty_dirs(cache_dir)
+
+    session = _http_session()
+    if total > max_bytes and session is not None:
+        for age in HTTP_AGE_STEPS:
+            before = _size(http_path)
+            session.cache.delete(older_than=age)
+            after = _size(http_path)
+            total -= before - after
+            result["bytes_freed"] += before - after
+            result["http_pruned_older_than"] = str(age)
+            if total <= max_bytes:
+                break
+    result["bytes"] = total
+    return result
+
+
+def _start_pruner():
+    """Starts the pruning thread of this process (once per process; call with _lock held)."""
+    global _pruner_pid
+    if PRUNE_INTERVAL <= 0 or _pruner_pid == os.getpid():
+        return
+    _pruner_pid = os.getpid()
+    threading.Thread(target=_prune_periodically, daemon=True, name="fastf1-cache-prune").start()
+
+
+def _prune_periodically():
+    while True:
+        time.sleep(PRUNE_INTERVAL)
+        try:
+            freed = prune()
+            if freed["files_removed"] or freed["http_pruned_older_than"]:
+                logger.info("FastF1 cache pruned: %s", freed)
+        except Exception as e:
+            logger.exception("FastF1 cache prune failed: %s", e)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove_empty_dirs(cache_dir):
+    for root, dirs, files in os.walk(cache_dir, topdown=False):
+        if root != cache_dir and not dirs and not files:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+
+def populate(season, rounds=None, progress=print):
+    """
+    Pre-fetches everything the app asks FastF1/Ergast for in a season: the
+    schedule and the driver and constructor standings after every finished
+    round (or only ``rounds``). Returns the number of lookups made.
+    """
+    module = fastf1()
+    schedule = module.events.get_event_schedule(season, backend="ergast")
+    progress(f"{season}: schedule with {len(schedule)} events")
+    calls = 1
+    if rounds is None:
+        import pandas as pd
+        finished = schedule[pd.to_datetime(schedule["EventDate"]) < pd.Timestamp.now()]
+        rounds = [int(r) for r in finished["RoundNumber"] if r > 0]
+    ergast = module.ergast.Ergast()
+    for round_num in rounds:
+        drivers = ergast.get_driver_standings(season=season, round=round_num)
+        constructors = ergast.get_constructor_standings(season=season, round=round_num)
+        calls += 2
+        progress(f"{season} round {round_num}: {len(drivers.content[0]) if drivers.content else 0} drivers, "
+                 f"{len(constructors.content[0]) if constructors.content else 0} constructors")
+    return calls
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings: ``gunicorn -c gunicorn.conf.py``
+
+The app is loaded once in the master (``preload_app``) through
+``app:create_app()``, which also imports fastf1 and resolves the current
+season/round, and workers are forked from that warm parent. Live pages keep a
+Server-Sent Events connection (/live_feed) open per client, hence threaded
+workers: each connection holds one of the ``GUNICORN_THREADS`` threads, so at
+most ``LIVE_FEED_MAX_STREAMS`` (default 8) are accepted per worker and further
+viewers get 503 and fall back to polling.
+
+The ASGI alternative (async views on an event loop, see asgi.py) is
+``uvicorn asgi:application --workers 2``; there /live_feed holds no thread
+and is not capped - use it when many viewers follow a live session.
+
+Prometheus metrics (observability.py) are per worker; with
+``PROMETHEUS_MULTIPROC_DIR`` set the workers write them to files there,
+/metrics sums them and the files of dead workers are dropped. The directory
+is emptied and created right here, when gunicorn reads this file - before
+the preloaded app creates its metrics in the master - and only once per
+master (not again on a HUP reload).
+"""
+import os
+import shutil
+
+wsgi_app = "app:create_app()"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir and os.environ.get("_PROMETHEUS_MULTIPROC_DIR_OWNER") != str(os.getpid()):
+    # Súbory metrík z minulého behu by sa pripočítali k novým
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir)
+    os.environ["_PROMETHEUS_MULTIPROC_DIR_OWNER"] = str(os.getpid())
+
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
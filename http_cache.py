@@ -0,0 +1,105 @@
+"""
+HTTP caching headers for session data endpoints.
+
+Data of a finished session never changes, so its responses can be cached by
+the browser and by a reverse proxy / CDN in front of gunicorn:
+
+* every response carries a strong ``ETag`` (a hash of the encoded body; for
+  cached datasets the body and its hash are computed once per dataset),
+* ``If-None-Match`` (also with the tag of a gzip/brotli variant, see
+  compression) and ``If-Modified-Since`` are answered with 304,
+* GET responses of a completed session whose data was fetched at least
+  ``HTTP_COMPLETED_AFTER`` seconds after the session ended (see
+  :func:`final_after`) get a long ``Cache-Control`` and ``Last-Modified`` =
+  the session end; sessions that are live, upcoming or unknown, and copies
+  fetched earlier (while OpenF1 may still be filling in data) or at an
+  unknown time, get a short max-age.
+
+POST requests keep working for old clients but are never marked cacheable.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, request
+
+from compression import strip_encoding_suffix
+from json_encoding import encode_fields
+from warmup import parse_date
+
+HISTORICAL_MAX_AGE = int(os.environ.get("HTTP_HISTORICAL_MAX_AGE", 365 * 24 * 3600))
+LIVE_MAX_AGE = int(os.environ.get("HTTP_LIVE_MAX_AGE", 5))
+# OpenF1 ešte chvíľu po skončení session dopĺňa dáta
+COMPLETED_AFTER = float(os.environ.get("HTTP_COMPLETED_AFTER", 3600))
+
+
+def strong_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def encode(**fields):
+    """(body, etag) of ``{"field": value, ...}``; memoize this per dataset."""
+    body = encode_fields(**fields)
+    return body, strong_etag(body)
+
+
+def session_end(session):
+    """End of a session if it is completed (see COMPLETED_AFTER), else None."""
+    if not session:
+        return None
+    ended = parse_date(session.get("date_end"))
+    if ended is None or datetime.now(timezone.utc) < ended + timedelta(seconds=COMPLETED_AFTER):
+        return None
+    return ended
+
+
+def final_after(session):
+    """
+    Time from which data of ``session`` fetched from OpenF1 is final
+    (``date_end`` + COMPLETED_AFTER), or None when the end is unknown.
+    """
+    ended = parse_date((session or {}).get("date_end"))
+    return None if ended is None else ended + timedelta(seconds=COMPLETED_AFTER)
+
+
+def cache_control(session, stored_at=None):
+    """
+    (Cache-Control value, Last-Modified or None) for data of ``session``
+    fetched at ``stored_at`` (Unix time, None = unknown).
+    """
+    ended = session_end(session)
+    if ended is not None and stored_at is not None and stored_at >= final_after(session).timestamp():
+        return f"public, max-age={HISTORICAL_MAX_AGE}, immutable", ended
+    return f"public, max-age={LIVE_MAX_AGE}", None
+
+
+def etag_matches(etag):
+    """Whether If-None-Match names ``etag``, also in its compressed variants ("<etag>-gzip")."""
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return True
+    return any(strip_encoding_suffix(tag) == etag for tag in if_none_match.as_set(include_weak=True))
+
+
+def cached_json(body, etag, session, status=200, stored_at=None):
+    """
+    JSON response with a strong ETag; for GET/HEAD also Cache-Control (and
+    Last-Modified) for ``session`` and data fetched at ``stored_at``, and 304
+    when the client's copy matches.
+    """
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    if request.method in ("GET", "HEAD"):
+        response.headers["Cache-Control"], last_modified = cache_control(session, stored_at)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        if etag_matches(etag):
+            response.status_code = 304
+            response.set_data(b"")
+            del response.headers["Content-Type"]
+            del response.headers["Content-Length"]
+            return response
+        response.make_conditional(request)
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,279 @@
+"""
+Incremental ("since cursor") store for live OpenF1 endpoints.
+
+For every (endpoint, session_key) an :class:`IncrementalFeed` remembers the
+newest ``date``/``date_start`` it has seen and asks OpenF1 only for records
+from that point on, adding them to an in-memory buffer ordered by their
+position: (cursor field value, record key). Clients pass back the cursor they
+got and receive only the delta. Payload size and CPU cost per poll stay
+proportional to what is new, not to the length of the session.
+
+The cursor is built from upstream data only - the position of the last
+record delivered plus the keys of delivered records that were still open -
+so every worker process (each has its own buffer) and a feed recreated after
+being idle read it the same way. A worker whose buffer is behind simply has
+nothing new yet and returns the cursor unchanged. Cursors are opaque strings;
+an empty, ``0`` or unreadable cursor means "everything".
+
+Records are deduplicated by a key (e.g. driver_number + lap_number); a
+record with a known key that comes back changed replaces the old version,
+which reaches clients that have not passed its position yet or that hold it
+as open.
+Records that are still open (``FeedSpec.is_open``, e.g. a lap without its
+duration yet) keep the request window open: the feed asks from the oldest
+open record instead of the newest cursor, so a lap that started before other
+drivers' later laps is fetched again once OpenF1 completes it, and a client
+whose cursor lists the lap as open gets the completed version in its delta.
+"""
+import base64
+import bisect
+import json
+import threading
+import time
+from datetime import datetime
+
+
+def _parse_cursor(value):
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def encode_cursor(position, open_keys=()):
+    """Opaque cursor string for a record position (value, key JSON) and the open record keys (key JSON)."""
+    if position is None:
+        return "0"
+    payload = json.dumps([position[0], position[1], sorted(open_keys)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(position or None, frozenset of open keys) of a cursor; (None, empty) for "everything"."""
+    if not cursor or cursor == "0":
+        return None, frozenset()
+    try:
+        value, key, open_keys = json.loads(base64.urlsafe_b64decode(str(cursor).encode("ascii")))
+        return (value, key), frozenset(open_keys)
+    except (ValueError, TypeError):
+        return None, frozenset()
+
+
+def _key_json(key):
+    return json.dumps(list(key), separators=(",", ":"), default=str)
+
+
+class FeedSpec:
+    """How to fetch and key one endpoint."""
+
+    def __init__(self, cursor_field, key_fields, inclusive=True, transform=None, is_open=None, max_open=600.0):
+        self.cursor_field = cursor_field
+        self.key_fields = tuple(key_fields)
+        # ">=" opakovane stiahne záznamy s posledným dátumom, deduplikácia ich odfiltruje
+        self.inclusive = inclusive
+        self.transform = transform
+        # is_open(raw) - záznam ešte OpenF1 doplní; po max_open sekundách za kurzorom sa naň už nečaká
+        # (napr. posledné kolo jazdca, ktorý odstúpil)
+        self.is_open = is_open
+        self.max_open = max_open
+
+
+class IncrementalFeed:
+    """Append-only, keyed buffer of one endpoint for one session."""
+
+    def __init__(self, endpoint, session_key, spec, fetch, min_interval=2.0, clock=time.monotonic):
+        self.endpoint = endpoint
+        self.session_key = session_key
+        self.spec = spec
+        self._fetch = fetch
+        self.min_interval = min_interval
+        self._clock = clock
+        self._lock = threading.Lock()  # chráni buffer
+        self._refresh_lock = threading.Lock()  # jeden upstream fetch naraz
+        self._entries = {}  # key -> (pozícia, raw record, stored record)
+        self._positions = []  # zoradené pozície (hodnota kurzora, JSON kľúča) všetkých záznamov
+        self._keys = {}  # JSON kľúča -> kľúč
+        self._open = {}  # key -> hodnota kurzora otvorených záznamov
+        self.cursor = None
+        self.last_refresh = None
+        self.last_access = clock()
+        self.fetches = 0
+
+    def refresh(self, force=False):
+        """
+        Fetches records newer than the cursor (at most once per min_interval,
+        concurrent callers share one fetch). Returns the number of new or changed records.
+        """
+        with self._refresh_lock:
+            now = self._clock()
+            if not force and self.last_refresh is not None and now - self.last_refresh < self.min_interval:
+                return 0
+            filters = None
+            since = self._request_from()
+            if since is not None:
+                op = ">=" if self.spec.inclusive or since != self.cursor else ">"
+                filters = [(self.spec.cursor_field, op, since)]
+            records = self._fetch(self.endpoint, self.session_key, filters)
+            self.fetches += 1
+            self.last_refresh = now
+            if isinstance(records, dict):
+                records = [records]
+            return self._ingest(records or [])
+
+    def _request_from(self):
+        """The cursor, or the cursor value of the oldest record that is still open."""
+        if self.cursor is None or not self._open:
+            return self.cursor
+        newest = _parse_cursor(self.cursor)
+        for key, value in list(self._open.items()):
+            started = _parse_cursor(value)
+            if newest is not None and started is not None and (newest - started).total_seconds() > self.spec.max_open:
+                del self._open[key]
+        return min(self._open.values(), default=self.cursor)
+
+    def _ingest(self, records):
+        # Buffer mení iba refresh (pod _refresh_lock), takže porovnanie a transform
+        # môžu bežať bez zámku; čitatelia čakajú len na samotné pridanie.
+        field = self.spec.cursor_field
+        # Poradie v bufferi = poradie podľa kurzora (dávky na seba nadväzujú)
+        records = sorted(records, key=lambda r: (r.get(field) is not None, r.get(field) or ""))
+        changed = []
+        opened = {}  # key -> hodnota kurzora, None = už nie je otvorený
+        cursor = self.cursor
+        for raw in records:
+            key = tuple(raw.get(f) for f in self.spec.key_fields)
+            if self.spec.is_open is not None:
+                is_open = raw.get(field) is not None and self.spec.is_open(raw)
+                opened[key] = raw.get(field) if is_open else None
+            old = self._entries.get(key)
+            if old is not None and old[1] == raw:
+                continue
+            changed.append((key, raw))
+            value = raw.get(field)
+            if value is not None and (cursor is None or value > cursor):
+                cursor = value
+
+        if not changed:
+            with self._lock:
+                self._set_open(opened)
+            return 0
+        stored = [dict(raw) for _, raw in changed]
+        if self.spec.transform is not None:
+            stored = self.spec.transform(self.session_key, stored)
+        with self._lock:
+            for (key, raw), record in zip(changed, stored):
+                old = self._entries.get(key)
+                if old is not None:
+                    position = old[0]
+                else:
+                    key_json = _key_json(key)
+                    position = (raw.get(field) or "", key_json)
+                    self._keys[key_json] = key
+                    if not self._positions or position > self._positions[-1]:
+                        self._positions.append(position)
+                    else:
+                        bisect.insort(self._positions, position)
+                self._entries[key] = (position, raw, record)
+            # Spolu so záznamami, inak by since() vydal starú otvorenú verziu ako uzavretú
+            self._set_open(opened)
+            self.cursor = cursor
+        return len(changed)
+
+    def _set_open(self, opened):
+        for key, value in opened.items():
+            if value is None:
+                self._open.pop(key, None)
+            else:
+                self._open[key] = value
+
+    def seed(self, records):
+        """
+        Fills an empty feed from a persisted copy of the endpoint (raw API
+        records), so the next refresh only asks OpenF1 for what came after it.
+        Returns the number of records loaded (0 if the feed already had data).
+        """
+        with self._refresh_lock:
+            if self._entries:
+                return 0
+            return self._ingest(records)
+
+    def raw_records(self):
+        """The latest raw API version of every record, in cursor order (for persisting the feed)."""
+        with self._lock:
+            return [self._entries[self._keys[position[1]]][1] for position in self._positions]
+
+    def since(self, cursor=0):
+        """
+        Returns (records, next_cursor): the latest version of every record
+        positioned after ``cursor`` and of every record the cursor lists as
+        open that is no longer open here, in cursor order ("0" = everything).
+        Stored records are shared; do not mutate them.
+        """
+        position, open_keys = decode_cursor(cursor)
+        with self._lock:
+            self.last_access = self._clock()
+            start = 0 if position is None else bisect.bisect_right(self._positions, tuple(position))
+            newer = self._positions[start:]
+            updated, still_open = [], []
+            for key_json in open_keys:
+                key = self._keys.get(key_json)
+                entry = self._entries.get(key) if key is not None else None
+                if entry is not None and entry[0] > tuple(position):
+                    continue  # je medzi novými záznamami
+                if entry is None or key in self._open:
+                    # Tento worker ho ešte nemá alebo ešte nie je uzavretý - klient naň čaká ďalej
+                    still_open.append(key_json)
+                else:
+                    updated.append(entry[0])
+            positions = sorted(updated) + newer
+            records = [self._entries[self._keys[p[1]]][2] for p in positions]
+            still_open += [p[1] for p in newer if self._keys[p[1]] in self._open]
+            last = newer[-1] if newer else position
+            return records, encode_cursor(last, still_open)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class IncrementalStore:
+    """Registry of IncrementalFeeds; feeds idle for longer than idle_ttl are dropped."""
+
+    def __init__(self, fetch, specs, min_interval=2.0, idle_ttl=1800.0, clock=time.monotonic):
+        self._fetch = fetch
+        self.specs = specs
+        self.min_interval = min_interval
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def feed(self, endpoint, session_key):
+        key = (endpoint, int(session_key))
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is None:
+                self._expire_idle()
+                feed = IncrementalFeed(endpoint, int(session_key), self.specs[endpoint], self._fetch,
+                                       min_interval=self.min_interval, clock=self._clock)
+                self._feeds[key] = feed
+            return feed
+
+    def _expire_idle(self):
+        now = self._clock()
+        for key, feed in list(self._feeds.items()):
+            if now - feed.last_access > self.idle_ttl:
+                del self._feeds[key]
+
+    def get(self, endpoint, session_key, cursor=0, refresh=True):
+        """Refreshes the feed (rate limited) and returns (records since cursor, next cursor)."""
+        feed = self.feed(endpoint, session_key)
+        if refresh:
+            feed.refresh()
+        return feed.since(cursor)
+
+    def stats(self):
+        with self._lock:
+            return {
+                f"{endpoint}:{session_key}": {"records": len(feed), "cursor": feed.cursor, "fetches": feed.fetches}
+                for (endpoint, session_key), feed in self._feeds.items()
+            }
@@ -0,0 +1,85 @@
+"""
+Fast JSON encoding for API responses.
+
+DataFrames are encoded column-wise by pandas' C JSON encoder instead of going
+through ``to_dict("records")`` and ``jsonify``: NaN/None become null, numpy
+scalars are written directly, timedeltas are stringified per column and
+datetimes are written as ISO 8601. Plain Python payloads use orjson when it is
+installed and fall back to the standard library otherwise.
+
+The encoded bytes go into the Flask response body as they are, without being
+decoded and re-encoded by ``jsonify``.
+"""
+import json
+
+import pandas as pd
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # orjson je voliteľný
+    orjson = None
+
+# Desatinné miesta floatov v DataFrame JSON. OpenF1 posiela 3 desatinné miesta, 6 ich presne zachová aj
+# s odvodenými hodnotami; pri 15 pandas vypisuje šum binárnej reprezentácie (28.688 -> 28.687999999999999)
+FLOAT_DECIMALS = 6
+
+
+def dumps(obj):
+    """Encodes a JSON-compatible Python object to bytes (keys sorted, like jsonify)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                            default=str)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str, allow_nan=False).encode("utf-8")
+
+
+def frame_to_json(df, columns=None):
+    """
+    Encodes a DataFrame as a JSON array of records (bytes). Columns are written
+    in sorted order, matching what ``jsonify`` produced for dicts.
+    """
+    if columns is not None:
+        df = df[columns]
+    df = df[sorted(df.columns)]
+
+    timedeltas = [c for c in df.columns if pd.api.types.is_timedelta64_dtype(df[c])]
+    if timedeltas:
+        df = df.assign(**{c: df[c].astype(str).where(df[c].notna(), None) for c in timedeltas})
+
+    if df.empty:
+        return b"[]"
+    return df.to_json(orient="records", date_format="iso", date_unit="us", double_precision=FLOAT_DECIMALS,
+                      default_handler=str).encode("utf-8")
+
+
+class Raw:
+    """Already encoded JSON bytes to be embedded as-is by :func:`json_response`."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def encode_fields(**fields):
+    """
+    Encodes ``{"field": value, ...}`` to bytes. DataFrame values are encoded
+    with :func:`frame_to_json`, :class:`Raw` values are inserted as they are
+    and everything else goes through :func:`dumps`.
+    """
+    parts = []
+    for key in sorted(fields):
+        value = fields[key]
+        if isinstance(value, pd.DataFrame):
+            encoded = frame_to_json(value)
+        elif isinstance(value, Raw):
+            encoded = value.data
+        else:
+            encoded = dumps(value)
+        parts.append(dumps(key) + b":" + encoded)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def json_response(status=200, headers=None, **fields):
+    """Builds ``{"field": value, ...}`` (see :func:`encode_fields`) as a JSON response."""
+    return Response(encode_fields(**fields), status=status, headers=headers, mimetype="application/json")
@@ -0,0 +1,193 @@
+"""
+Lap analytics of a whole session: best laps, stints and pace, gaps, speed traps.
+
+Everything is computed for all drivers at once from the session's laps frame
+(one row per driver and lap, see session_store "laps") with pandas group
+operations and NumPy, never per driver in Python:
+
+* best lap and the theoretical best (sum of the driver's best sectors),
+* stints - a new stint starts with every ``is_pit_out_lap`` - with the pace
+  of each stint from its clean laps: not lap 1, not a pit-out or in-lap and
+  not slower than ``outlier_factor`` x the stint median (safety car, traffic,
+  spins); degradation is the least-squares slope of those laps' times,
+* gap to the leader at the end of every lap (the leader being whoever
+  completed that lap first; the end of a lap is the start of the next one),
+* speed trap (``st_speed``) maxima and rankings, plus the intermediate speeds.
+
+:func:`analyze` returns plain JSON-ready dicts; the app computes them once
+per session dataset and serves any subset of drivers from that.
+"""
+import numpy as np
+import pandas as pd
+
+from session_store import format_lap_times
+
+SECTORS = ("duration_sector_1", "duration_sector_2", "duration_sector_3")
+OUTLIER_FACTOR = 1.07
+# Stĺpce, ktoré po iterrows prídu ako float, ale sú to celé čísla
+INTEGER_FIELDS = ("start_lap", "end_lap", "laps", "clean_laps")
+
+
+def _value(x, decimals=3):
+    """NumPy scalar -> rounded float (int when ``decimals`` is None), NaN -> None."""
+    if x is None or x != x:
+        return None
+    if decimals is None or isinstance(x, (np.integer, int)):
+        return int(x)
+    return round(float(x), decimals)
+
+
+def prepare(laps):
+    """
+    Laps sorted by driver and lap with the columns the analytics need, numeric,
+    plus ``in_lap`` (the lap before a pit-out lap) and ``stint`` (1-based).
+    """
+    columns = ["driver_number", "lap_number", "date_start", "lap_duration", "is_pit_out_lap",
+               "st_speed", "i1_speed", "i2_speed", *SECTORS]
+    df = laps.reindex(columns=columns).dropna(subset=["driver_number", "lap_number"])
+    df = df.astype({"driver_number": np.int64, "lap_number": np.int64})
+    df = df.sort_values(["driver_number", "lap_number"], kind="stable").reset_index(drop=True)
+    for column in ["lap_duration", "st_speed", "i1_speed", "i2_speed", *SECTORS]:
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    df["date_start"] = pd.to_datetime(df["date_start"], utc=True, format="ISO8601", errors="coerce")
+
+    pit_out = df["is_pit_out_lap"].fillna(False).astype(bool).to_numpy()
+    drivers = df["driver_number"].to_numpy()
+    first = np.r_[True, drivers[1:] != drivers[:-1]]
+    last = np.r_[drivers[1:] != drivers[:-1], True]
+    # Pit-out prvého kola (štart z boxov) nezačína nový stint
+    starts = pit_out & ~first
+    df["pit_out"] = pit_out
+    df["in_lap"] = np.r_[starts[1:], False] & ~last
+    df["stint"] = df.assign(_s=starts).groupby("driver_number")["_s"].cumsum().to_numpy() + 1
+    return df
+
+
+def best_laps(df):
+    """Per driver: best lap (number, time), theoretical best and what it would gain."""
+    timed = df.dropna(subset=["lap_duration"])
+    best = timed.loc[timed.groupby("driver_number")["lap_duration"].idxmin(),
+                     ["driver_number", "lap_number", "lap_duration"]].set_index("driver_number")
+    sectors = df.groupby("driver_number")[list(SECTORS)].min()
+    # Súčet len keď sú známe všetky tri sektory
+    theoretical = sectors.sum(axis=1, min_count=len(SECTORS))
+    result = pd.DataFrame({"best_lap_number": best["lap_number"], "best_lap_duration": best["lap_duration"],
+                           "theoretical_best": theoretical}).reindex(sectors.index)
+    result["theoretical_gain"] = result["best_lap_duration"] - result["theoretical_best"]
+    for i, sector in enumerate(SECTORS, 1):
+        result[f"best_sector_{i}"] = sectors[sector]
+    return result
+
+
+def stints(df, outlier_factor=OUTLIER_FACTOR):
+    """
+    One row per (driver_number, stint): first/last lap, laps, clean laps and
+    the pace (mean, median, best) and degradation (s/lap) of the clean laps.
+    """
+    keys = ["driver_number", "stint"]
+    bounds = df.groupby(keys).agg(start_lap=("lap_number", "min"), end_lap=("lap_number", "max"),
+                                  laps=("lap_number", "size"))
+
+    candidate = df["lap_duration"].notna() & ~df["pit_out"] & ~df["in_lap"] & (df["lap_number"] > 1)
+    median = df["lap_duration"].where(candidate).groupby([df["driver_number"], df["stint"]]).transform("median")
+    clean = df[candidate & (df["lap_duration"] <= median * outlier_factor)]
+
+    x = clean["lap_number"].astype(np.float64)
+    y = clean["lap_duration"]
+    sums = pd.DataFrame({"n": 1, "x": x, "y": y, "xy": x * y, "xx": x * x,
+                         "driver_number": clean["driver_number"], "stint": clean["stint"]}).groupby(keys).sum()
+    # Sklon lineárnej regresie čas ~ kolo z kumulatívnych súm (bez polyfit po skupinách)
+    denominator = sums["n"] * sums["xx"] - sums["x"] ** 2
+    slope = (sums["n"] * sums["xy"] - sums["x"] * sums["y"]) / denominator.where(denominator > 0)
+
+    pace = clean.groupby(keys)["lap_duration"].agg(pace_mean="mean", pace_median="median", pace_best="min")
+    result = bounds.join(pace)
+    result["clean_laps"] = sums["n"].reindex(result.index).fillna(0).astype(np.int64)
+    result["degradation"] = slope.reindex(result.index)
+    return result
+
+
+def gaps_to_leader(df):
+    """
+    (lap numbers, {driver_number: gaps}) - seconds behind the first driver
+    to complete each lap, None where the driver did not complete it.
+    """
+    starts = df["date_start"]
+    following = starts.groupby(df["driver_number"]).shift(-1)
+    ends = following.fillna(starts + pd.to_timedelta(df["lap_duration"], unit="s"))
+    end_ns = ends.to_numpy(dtype="datetime64[ns]").view(np.int64).astype(np.float64)
+    end_ns[ends.isna().to_numpy()] = np.nan
+    matrix = pd.DataFrame({"driver_number": df["driver_number"], "lap_number": df["lap_number"], "end": end_ns}) \
+        .pivot(index="driver_number", columns="lap_number", values="end")
+    values = matrix.to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        gaps = (values - np.nanmin(values, axis=0, initial=np.inf, where=~np.isnan(values))) / 1e9
+    gaps = np.round(gaps, 3)
+    return [int(n) for n in matrix.columns], {
+        int(driver): [None if g != g else float(g) for g in row] for driver, row in zip(matrix.index, gaps)
+    }
+
+
+def speed_traps(df):
+    """Per driver: max speed trap / intermediate speeds and the rank by speed trap (1 = fastest)."""
+    result = df.groupby("driver_number")[["st_speed", "i1_speed", "i2_speed"]].max()
+    result["st_speed_rank"] = result["st_speed"].rank(method="min", ascending=False)
+    return result
+
+
+def _stint_records(table, driver):
+    if driver not in table.index.get_level_values(0):
+        return []
+    records = []
+    for stint, row in table.loc[driver].iterrows():
+        record = {"stint": int(stint)}
+        for name, value in row.items():
+            record[name] = _value(value, None if name in INTEGER_FIELDS else 4 if name == "degradation" else 3)
+        records.append(record)
+    return records
+
+
+def analyze(laps, outlier_factor=OUTLIER_FACTOR):
+    """
+    Full analytics of a session's laps frame:
+    {"drivers": {driver_number: {...}}, "laps": [lap numbers], "session": {...}}.
+    """
+    if laps is None or laps.empty:
+        return {"drivers": {}, "laps": [], "session": {}}
+    df = prepare(laps)
+    best = best_laps(df)
+    stint_table = stints(df, outlier_factor)
+    lap_numbers, gaps = gaps_to_leader(df)
+    traps = speed_traps(df)
+    best_times = format_lap_times(best["best_lap_duration"]).to_numpy()
+
+    drivers = {}
+    for i, (driver, row) in enumerate(best.iterrows()):
+        trap = traps.loc[driver]
+        best_lap = {"lap_number": _value(row["best_lap_number"], None),
+                    "lap_duration": _value(row["best_lap_duration"]),
+                    "lap_time": best_times[i] if row["best_lap_duration"] == row["best_lap_duration"] else None}
+        drivers[int(driver)] = {
+            "driver_number": int(driver),
+            "best_lap": best_lap,
+            "best_sectors": [_value(row[f"best_sector_{s}"]) for s in range(1, len(SECTORS) + 1)],
+            "theoretical_best": _value(row["theoretical_best"]),
+            "theoretical_gain": _value(row["theoretical_gain"]),
+            "stints": _stint_records(stint_table, driver),
+            "gaps": gaps.get(int(driver), []),
+            "st_speed": _value(trap["st_speed"], 1),
+            "st_speed_rank": _value(trap["st_speed_rank"], None),
+            "i1_speed": _value(trap["i1_speed"], 1),
+            "i2_speed": _value(trap["i2_speed"], 1),
+        }
+
+    sector_best = df[list(SECTORS)].min()
+    fastest = best["best_lap_duration"].idxmin() if best["best_lap_duration"].notna().any() else None
+    session = {
+        "fastest_lap": None if fastest is None else {"driver_number": int(fastest),
+                                                     **drivers[int(fastest)]["best_lap"]},
+        "best_sectors": [_value(v) for v in sector_best],
+        "theoretical_best": _value(sector_best.sum(min_count=len(SECTORS))),
+        "speed_trap_ranking": [int(d) for d in traps["st_speed"].dropna().sort_values(ascending=False).index],
+    }
+    return {"drivers": drivers, "laps": lap_numbers, "session": session}
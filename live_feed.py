@@ -0,0 +1,261 @@
+"""
+Server-push live feed (Server-Sent Events) for live sessions.
+
+Instead of every open browser tab polling OpenF1 through the app, one
+background poller per active session and worker fetches new records and fans
+each delta out to all subscribed clients. Upstream load therefore depends on
+the number of live sessions being watched, not on the number of viewers.
+
+Topics are pluggable: each one is a ``fetch(session_key, state)`` callable that
+returns the records that are new (or changed) since the previous call and
+keeps its cursor in the ``state`` dict it is given.
+
+Serving: :meth:`LiveFeedHub.stream` is a plain generator and holds a server
+thread for as long as the client stays connected (gunicorn gthread workers,
+the thread pool of asgi.py). To keep viewers from taking every thread, at
+most ``max_streams`` such connections are open per process; past that
+:class:`LiveFeedFull` is raised and the app answers 503 with Retry-After.
+:meth:`LiveFeedHub.astream` yields the same events as an async generator on
+an event loop (``uvicorn asgi:application``), where a viewer holds no thread
+and there is no such limit - use it for a large audience.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LiveFeedFull(Exception):
+    """All ``max_streams`` thread-holding connections of this process are taken."""
+
+
+class Subscriber:
+    """One connected client. Receives (topic, records) tuples on its queue."""
+
+    def __init__(self, topics, driver_number=None, maxsize=256, wakeup=None):
+        self.topics = set(topics)
+        self.driver_number = driver_number
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+        # wakeup() - zavolá sa z vlákna pollera po každej doručenej dávke (async klienti)
+        self.wakeup = wakeup
+
+    def wants(self, topic):
+        return topic in self.topics
+
+    def filter(self, records):
+        if self.driver_number is None:
+            return records
+        return [r for r in records if r.get("driver_number") == self.driver_number]
+
+    def offer(self, topic, records):
+        records = self.filter(records)
+        if not records:
+            return
+        try:
+            self.queue.put_nowait((topic, records))
+        except queue.Full:
+            # Pomalý klient - odpojíme ho, nech nebrzdí ostatných
+            self.dropped = True
+        if self.wakeup is not None:
+            try:
+                self.wakeup()
+            except RuntimeError:  # slučka klienta je už zatvorená
+                self.dropped = True
+
+
+class SessionChannel:
+    """Poller and subscriber list for one session."""
+
+    def __init__(self, hub, session_key):
+        self.hub = hub
+        self.session_key = session_key
+        self.subscribers = set()
+        self.states = {topic: {} for topic in hub.topics}
+        self.history = {topic: deque(maxlen=hub.history_size) for topic in hub.topics}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.polls = 0
+
+    def snapshot(self, subscriber):
+        """
+        History so far for a new subscriber. Deltas already queued for it are
+        contained in the history, so the queue is drained in the same step.
+        """
+        with self.lock:
+            while True:
+                try:
+                    subscriber.queue.get_nowait()
+                except queue.Empty:
+                    break
+            return {t: subscriber.filter(list(self.history[t])) for t in self.history if subscriber.wants(t)}
+
+    def poll_once(self):
+        for topic, fetch in self.hub.topics.items():
+            try:
+                records = fetch(self.session_key, self.states[topic])
+            except Exception as e:
+                logger.exception("Live feed poll for %s in session %s failed: %s", topic, self.session_key, e)
+                continue
+            if not records:
+                continue
+            with self.lock:
+                self.history[topic].extend(records)
+                for subscriber in self.subscribers:
+                    if subscriber.wants(topic):
+                        subscriber.offer(topic, records)
+        self.polls += 1
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    return
+            self.poll_once()
+            time.sleep(self.hub.interval)
+
+
+class _Stream:
+    """
+    Iterator over the events of one threaded stream; gives its slot back when
+    closed or collected - also when it is closed before the first event (a
+    generator's ``finally`` would not run then).
+    """
+
+    def __init__(self, events, release):
+        self._events = events
+        self._release = release
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._release()
+
+    __del__ = close
+
+
+class LiveFeedHub:
+    """Keeps one SessionChannel (and poller thread) per watched session."""
+
+    def __init__(self, topics, interval=5.0, history_size=5000, keepalive=15.0, max_streams=0):
+        self.topics = topics
+        self.interval = interval
+        self.history_size = history_size
+        self.keepalive = keepalive
+        self.max_streams = max_streams  # 0 = bez limitu
+        self.streams = 0
+        self.rejected = 0
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_key, topics=None, driver_number=None, wakeup=None):
+        topics = [t for t in (topics or self.topics) if t in self.topics]
+        subscriber = Subscriber(topics, driver_number, wakeup=wakeup)
+        with self._lock:
+            channel = self._channels.get(session_key)
+            if channel is None:
+                channel = self._channels[session_key] = SessionChannel(self, session_key)
+        first_poll = False
+        with channel.lock:
+            channel.subscribers.add(subscriber)
+            if channel.thread is None:
+                first_poll = channel.polls == 0
+                channel.thread = threading.Thread(target=channel.run, daemon=True,
+                                                  name=f"live-feed-{session_key}")
+                channel.thread.start()
+        if first_poll:
+            # Počkáme na prvé stiahnutie, aby prvý klient hneď dostal aktuálny stav
+            deadline = time.monotonic() + self.interval
+            while channel.polls == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        return channel, subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with channel.lock:
+            channel.subscribers.discard(subscriber)
+
+    def stream(self, session_key, topics=None, driver_number=None):
+        """
+        Generator of SSE-formatted strings for one client connection served on
+        a thread. Raises LiveFeedFull right away when ``max_streams`` of them
+        are already open in this process.
+        """
+        with self._lock:
+            if self.max_streams and self.streams >= self.max_streams:
+                self.rejected += 1
+                raise LiveFeedFull(f"{self.streams} live feed connections open")
+            self.streams += 1
+        return _Stream(self._events(session_key, topics, driver_number), self._release_stream)
+
+    def _release_stream(self):
+        with self._lock:
+            self.streams -= 1
+
+    def _events(self, session_key, topics, driver_number):
+        channel, subscriber = self.subscribe(session_key, topics, driver_number)
+        try:
+            for topic, records in channel.snapshot(subscriber).items():
+                yield format_event(topic, records)
+            while not subscriber.dropped:
+                try:
+                    topic, records = subscriber.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(topic, records)
+        finally:
+            self.unsubscribe(channel, subscriber)
+
+    async def astream(self, session_key, topics=None, driver_number=None):
+        """Async generator of the same SSE strings for a connection served on an event loop (no thread held)."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        # subscribe() môže čakať na prvé stiahnutie - mimo slučky
+        channel, subscriber = await asyncio.to_thread(
+            self.subscribe, session_key, topics, driver_number, lambda: loop.call_soon_threadsafe(ready.set))
+        try:
+            for topic, records in channel.snapshot(subscriber).items():
+                yield format_event(topic, records)
+            while not subscriber.dropped:
+                try:
+                    topic, records = subscriber.queue.get_nowait()
+                except queue.Empty:
+                    ready.clear()
+                    if not subscriber.queue.empty():
+                        continue  # dávka prišla medzi get_nowait a clear
+                    try:
+                        await asyncio.wait_for(ready.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                    continue
+                yield format_event(topic, records)
+        finally:
+            self.unsubscribe(channel, subscriber)
+
+    def stats(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        sessions = {
+            str(c.session_key): {"subscribers": len(c.subscribers), "polls": c.polls, "active": c.thread is not None}
+            for c in channels
+        }
+        return {"streams": self.streams, "max_streams": self.max_streams, "rejected": self.rejected,
+                "sessions": sessions}
+
+
+def format_event(topic, records):
+    return f"event: {topic}\ndata: {json.dumps(records, default=str)}\n\n"
@@ -0,0 +1,205 @@
+"""
+Logging, Prometheus metrics and an opt-in per-request profiler.
+
+Logging: :func:`configure_logging` sets up the root logger once per process
+from ``LOG_LEVEL`` (default INFO) and ``LOG_FORMAT`` - ``text`` or ``json``
+(one object per line with time, level, logger, message, pid, any ``extra=``
+fields and the traceback). Modules log through ``logging.getLogger(__name__)``.
+
+Metrics, served in the Prometheus text format by :func:`metrics_response`
+(the app's /metrics):
+
+    f1_http_request_duration_seconds{route,method,status}   per URL rule, compression included
+    f1_http_requests_in_progress
+    f1_upstream_requests_total{endpoint,client,outcome}     OpenF1 calls (after retries)
+    f1_upstream_request_duration_seconds{endpoint,client}
+    f1_upstream_response_bytes_total{endpoint,client}
+    f1_upstream_guard_events_total{endpoint,event}          coalesced, stale_served, throttled, unavailable
+    f1_dataset_lookups_total{kind,result}                   session datasets: memory, shared (data/ cache),
+                                                            fetched (OpenF1), archive or empty
+    f1_dataframe_seconds{operation}                         DataFrame building and processing
+
+Under gunicorn every worker has its own counters: set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory (gunicorn.conf.py clears
+it before the app is loaded and drops dead workers; it is created here when
+missing) and /metrics reports the sum over all workers.
+
+Profiling: with ``PROFILE_TOKEN`` set, a request carrying the header
+``X-Profile: <token>`` runs under cProfile; the stats are written to
+``PROFILE_DIR`` (default data/profiles) as ``.prof`` (open with pstats or
+snakeviz), the response names the file in ``X-Profile-File`` and the top
+functions are logged. Only the thread serving the request is profiled.
+"""
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+from datetime import datetime, timezone
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", 15))
+
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # Metriky nižšie už zapisujú do súborov v tomto adresári
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROCESSING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUEST_SECONDS = Histogram("f1_http_request_duration_seconds", "Request latency per route.",
+                            ("route", "method", "status"), buckets=LATENCY_BUCKETS)
+IN_PROGRESS = Gauge("f1_http_requests_in_progress", "Requests being served.", multiprocess_mode="livesum")
+UPSTREAM_REQUESTS = Counter("f1_upstream_requests_total", "OpenF1 calls.", ("endpoint", "client", "outcome"))
+UPSTREAM_SECONDS = Histogram("f1_upstream_request_duration_seconds", "OpenF1 call latency including retries.",
+                             ("endpoint", "client"), buckets=LATENCY_BUCKETS)
+UPSTREAM_BYTES = Counter("f1_upstream_response_bytes_total", "OpenF1 response bytes.", ("endpoint", "client"))
+GUARD_EVENTS = Counter("f1_upstream_guard_events_total", "OpenF1 calls saved or refused by the guard layer.",
+                       ("endpoint", "event"))
+DATASET_LOOKUPS = Counter("f1_dataset_lookups_total", "Session dataset lookups by where they were answered.",
+                          ("kind", "result"))
+DATAFRAME_SECONDS = Histogram("f1_dataframe_seconds", "DataFrame building and processing time.",
+                              ("operation",), buckets=PROCESSING_BUCKETS)
+
+GUARD_EVENT_NAMES = ("coalesced", "stale_served", "throttled", "unavailable")
+
+
+# --- logging ---
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra=`` fields become top-level keys."""
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def configure_logging(level=None, fmt=None):
+    """Root handler on stderr unless logging was already configured (e.g. by the server or a test)."""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    if (fmt or os.environ.get("LOG_FORMAT", "text")) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel((level or os.environ.get("LOG_LEVEL", "INFO")).upper())
+
+
+# --- metrics ---
+def observe_upstream(endpoint, client, seconds, size, ok):
+    UPSTREAM_REQUESTS.labels(endpoint, client, "ok" if ok else "error").inc()
+    UPSTREAM_SECONDS.labels(endpoint, client).observe(seconds)
+    if size:
+        UPSTREAM_BYTES.labels(endpoint, client).inc(size)
+
+
+def observe_guard(endpoint, event, value=1):
+    """UpstreamGuard listener: counts the events that saved or refused an upstream call."""
+    if event in GUARD_EVENT_NAMES:
+        GUARD_EVENTS.labels(endpoint, event).inc(value)
+
+
+def count_dataset_lookup(kind, result):
+    DATASET_LOOKUPS.labels(kind, result).inc()
+
+
+def dataframe_timer(operation):
+    """``with dataframe_timer("lap_analytics"): ...`` - observes the block's duration."""
+    return DATAFRAME_SECONDS.labels(operation).time()
+
+
+def metrics_response():
+    """(body, content type) of the /metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# --- request middleware ---
+def _profile_requested(request):
+    token = request.headers.get("X-Profile")
+    return bool(PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN))
+
+
+def _finish_profile(profiler, route):
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    label = route.strip("/").replace("/", "_").replace("<", "").replace(">", "").replace(":", "-") or "index"
+    name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}_{label}_{os.getpid()}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    logger.info("Profile of %s saved as %s\n%s", route, name, out.getvalue())
+    return name
+
+
+def instrument(app):
+    """
+    Registers the timing and profiling hooks on ``app``. Call it before any
+    other after_request hook so the measured time includes them (Flask runs
+    after_request hooks in reverse order).
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._observability_started = time.perf_counter()
+        IN_PROGRESS.inc()
+        g._observability_counted = True
+        if _profile_requested(request):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # iný profiler už v tomto vlákne beží
+                logger.warning("Profiling of %s skipped: another profiler is active", request.path)
+            else:
+                g._observability_profiler = profiler
+
+    @app.after_request
+    def _observe_request(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        profiler = g.pop("_observability_profiler", None)
+        if profiler is not None:
+            response.headers["X-Profile-File"] = _finish_profile(profiler, route)
+        started = g.get("_observability_started")
+        if started is not None:
+            REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        profiler = g.pop("_observability_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        if g.pop("_observability_counted", False):
+            IN_PROGRESS.dec()
@@ -0,0 +1,364 @@
+"""
+Shared HTTP client for the OpenF1 API.
+
+All OpenF1 calls in the app go through one pooled ``requests.Session`` so that
+connections to api.openf1.org are kept alive between requests instead of doing
+a fresh TCP+TLS handshake per call. The client also applies timeouts, retries
+with backoff on 429/5xx responses and keeps per-endpoint counters.
+
+:class:`AsyncOpenF1Client` is the same client on ``httpx.AsyncClient`` for the
+ASGI serving mode (see asgi.py); async views call :func:`get_json_async`,
+which uses it when it is installed on the running event loop and otherwise
+runs the pooled sync client in a thread (Flask async views under gunicorn).
+
+Both clients go through the same :class:`upstream_guard.UpstreamGuard`:
+identical in-flight requests are coalesced, each endpoint has a token-bucket
+budget and a circuit breaker, and the last good response is served (marked
+stale) when OpenF1 fails or throttles.
+
+Configuration (environment variables):
+    OPENF1_BASE_URL         base URL, e.g. a local stand-in server for testing
+    OPENF1_POOL_SIZE        max keep-alive connections per worker process
+    OPENF1_CONNECT_TIMEOUT  connect timeout in seconds
+    OPENF1_READ_TIMEOUT     read timeout in seconds
+    OPENF1_RETRIES          number of retries on 429/5xx and connection errors
+    OPENF1_BACKOFF          backoff factor between retries in seconds
+    OPENF1_GUARD            0 to bypass the guard layer (see upstream_guard.from_env for its settings)
+"""
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import observability
+from upstream_guard import UpstreamGuard
+
+try:
+    import httpx
+except ImportError:  # httpx je potrebný len pre ASGI režim
+    httpx = None
+
+DEFAULT_BASE_URL = "https://api.openf1.org/v1"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def build_query(params, filters):
+    """
+    Builds a raw query string with OpenF1 comparison filters. They can't be
+    passed as a params dict: {"date>": x} would be sent as "date>=x".
+    """
+    parts = [urlencode(params or {})] if params else []
+    for field, op, value in filters:
+        if op not in (">", ">=", "<", "<="):
+            raise ValueError(f"Unsupported OpenF1 filter operator: {op}")
+        parts.append(f"{field}{op}{quote(str(value), safe=':')}")
+    return "&".join(parts)
+
+
+class EndpointStats:
+    """Counters for one OpenF1 endpoint (e.g. "laps")."""
+
+    __slots__ = ("calls", "errors", "bytes", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self):
+        avg = self.total_seconds / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "total_seconds": round(self.total_seconds, 6),
+            "avg_seconds": round(avg, 6),
+            "max_seconds": round(self.max_seconds, 6),
+        }
+
+
+class _StatsMixin:
+    """Per-endpoint counters shared by the sync and async clients."""
+
+    # Hodnota labelu "client" v metrikách
+    kind = "sync"
+
+    def _init_stats(self):
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, endpoint, elapsed, size, ok):
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.calls += 1
+            stats.bytes += size
+            stats.total_seconds += elapsed
+            if elapsed > stats.max_seconds:
+                stats.max_seconds = elapsed
+            if not ok:
+                stats.errors += 1
+        observability.observe_upstream(endpoint.strip("/"), self.kind, elapsed, size, ok)
+
+    def stats(self):
+        """Returns a snapshot of the per-endpoint counters."""
+        with self._stats_lock:
+            return {endpoint: s.as_dict() for endpoint, s in self._stats.items()}
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+
+class OpenF1Client(_StatsMixin):
+    """Pooled, retrying HTTP client for the OpenF1 REST API."""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, pool_size=10, connect_timeout=3.05,
+                 read_timeout=15.0, retries=3, backoff=0.5, guard=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.guard = guard
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._init_stats()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.environ.get("OPENF1_BASE_URL", DEFAULT_BASE_URL),
+            pool_size=_env_int("OPENF1_POOL_SIZE", 10),
+            connect_timeout=_env_float("OPENF1_CONNECT_TIMEOUT", 3.05),
+            read_timeout=_env_float("OPENF1_READ_TIMEOUT", 15.0),
+            retries=_env_int("OPENF1_RETRIES", 3),
+            backoff=_env_float("OPENF1_BACKOFF", 0.5),
+            guard=guard,
+        )
+
+    def url_for(self, endpoint):
+        return f"{self.base_url}/{endpoint.strip('/')}"
+
+    def get(self, endpoint, params=None, timeout=None, filters=None):
+        """
+        Performs a GET against ``<base_url>/<endpoint>`` and returns the response.
+        ``filters`` is a list of OpenF1 comparison filters as (field, operator,
+        value) tuples, e.g. ``[("date", ">", "2024-05-26T13:00:00")]``.
+        Raises ``requests.exceptions.RequestException`` on network errors and
+        non-2xx responses (after retries are exhausted) when the guard has no
+        previous response to serve instead.
+        """
+        if filters:
+            params = build_query(params, filters)
+        if self.guard is None:
+            return self._get(endpoint, params, timeout)
+        url = requests.Request("GET", self.url_for(endpoint), params=params).prepare().url
+        return self.guard.call(endpoint.strip("/"), url, lambda: self._get(endpoint, params, timeout),
+                               lambda content, headers: _stale_response(url, content, headers))
+
+    def _get(self, endpoint, params, timeout):
+        started = time.perf_counter()
+        size = 0
+        ok = False
+        try:
+            response = self.session.get(self.url_for(endpoint), params=params, timeout=timeout or self.timeout)
+            size = len(response.content)
+            response.raise_for_status()
+            ok = True
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - started, size, ok)
+
+    def get_json(self, endpoint, params=None, timeout=None, filters=None):
+        """Same as :meth:`get`, but returns the decoded JSON payload."""
+        return self.get(endpoint, params=params, timeout=timeout, filters=filters).json()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOpenF1Client(_StatsMixin):
+    """
+    :class:`OpenF1Client` on ``httpx.AsyncClient``: the same base URL,
+    timeouts, retries (429/5xx and connection errors, exponential backoff,
+    Retry-After) and counters. Bound to the event loop it is used on.
+    """
+
+    kind = "async"
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, pool_size=10, connect_timeout=3.05,
+                 read_timeout=15.0, retries=3, backoff=0.5, max_connections=None, guard=None):
+        if httpx is None:
+            raise RuntimeError("The async OpenF1 client needs the httpx package")
+        self.base_url = base_url.rstrip("/")
+        self.guard = guard
+        self.retries = retries
+        self.backoff = backoff
+        # Ako requests s pool_block=False: udržiava pool_size spojení, ale neobmedzuje súbežné requesty
+        self.session = httpx.AsyncClient(
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=pool_size),
+        )
+        self._init_stats()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.environ.get("OPENF1_BASE_URL", DEFAULT_BASE_URL),
+            pool_size=_env_int("OPENF1_POOL_SIZE", 10),
+            connect_timeout=_env_float("OPENF1_CONNECT_TIMEOUT", 3.05),
+            read_timeout=_env_float("OPENF1_READ_TIMEOUT", 15.0),
+            retries=_env_int("OPENF1_RETRIES", 3),
+            backoff=_env_float("OPENF1_BACKOFF", 0.5),
+            guard=guard,
+        )
+
+    def url_for(self, endpoint):
+        return f"{self.base_url}/{endpoint.strip('/')}"
+
+    def _retry_delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) if attempt else 0.0
+
+    async def get(self, endpoint, params=None, timeout=None, filters=None):
+        """
+        Async :meth:`OpenF1Client.get`; raises ``httpx.HTTPError`` after the
+        retries, or :class:`upstream_guard.UpstreamUnavailable` from the guard.
+        """
+        url = self.url_for(endpoint)
+        if filters:
+            url = f"{url}?{build_query(params, filters)}"
+            params = None
+        if self.guard is None:
+            return await self._get(endpoint, url, params, timeout)
+        key = str(httpx.URL(url, params=params)) if params else url
+        return await self.guard.acall(
+            endpoint.strip("/"), key, lambda: self._get(endpoint, url, params, timeout),
+            lambda content, headers: httpx.Response(200, content=content, headers=headers,
+                                                    request=httpx.Request("GET", key)))
+
+    async def _get(self, endpoint, url, params, timeout):
+        started = time.perf_counter()
+        size = 0
+        ok = False
+        try:
+            for attempt in range(self.retries + 1):
+                response = None
+                try:
+                    response = await self.session.get(url, params=params, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        size = len(response.content)
+                        response.raise_for_status()
+                        ok = True
+                        return response
+                await asyncio.sleep(self._retry_delay(attempt, response))
+        finally:
+            self._record(endpoint, time.perf_counter() - started, size, ok)
+
+    async def get_json(self, endpoint, params=None, timeout=None, filters=None):
+        response = await self.get(endpoint, params=params, timeout=timeout, filters=filters)
+        return response.json()
+
+    async def close(self):
+        await self.session.aclose()
+
+
+def _stale_response(url, content, headers):
+    """``requests.Response`` with a stored body, served by the guard in place of a failed call."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = content
+    response.headers.update(headers)
+    response.encoding = "utf-8"
+    return response
+
+
+# Ochrana upstreamu (coalescing, rate limit, circuit breaker) spoločná pre sync aj async klienta
+guard = UpstreamGuard.from_env(os.environ, listener=observability.observe_guard) if os.environ.get("OPENF1_GUARD", "1") != "0" else None
+
+# Jeden klient na proces (gunicorn worker), zdieľaný všetkými vláknami.
+client = OpenF1Client.from_env()
+
+# Async klient nainštalovaný ASGI serverom (asgi.py) pre svoju slučku udalostí
+_async_client = None
+_async_loop = None
+
+
+def install_async_client(async_client, loop):
+    """Makes :func:`get_json_async` use ``async_client`` on ``loop`` (None to uninstall)."""
+    global _async_client, _async_loop
+    _async_client, _async_loop = async_client, loop
+
+
+def get_json(endpoint, params=None, timeout=None, filters=None):
+    return client.get_json(endpoint, params=params, timeout=timeout, filters=filters)
+
+
+async def get_json_async(endpoint, params=None, timeout=None, filters=None):
+    """
+    Awaitable :func:`get_json`: on the ASGI server's loop through the async
+    client, anywhere else (Flask async views under WSGI) the pooled sync
+    client in a thread.
+    """
+    if _async_client is not None and asyncio.get_running_loop() is _async_loop:
+        return await _async_client.get_json(endpoint, params=params, timeout=timeout, filters=filters)
+    return await asyncio.to_thread(client.get_json, endpoint, params, timeout, filters)
+
+
+def get_stats():
+    stats = client.stats()
+    if _async_client is not None:
+        for endpoint, counters in _async_client.stats().items():
+            stats[f"async:{endpoint}"] = counters
+    return stats
+
+
+def get_guard_stats():
+    return guard.stats() if guard is not None else None
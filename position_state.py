@@ -0,0 +1,132 @@
+"""
+Position-state engine for OpenF1 /v1/position feeds.
+
+Keeps the current running order of a session as compact state and updates it
+batch by batch: the latest record per driver is picked with one NumPy lexsort
+over the batch, comparing the ISO 8601 ``date`` strings directly instead of
+parsing them (OpenF1 dates share one format, so lexical order is time order).
+
+Every accepted record is also appended to a per-driver, array-backed timeline
+(dates as fixed-width strings, positions as int16) that grows by doubling, so
+the full position history of a driver can be returned without scanning the
+whole feed.
+"""
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATE_DTYPE = "<U32"
+
+
+class _Series:
+    """Growable pair of arrays (dates, positions) for one driver."""
+
+    __slots__ = ("dates", "positions", "size")
+
+    def __init__(self, capacity=256):
+        self.dates = np.empty(capacity, dtype=DATE_DTYPE)
+        self.positions = np.empty(capacity, dtype=np.int16)
+        self.size = 0
+
+    def extend(self, dates, positions):
+        needed = self.size + len(dates)
+        if needed > len(self.dates):
+            capacity = max(needed, 2 * len(self.dates))
+            self.dates = np.resize(self.dates, capacity)
+            self.positions = np.resize(self.positions, capacity)
+        self.dates[self.size:needed] = dates
+        self.positions[self.size:needed] = positions
+        self.size = needed
+
+    def view(self):
+        return self.dates[:self.size], self.positions[:self.size]
+
+
+def _columns(records):
+    """Extracts (driver_numbers, dates, positions) arrays, skipping incomplete rows."""
+    drivers, dates, positions = [], [], []
+    for item in records:
+        driver = item.get("driver_number")
+        date = item.get("date")
+        position = item.get("position")
+        if driver is None or date is None or position is None:
+            continue
+        drivers.append(driver)
+        dates.append(date)
+        positions.append(position)
+    try:
+        return (np.asarray(drivers, dtype=np.int64), np.asarray(dates, dtype=DATE_DTYPE),
+                np.asarray(positions, dtype=np.int16))
+    except (TypeError, ValueError):
+        # Zriedkavé nečíselné hodnoty - spracujeme ich po jednom
+        rows = []
+        for d, t, p in zip(drivers, dates, positions):
+            try:
+                rows.append((int(d), str(t), int(p)))
+            except (TypeError, ValueError):
+                logger.warning("Data issue in position API: driver %s, position %s, date %s", d, p, t)
+        if not rows:
+            return np.empty(0, np.int64), np.empty(0, DATE_DTYPE), np.empty(0, np.int16)
+        d, t, p = zip(*rows)
+        return np.asarray(d, np.int64), np.asarray(t, DATE_DTYPE), np.asarray(p, np.int16)
+
+
+class PositionState:
+    """Current order and per-driver timeline of one session."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cursor = 0  # pozícia v inkrementálnom feede, po ktorú sú dáta spracované
+        self._latest = {}  # driver_number -> (date, position)
+        self._series = {}
+        self.records = 0
+
+    def update(self, records):
+        """Applies a batch of position records (any order). Returns the number of rows used."""
+        drivers, dates, positions = _columns(records)
+        if not len(drivers):
+            return 0
+
+        # Zoradenie podľa (jazdec, dátum) - posledný riadok každého jazdca je jeho najnovší
+        order = np.lexsort((dates, drivers))
+        drivers, dates, positions = drivers[order], dates[order], positions[order]
+        boundaries = np.flatnonzero(drivers[1:] != drivers[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(drivers)]))
+
+        for start, end in zip(starts, ends):
+            driver = int(drivers[start])
+            series = self._series.get(driver)
+            if series is None:
+                series = self._series[driver] = _Series()
+            series.extend(dates[start:end], positions[start:end])
+
+            last_date = str(dates[end - 1])
+            current = self._latest.get(driver)
+            if current is None or last_date >= current[0]:
+                self._latest[driver] = (last_date, int(positions[end - 1]))
+
+        self.records += len(drivers)
+        return len(drivers)
+
+    def current_positions(self):
+        """{driver_number (str): position (int)} from the newest record of each driver."""
+        return {str(driver): position for driver, (_, position) in self._latest.items()}
+
+    def current_order(self):
+        """Driver numbers sorted by their current position."""
+        return [driver for driver, _ in sorted(self._latest.items(), key=lambda item: item[1][1])]
+
+    def timeline(self, driver_number):
+        """Full position history of one driver as {"dates": [...], "positions": [...]} in time order."""
+        series = self._series.get(int(driver_number))
+        if series is None:
+            return {"dates": [], "positions": []}
+        dates, positions = series.view()
+        if len(dates) > 1 and not (dates[1:] >= dates[:-1]).all():
+            order = np.argsort(dates, kind="stable")
+            dates, positions = dates[order], positions[order]
+        return {"dates": dates.tolist(), "positions": positions.tolist()}
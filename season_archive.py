@@ -0,0 +1,282 @@
+"""
+Season archive: completed sessions in one local SQLite database.
+
+The per-session caches (``data/<kind>_<session_key>.arrow``, legacy CSVs)
+are fine for "everything of one session", but a question across sessions -
+a driver's best laps at a circuit over the years, all radio of a driver in
+a season - would have to load every file. The archive keeps drivers, laps
+and team radio of finished sessions in one database next to a ``sessions``
+table with the catalogue metadata (year, circuit, session type), indexed by
+(session_key, driver_number, lap_number), by date and by driver, so such
+queries are a single indexed SELECT.
+
+Data is only ever added per whole session: :meth:`SeasonArchive.ingest`
+replaces everything of a session in one transaction, so readers never see a
+half-ingested session and re-ingesting is idempotent. Columns follow the
+Arrow schemas of session_store (lists are stored as JSON, booleans as 0/1)
+and :meth:`SeasonArchive.dataset` returns a frame that session_store can
+normalize exactly like an API response.
+
+SQLite runs in WAL mode with one connection per thread and process, like
+the ``sqlite:///`` shared_cache backend, so all workers read concurrently
+while one of them ingests.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+import session_store
+
+# Datasety, ktoré archív drží (kind zo session_store -> tabuľka)
+TABLES = {"drivers": "drivers", "laps": "laps", "radio": "radio"}
+
+SESSION_COLUMNS = {
+    "session_key": "INTEGER PRIMARY KEY",
+    "meeting_key": "INTEGER",
+    "year": "INTEGER",
+    "circuit_short_name": "TEXT",
+    "country_name": "TEXT",
+    "location": "TEXT",
+    "session_name": "TEXT",
+    "session_type": "TEXT",
+    "date_start": "TEXT",
+    "date_end": "TEXT",
+}
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS laps_session_driver_lap ON laps (session_key, driver_number, lap_number)",
+    "CREATE INDEX IF NOT EXISTS laps_date ON laps (date_start)",
+    "CREATE INDEX IF NOT EXISTS laps_driver_duration ON laps (driver_number, lap_duration)",
+    "CREATE INDEX IF NOT EXISTS radio_session_driver_date ON radio (session_key, driver_number, date)",
+    "CREATE INDEX IF NOT EXISTS radio_date ON radio (date)",
+    "CREATE INDEX IF NOT EXISTS radio_driver_date ON radio (driver_number, date)",
+    "CREATE INDEX IF NOT EXISTS drivers_session_driver ON drivers (session_key, driver_number)",
+    "CREATE INDEX IF NOT EXISTS sessions_circuit_year ON sessions (circuit_short_name, year)",
+    "CREATE INDEX IF NOT EXISTS sessions_date ON sessions (date_start)",
+)
+
+
+def _sql_type(field):
+    if pa.types.is_integer(field.type) or pa.types.is_boolean(field.type):
+        return "INTEGER"
+    if pa.types.is_floating(field.type):
+        return "REAL"
+    return "TEXT"
+
+
+def _columns(kind):
+    return [f.name for f in session_store.SCHEMAS[kind]]
+
+
+def _rows(kind, df):
+    """Normalized rows of ``df`` as tuples in schema order (lists as JSON text)."""
+    table = session_store.normalize(kind, df)
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        values = column.to_pylist()
+        if pa.types.is_list(field.type):
+            values = [None if v is None else json.dumps(v) for v in values]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def _decode(kind, df):
+    """Inverse of the storage conversion in :func:`_rows` for the dataset columns present in ``df``."""
+    for field in session_store.SCHEMAS[kind]:
+        if field.name not in df.columns:
+            continue
+        if pa.types.is_list(field.type):
+            df[field.name] = df[field.name].map(lambda v: None if v is None else json.loads(v))
+        elif pa.types.is_boolean(field.type):
+            df[field.name] = df[field.name].map(lambda v: None if v is None or v != v else bool(v))
+    return df
+
+
+def _where(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def _year(session):
+    year = session.get("year")
+    if isinstance(year, int):
+        return year
+    date = str(session.get("date_start") or "")
+    return int(date[:4]) if date[:4].isdigit() else None
+
+
+class SeasonArchive:
+    """See the module docstring."""
+
+    def __init__(self, path, busy_timeout=30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        with conn:
+            columns = ", ".join(f"{name} {sql_type}" for name, sql_type in SESSION_COLUMNS.items())
+            conn.execute(f"CREATE TABLE IF NOT EXISTS sessions ({columns}, ingested_at REAL NOT NULL, "
+                         "drivers INTEGER, laps INTEGER, radio INTEGER)")
+            for kind, table in TABLES.items():
+                columns = ", ".join(f"{f.name} {_sql_type(f)}" for f in session_store.SCHEMAS[kind])
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+            for statement in INDEXES:
+                conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Spojenie zdedené cez fork sa nesmie použiť
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --- ingest ---
+    def ingest(self, session, drivers=None, laps=None, radio=None):
+        """
+        Stores a finished session: ``session`` is its catalogue dict (at least
+        ``session_key``), the datasets are DataFrames as the API or the session
+        cache return them (None or empty = no rows). Replaces whatever the
+        archive held for the session. Returns {kind: rows}.
+        """
+        session_key = int(session["session_key"])
+        rows = {}
+        for kind, df in (("drivers", drivers), ("laps", laps), ("radio", radio)):
+            rows[kind] = [] if df is None or df.empty else _rows(kind, df.assign(session_key=session_key))
+        meta = {name: session.get(name) for name in SESSION_COLUMNS}
+        meta.update(session_key=session_key, year=_year(session))
+
+        with self._transaction() as conn:
+            for kind, table in TABLES.items():
+                conn.execute(f"DELETE FROM {table} WHERE session_key = ?", (session_key,))
+                if rows[kind]:
+                    columns = _columns(kind)
+                    conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                     f"VALUES ({', '.join('?' * len(columns))})", rows[kind])
+            conn.execute(
+                f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}, ingested_at, drivers, laps, radio) "
+                f"VALUES ({', '.join('?' * (len(SESSION_COLUMNS) + 4))})",
+                [meta[name] for name in SESSION_COLUMNS]
+                + [time.time(), len(rows["drivers"]), len(rows["laps"]), len(rows["radio"])],
+            )
+        return {kind: len(r) for kind, r in rows.items()}
+
+    def remove(self, session_key):
+        with self._transaction() as conn:
+            for table in list(TABLES.values()) + ["sessions"]:
+                conn.execute(f"DELETE FROM {table} WHERE session_key = ?", (int(session_key),))
+
+    # --- queries ---
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connect(), params=list(params))
+
+    def has_session(self, session_key):
+        row = self._connect().execute("SELECT 1 FROM sessions WHERE session_key = ?", (int(session_key),)).fetchone()
+        return row is not None
+
+    def sessions(self, year=None, circuit=None, session_type=None):
+        """Archived sessions (metadata and row counts), newest first."""
+        clauses, params = self._session_filters(year=year, circuit=circuit, session_type=session_type)
+        return self._query(f"SELECT * FROM sessions s{_where(clauses)} ORDER BY s.date_start DESC", params)
+
+    def dataset(self, kind, session_key):
+        """
+        One archived dataset (``drivers``, ``laps`` or ``radio``) of a session
+        with the session_store columns, or None when the session is not archived
+        or has no rows of that kind.
+        """
+        if kind not in TABLES or not self.has_session(session_key):
+            return None
+        order = {"drivers": "driver_number", "laps": "driver_number, lap_number", "radio": "date"}[kind]
+        df = self._query(f"SELECT {', '.join(_columns(kind))} FROM {TABLES[kind]} WHERE session_key = ? "
+                         f"ORDER BY {order}", (int(session_key),))
+        return _decode(kind, df) if not df.empty else None
+
+    @staticmethod
+    def _session_filters(session_key=None, year=None, circuit=None, session_type=None):
+        """WHERE clauses (sessions aliased as ``s``) and their parameters."""
+        clauses, params = [], []
+        for column, value in (("session_key", session_key), ("year", year), ("session_type", session_type)):
+            if value is not None:
+                clauses.append(f"s.{column} = ?")
+                params.append(value)
+        if circuit is not None:
+            clauses.append("s.circuit_short_name = ? COLLATE NOCASE")
+            params.append(circuit)
+        return clauses, params
+
+    def _select(self, kind, date_column, driver_number, since, until, order, limit, extra=(), **session_filters):
+        clauses, params = self._session_filters(**session_filters)
+        if driver_number is not None:
+            clauses.append("d.driver_number = ?")
+            params.append(int(driver_number))
+        if since is not None:
+            clauses.append(f"d.{date_column} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"d.{date_column} < ?")
+            params.append(until)
+        clauses.extend(extra)
+        sql = (f"SELECT s.year, s.circuit_short_name, s.session_name, s.session_type, "
+               f"dr.broadcast_name AS driver_name, dr.team_name, {', '.join('d.' + c for c in _columns(kind))} "
+               f"FROM {TABLES[kind]} d JOIN sessions s ON s.session_key = d.session_key "
+               f"LEFT JOIN drivers dr ON dr.session_key = d.session_key AND dr.driver_number = d.driver_number"
+               f"{_where(clauses)} ORDER BY {order}")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return _decode(kind, self._query(sql, params))
+
+    def laps(self, driver_number=None, session_key=None, year=None, circuit=None, session_type=None,
+             since=None, until=None, best=False, limit=None):
+        """
+        Laps across archived sessions with the session's year, circuit, name
+        and type and the driver's name and team. ``since``/``until`` bound ``date_start`` (ISO 8601 strings).
+        ``best`` returns timed laps fastest first (pit out laps excluded),
+        otherwise laps are in session and lap order.
+        """
+        extra = ["d.lap_duration IS NOT NULL", "NOT COALESCE(d.is_pit_out_lap, 0)"] if best else []
+        order = ("d.lap_duration" if best
+                 else "s.date_start, d.session_key, d.driver_number, d.lap_number")
+        return self._select("laps", "date_start", driver_number, since, until, order, limit, extra,
+                            session_key=session_key, year=year, circuit=circuit, session_type=session_type)
+
+    def team_radio(self, driver_number=None, session_key=None, year=None, circuit=None, session_type=None,
+                   since=None, until=None, limit=None):
+        """Radio messages across archived sessions, oldest first; filters as in :meth:`laps`."""
+        return self._select("radio", "date", driver_number, since, until, "d.date", limit,
+                            session_key=session_key, year=year, circuit=circuit, session_type=session_type)
+
+    def stats(self):
+        conn = self._connect()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ["sessions"] + list(TABLES.values())}
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal") if os.path.exists(self.path + suffix))
+        return {"path": os.path.abspath(self.path), "bytes": size, **counts}
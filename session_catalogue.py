@@ -0,0 +1,112 @@
+"""
+In-process cache of the OpenF1 session catalogue (/v1/sessions).
+
+The catalogue is fetched at most once per TTL per worker. Refreshes are
+single-flight: when the cached copy expires, the first caller refetches it and
+every concurrent caller waits for that one upstream request instead of issuing
+its own. If a refresh fails, the previous (stale) copy keeps being served.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SESSION_DEFAULTS = {
+    "year": "Unknown",
+    "country_name": "Unknown Country",
+    "session_name": "Unknown Session",
+    "location": "Unknown Location",
+    "date": "",
+}
+
+
+class CatalogueSnapshot:
+    """Immutable view of one fetched catalogue: sorted list, index and latest session."""
+
+    __slots__ = ("sessions", "by_key", "latest", "fetched_at", "_memo")
+
+    def __init__(self, raw_sessions, fetched_at):
+        sessions = []
+        for s in raw_sessions or []:
+            if s.get("session_key") is None:
+                continue
+            for field, default in SESSION_DEFAULTS.items():
+                if s.get(field) is None:
+                    s[field] = default
+            sessions.append(s)
+
+        # Zoradené od najnovšej session po najstaršiu (/v1/sessions má date_start, nie date)
+        sessions.sort(key=lambda x: x.get("date_start") or "", reverse=True)
+
+        self.sessions = sessions
+        self.by_key = {s["session_key"]: s for s in sessions}
+        self.latest = sessions[0] if sessions else None
+        self.fetched_at = fetched_at
+        self._memo = {}
+
+    def memo(self, key, build):
+        """``build()`` computed once per snapshot and ``key`` (e.g. an encoded response body)."""
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = build()
+        return value
+
+
+class SessionCatalogue:
+    """TTL-cached, single-flight session catalogue."""
+
+    def __init__(self, fetch, ttl=120.0, clock=time.monotonic):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self.fetch_count = 0
+
+    def _is_fresh(self, snapshot):
+        return snapshot is not None and self._clock() - snapshot.fetched_at < self.ttl
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._refresh_lock:
+            # Iné vlákno mohlo katalóg obnoviť, kým sme čakali na zámok
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            try:
+                raw = self._fetch()
+                self.fetch_count += 1
+            except Exception:
+                if snapshot is not None:
+                    logger.warning("Session catalogue refresh failed, serving stale copy.", exc_info=True)
+                    return snapshot
+                raise
+            snapshot = CatalogueSnapshot(raw, self._clock())
+            self._snapshot = snapshot
+            return snapshot
+
+    def sessions(self):
+        """All sessions with a session_key, newest first. Callers must not mutate the dicts."""
+        return self.snapshot().sessions
+
+    def get(self, session_key):
+        """Returns the session dict for ``session_key`` (int or str), or None."""
+        by_key = self.snapshot().by_key
+        session = by_key.get(session_key)
+        if session is None and isinstance(session_key, str) and session_key.isdigit():
+            session = by_key.get(int(session_key))
+        return session
+
+    def latest(self):
+        return self.snapshot().latest
+
+    def session_name(self, session_key, default="Unknown Session"):
+        session = self.get(session_key)
+        return session["session_name"] if session else default
+
+    def invalidate(self):
+        self._snapshot = None
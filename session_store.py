@@ -0,0 +1,579 @@
+"""
+Columnar on-disk cache for per-session OpenF1 datasets (drivers, laps, radio,
+race control) and per-driver telemetry (car_data, location).
+
+Every dataset has an explicit Arrow schema and is stored as an uncompressed
+Arrow IPC file (``data/<kind>_<session_key>.arrow``). Reads memory-map the file,
+so loading a cached session does no text parsing at all and can project only
+the columns a caller needs. Both the API path and the cache path go through
+:func:`normalize`, so a session has the same dtypes no matter where it came
+from.
+
+Legacy ``data/<kind>_<session_key>.csv`` files are still understood: they are
+converted on first read, or all at once with :func:`migrate_csv_cache`.
+
+:class:`DatasetStore` keeps the datasets in any shared_cache backend (the file
+backend produces exactly the files above) and makes sure only one worker
+process fetches a missing session while the others wait for its result.
+
+Datasets stored through :class:`DatasetStore` carry the time they were
+fetched (``stored_at`` in the Arrow schema metadata, ``df.attrs`` and
+:attr:`CachedDataset.stored_at`), so callers can tell a copy taken while the
+session was running from a final one.
+
+On top of the shared cache, :class:`SessionFrameCache` keeps recently used
+parsed datasets in memory, so repeated queries for the same session never
+touch disk. Its byte budget covers the frames and everything memoized on
+them (records, encoded responses).
+"""
+import ast
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+SEGMENTS = pa.list_(pa.int64())
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+SCHEMAS = {
+    "drivers": pa.schema([
+        ("meeting_key", pa.int64()),
+        ("session_key", pa.int64()),
+        ("driver_number", pa.int64()),
+        ("broadcast_name", pa.string()),
+        ("full_name", pa.string()),
+        ("name_acronym", pa.string()),
+        ("team_name", pa.string()),
+        ("team_colour", pa.string()),
+        ("first_name", pa.string()),
+        ("last_name", pa.string()),
+        ("headshot_url", pa.string()),
+        ("country_code", pa.string()),
+    ]),
+    "laps": pa.schema([
+        ("meeting_key", pa.int64()),
+        ("session_key", pa.int64()),
+        ("driver_number", pa.int64()),
+        ("lap_number", pa.int64()),
+        ("date_start", pa.string()),
+        ("duration_sector_1", pa.float64()),
+        ("duration_sector_2", pa.float64()),
+        ("duration_sector_3", pa.float64()),
+        ("i1_speed", pa.float64()),
+        ("i2_speed", pa.float64()),
+        ("is_pit_out_lap", pa.bool_()),
+        ("lap_duration", pa.float64()),
+        ("segments_sector_1", SEGMENTS),
+        ("segments_sector_2", SEGMENTS),
+        ("segments_sector_3", SEGMENTS),
+        ("st_speed", pa.float64()),
+        # Odvodený stĺpec - počíta sa pri zápise, nie pri každom čítaní
+        ("lap_time", pa.string()),
+    ]),
+    "radio": pa.schema([
+        ("meeting_key", pa.int64()),
+        ("session_key", pa.int64()),
+        ("driver_number", pa.int64()),
+        ("date", pa.string()),
+        ("recording_url", pa.string()),
+    ]),
+    "race_control": pa.schema([
+        ("meeting_key", pa.int64()),
+        ("session_key", pa.int64()),
+        ("date", pa.string()),
+        ("driver_number", pa.int64()),
+        ("lap_number", pa.int64()),
+        ("category", pa.string()),
+        ("flag", pa.string()),
+        ("scope", pa.string()),
+        ("sector", pa.int64()),
+        ("message", pa.string()),
+    ]),
+    # Telemetria jedného jazdca (kľúč "<session_key>_<driver_number>"), kanály ako float32
+    "car_data": pa.schema([
+        ("session_key", pa.int64()),
+        ("driver_number", pa.int64()),
+        ("date", TIMESTAMP),
+        ("speed", pa.float32()),
+        ("throttle", pa.float32()),
+        ("brake", pa.float32()),
+        ("n_gear", pa.float32()),
+        ("rpm", pa.float32()),
+        ("drs", pa.float32()),
+    ]),
+    "location": pa.schema([
+        ("session_key", pa.int64()),
+        ("driver_number", pa.int64()),
+        ("date", TIMESTAMP),
+        ("x", pa.float32()),
+        ("y", pa.float32()),
+        ("z", pa.float32()),
+    ]),
+}
+
+EXTENSION = ".arrow"
+STORED_AT = b"stored_at"
+
+
+def format_lap_times(durations):
+    """Vectorized format_lap_time: seconds -> "M:SS.mmm", "N/A" for missing values."""
+    durations = pd.to_numeric(pd.Series(durations), errors="coerce")
+    missing = durations.isna()
+    filled = durations.fillna(0.0)
+    minutes = (filled // 60).astype(np.int64).astype(str)
+    seconds = (filled % 60).map("{:06.3f}".format)
+    text = minutes + ":" + seconds
+    text[missing] = "N/A"
+    return text
+
+
+def dataset_path(data_dir, kind, session_key, extension=EXTENSION):
+    return os.path.join(data_dir, f"{kind}_{session_key}{extension}")
+
+
+def _parse_list_cell(value):
+    """Legacy CSVs store segment lists as their Python repr, e.g. "[2049, None]"."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [None if v is None or (isinstance(v, float) and np.isnan(v)) else int(v) for v in value]
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == "":
+        return None
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        parsed = ast.literal_eval(value)
+    return [None if v is None else int(v) for v in parsed]
+
+
+def _to_array(series, field):
+    if pa.types.is_list(field.type):
+        return pa.array([_parse_list_cell(v) for v in series], type=field.type)
+    if pa.types.is_string(field.type):
+        values = series.astype(object).where(series.notna(), None)
+        return pa.array([None if v is None else str(v) for v in values], type=field.type)
+    if pa.types.is_timestamp(field.type):
+        return pa.Array.from_pandas(pd.to_datetime(series, utc=True, format="ISO8601", errors="coerce"),
+                                    type=field.type)
+    if pa.types.is_boolean(field.type) and series.dtype == object:
+        values = series.map(lambda v: None if v is None or v != v else str(v).lower() in ("true", "1"))
+        return pa.array(values.tolist(), type=field.type)
+    if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+        series = pd.to_numeric(series, errors="coerce")
+    return pa.Array.from_pandas(series, type=field.type)
+
+
+def normalize(kind, df):
+    """
+    Converts a DataFrame from the API or a legacy CSV into an Arrow table with
+    the dataset's schema. Missing columns become nulls, unknown columns are
+    dropped and derived columns are (re)computed.
+    """
+    schema = SCHEMAS[kind]
+    df = df.reset_index(drop=True)
+    if kind == "laps" and "lap_duration" in df.columns:
+        df = df.assign(lap_time=format_lap_times(df["lap_duration"]).values)
+
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            arrays.append(_to_array(df[field.name], field))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def to_frame(table):
+    """
+    Arrow table -> DataFrame. List columns come back as Python lists (as they do
+    from the JSON API) so the frame stays directly JSON-serializable.
+    """
+    list_columns = [f.name for f in table.schema if pa.types.is_list(f.type)]
+    df = table.drop_columns(list_columns).to_pandas() if list_columns else table.to_pandas()
+    for name in list_columns:
+        df[name] = pd.Series(table.column(name).to_pylist(), index=df.index, dtype=object)
+    df = df[[f.name for f in table.schema]]
+    stored_at = stored_time(table)
+    if stored_at is not None:
+        df.attrs["stored_at"] = stored_at
+    return df
+
+
+def stored_time(table):
+    """Unix time the dataset was fetched (see :meth:`DatasetStore.write`), None when unknown (e.g. legacy CSV)."""
+    value = (table.schema.metadata or {}).get(STORED_AT)
+    return float(value) if value else None
+
+
+def approx_size(value):
+    """Rough memory footprint in bytes of a memoized value (encoded bodies, records, analytics)."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def write_table(data_dir, kind, session_key, table):
+    """Writes the table atomically (temp file + rename), so readers never see a partial file."""
+    path = dataset_path(data_dir, kind, session_key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_dataset(data_dir, kind, session_key, df):
+    """Normalizes and stores ``df``; returns the normalized DataFrame."""
+    table = normalize(kind, df)
+    write_table(data_dir, kind, session_key, table)
+    return to_frame(table)
+
+
+def _read_legacy_csv(path):
+    return pd.read_csv(path, encoding="utf-8", keep_default_na=False, na_values=[""])
+
+
+def read_table(data_dir, kind, session_key, columns=None):
+    """
+    Returns the cached Arrow table for a session, or None if it isn't cached.
+    A legacy CSV cache is converted to the columnar format on first read.
+    """
+    path = dataset_path(data_dir, kind, session_key)
+    if not os.path.exists(path):
+        csv_path = dataset_path(data_dir, kind, session_key, ".csv")
+        if not os.path.exists(csv_path):
+            return None
+        table = normalize(kind, _read_legacy_csv(csv_path))
+        write_table(data_dir, kind, session_key, table)
+        return table.select(columns) if columns else table
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def read_dataset(data_dir, kind, session_key, columns=None):
+    """Same as :func:`read_table` but returns a DataFrame (or None)."""
+    table = read_table(data_dir, kind, session_key, columns=columns)
+    return None if table is None else to_frame(table)
+
+
+def migrate_csv_cache(data_dir, remove_csv=False, store=None):
+    """
+    One-shot conversion of every legacy ``<kind>_<key>.csv`` in ``data_dir``
+    (into ``store``, a DatasetStore, when given). Returns a list of
+    (csv_path, target or None, error or None).
+    """
+    results = []
+    for name in sorted(os.listdir(data_dir)):
+        stem, ext = os.path.splitext(name)
+        kind, _, session_key = stem.rpartition("_")
+        if ext != ".csv" or kind not in SCHEMAS or not session_key.isdigit():
+            continue
+        csv_path = os.path.join(data_dir, name)
+        try:
+            table = normalize(kind, _read_legacy_csv(csv_path))
+            if store is None:
+                arrow_path = write_table(data_dir, kind, session_key, table)
+            else:
+                store.write_table(kind, session_key, table)
+                arrow_path = f"{store.backend.describe()} {store.key(kind, session_key)}"
+            if remove_csv:
+                os.remove(csv_path)
+            results.append((csv_path, arrow_path, None))
+        except Exception as e:
+            results.append((csv_path, None, e))
+    return results
+
+
+def cached_session_keys(data_dir, kinds=("drivers", "laps", "radio")):
+    """Sorted session keys with a cached ``kinds`` dataset (Arrow file or legacy CSV) in ``data_dir``."""
+    keys = set()
+    for name in os.listdir(data_dir):
+        stem, ext = os.path.splitext(name)
+        kind, _, session_key = stem.rpartition("_")
+        if ext in (EXTENSION, ".csv") and kind in kinds and session_key.isdigit():
+            keys.add(int(session_key))
+    return sorted(keys)
+
+
+def encode_table(table, compression=None):
+    """Arrow table -> Arrow IPC file bytes (the same format as the .arrow files)."""
+    sink = pa.BufferOutputStream()
+    with ipc.new_file(sink, table.schema, options=ipc.IpcWriteOptions(compression=compression)) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def decode_table(value, columns=None):
+    """Inverse of :func:`encode_table`; ``value`` is bytes, a pyarrow Buffer or a (memory-mapped) file."""
+    source = pa.py_buffer(value) if isinstance(value, (bytes, bytearray, memoryview)) else value
+    table = ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+class DatasetStore:
+    """
+    Session datasets in a shared_cache backend under ``<kind>_<session_key>``.
+
+    :meth:`get_or_populate` is the single-flight path: on a miss it takes the
+    backend's cross-process lock for the session, looks again (another worker
+    may have stored it meanwhile) and only then calls ``fetch``.
+    """
+
+    def __init__(self, backend, lock_ttl=120.0, lock_timeout=60.0):
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.lock_timeout = lock_timeout
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.populated = 0
+        self.coalesced = 0
+        self.lock_timeouts = 0
+
+    @staticmethod
+    def key(kind, session_key):
+        return f"{kind}_{session_key}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def read_table(self, kind, session_key, columns=None):
+        """The stored Arrow table, or None. A legacy CSV next to the file backend is converted on first read."""
+        value = self.backend.get(self.key(kind, session_key))
+        if value is not None:
+            return decode_table(value, columns)
+        directory = getattr(self.backend, "directory", None)
+        csv_path = directory and dataset_path(directory, kind, session_key, ".csv")
+        if not csv_path or not os.path.exists(csv_path):
+            return None
+        table = normalize(kind, _read_legacy_csv(csv_path))
+        self.write_table(kind, session_key, table)
+        return table.select(columns) if columns else table
+
+    def read(self, kind, session_key, columns=None):
+        """Same as :meth:`read_table` but returns a DataFrame (or None)."""
+        table = self.read_table(kind, session_key, columns=columns)
+        return None if table is None else to_frame(table)
+
+    def write_table(self, kind, session_key, table):
+        self.backend.put(self.key(kind, session_key), encode_table(table, self.backend.compression))
+
+    def write(self, kind, session_key, df, stored_at=None):
+        """
+        Normalizes and stores ``df`` fetched at ``stored_at`` (Unix time,
+        default now); returns the normalized DataFrame.
+        """
+        table = normalize(kind, df)
+        table = table.replace_schema_metadata({STORED_AT: repr(time.time() if stored_at is None else stored_at)})
+        self.write_table(kind, session_key, table)
+        return to_frame(table)
+
+    def delete(self, kind, session_key):
+        """Drops the stored dataset (and a legacy CSV next to the file backend), so the next read misses."""
+        self.backend.delete(self.key(kind, session_key))
+        directory = getattr(self.backend, "directory", None)
+        csv_path = directory and dataset_path(directory, kind, session_key, ".csv")
+        if csv_path and os.path.exists(csv_path):
+            os.remove(csv_path)
+
+    def get_or_populate(self, kind, session_key, fetch):
+        """
+        Stored DataFrame for the session, or ``fetch()`` stored by exactly one
+        process at a time. Returns None when ``fetch`` returns None or an empty
+        frame (nothing is stored then).
+        """
+        df = self.read(kind, session_key)
+        if df is not None:
+            self._count("hits")
+            return df
+        self._count("misses")
+        key = self.key(kind, session_key)
+        with self.backend.lock(key, ttl=self.lock_ttl, timeout=self.lock_timeout,
+                               ready=lambda: self.backend.exists(key)) as acquired:
+            df = self.read(kind, session_key)
+            if df is not None:
+                # Kým sme čakali na zámok, session stiahol a uložil iný worker
+                self._count("coalesced")
+                return df
+            if not acquired:
+                self._count("lock_timeouts")
+            started = time.time()
+            fetched = fetch()
+            if fetched is None or fetched.empty:
+                return None
+            df = self.write(kind, session_key, fetched, stored_at=started)
+            self._count("populated")
+            return df
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "backend": self.backend.describe(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "populated": self.populated,
+                "coalesced": self.coalesced,
+                "lock_timeouts": self.lock_timeouts,
+            }
+
+
+class CachedDataset:
+    """
+    A parsed session dataset held in memory, with a prebuilt
+    driver_number -> row slice index (rows are sorted by driver_number).
+    ``nbytes`` grows with what is memoized on it; the owning
+    SessionFrameCache is told, so the memo counts against its budget.
+    """
+
+    __slots__ = ("frame", "nbytes", "driver_slices", "stored_at", "_records", "_memo", "_owner")
+
+    def __init__(self, frame):
+        self.stored_at = frame.attrs.get("stored_at")
+        if "driver_number" in frame.columns and len(frame):
+            frame = frame.sort_values("driver_number", kind="stable").reset_index(drop=True)
+            numbers = frame["driver_number"].to_numpy()
+            unique, starts = np.unique(numbers, return_index=True)
+            ends = np.append(starts[1:], len(numbers))
+            self.driver_slices = {
+                int(n): slice(int(s), int(e)) for n, s, e in zip(unique, starts, ends) if n == n
+            }
+        else:
+            self.driver_slices = {}
+        self.frame = frame
+        self.nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+        self._records = None
+        self._memo = {}
+        self._owner = None  # (SessionFrameCache, kľúč), kým je dataset v cache
+
+    def stored_after(self, when):
+        """Whether the dataset was fetched at or after ``when`` (aware datetime); False when unknown."""
+        return self.stored_at is not None and self.stored_at >= when.timestamp()
+
+    def _grow(self, size):
+        owner = self._owner
+        if owner is not None:
+            owner[0]._grow(owner[1], self, size)
+        else:
+            self.nbytes += size
+
+    def for_driver(self, driver_number):
+        """Rows of one driver, without scanning the frame. Returns a view; copy before mutating."""
+        sl = self.driver_slices.get(int(driver_number))
+        if sl is None:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[sl]
+
+    def records(self):
+        """JSON-ready list of dicts (NaN -> None), built once. Shared; do not mutate."""
+        if self._records is None:
+            df = self.frame
+            self._records = df.astype(object).where(df.notna(), None).to_dict("records")
+            self._grow(approx_size(self._records))
+        return self._records
+
+    def memo(self, key, build):
+        """``build()`` computed once per dataset and ``key`` (e.g. an encoded response body)."""
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = build()
+            self._grow(approx_size(key) + approx_size(value))
+        return value
+
+
+def _disown(value):
+    if isinstance(value, CachedDataset):
+        value._owner = None
+
+
+class SessionFrameCache:
+    """
+    Per-process LRU of CachedDataset objects keyed by (kind, session_key,
+    part), bounded by bytes. ``part`` splits a session's data further (e.g.
+    telemetry per driver); any object with ``nbytes`` can be stored.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kind, session_key, part=None):
+        key = (kind, int(session_key), part)
+        with self._lock:
+            dataset = self._entries.get(key)
+            if dataset is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dataset
+
+    def put(self, kind, session_key, frame, part=None):
+        """Wraps ``frame`` (a DataFrame) in a CachedDataset, stores it and returns it."""
+        dataset = CachedDataset(frame) if isinstance(frame, pd.DataFrame) else frame
+        key = (kind, int(session_key), part)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                _disown(old)
+                self.bytes -= old.nbytes
+            if dataset.nbytes > self.max_bytes:
+                # Väčšie ako celý rozpočet - vrátime ho, ale neuložíme
+                return dataset
+            self._entries[key] = dataset
+            if isinstance(dataset, CachedDataset):
+                dataset._owner = (self, key)
+            self.bytes += dataset.nbytes
+            self._evict()
+        return dataset
+
+    def _grow(self, key, dataset, size):
+        """Called by a CachedDataset when something was memoized on it."""
+        with self._lock:
+            dataset.nbytes += size
+            if self._entries.get(key) is dataset:
+                self.bytes += size
+                self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            _disown(evicted)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def invalidate(self, kind=None, session_key=None):
+        with self._lock:
+            for key in list(self._entries):
+                if (kind is None or key[0] == kind) and (session_key is None or key[1] == int(session_key)):
+                    dataset = self._entries.pop(key)
+                    _disown(dataset)
+                    self.bytes -= dataset.nbytes
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,319 @@
+"""
+Key/value cache shared by all worker processes on a host (or a cluster).
+
+Every worker used to keep its own view of the session caches, so a cold
+session was fetched from OpenF1 once per worker at the same time. The backends
+here store opaque binary values under string keys and provide a cross-process
+lock per key, which :class:`session_store.DatasetStore` uses so that only one
+worker populates a session while the others wait and then read its result.
+
+Backends (``CACHE_BACKEND``):
+
+* ``file://<dir>`` (default ``file://data``) - one file per key, written to a
+  temp file and renamed into place; locks are ``<dir>/.locks/<key>.lock``
+  files created with O_EXCL. Values are memory-mapped on read (the file
+  handle is closed right away; the mapping lives as long as the data).
+* ``sqlite:///<path>`` - a single SQLite database in WAL mode; values are
+  BLOBs written in a transaction, locks are rows in a ``locks`` table.
+* ``redis://host:port/db`` - any Redis-compatible server (needs the optional
+  ``redis`` package); locks are ``SET NX PX`` keys.
+
+Locks expire after ``ttl`` seconds, so a worker that dies while populating
+never blocks the others for longer than that.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+# Kompresia hodnôt pre backendy, ktoré ich držia ako bajty (súbory ostávajú nekomprimované kvôli mmap)
+COMPACT_CODEC = next((c for c in ("zstd", "lz4") if pa.Codec.is_available(c)), None)
+
+
+class CacheBackend:
+    """
+    Interface: ``get(key)`` returns the stored value (bytes or a readable
+    pyarrow buffer/file) or None, ``put(key, value)`` replaces it atomically,
+    ``delete(key)`` removes it and ``exists(key)`` is a cheap presence check.
+    :meth:`lock` is the cross-process lock.
+    ``compression`` is the Arrow IPC codec values should be encoded with.
+    """
+
+    compression = None
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def put(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        return self.get(key) is not None
+
+    def try_lock(self, key, token, ttl):
+        """Takes the lock for ``key`` as ``token`` if it is free or expired; True on success."""
+        raise NotImplementedError
+
+    def unlock(self, key, token):
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, key, ttl=120.0, timeout=60.0, ready=None):
+        """
+        Holds the lock for ``key`` (waiting up to ``timeout`` seconds) and
+        yields True. Yields False when it could not be acquired in time - the
+        caller then goes ahead without it rather than failing the request - or
+        as soon as ``ready()`` (checked between attempts) returns true, i.e.
+        the holder already produced what the caller was waiting for.
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        acquired = self.try_lock(key, token, ttl)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            if ready is not None and ready():
+                break
+            acquired = self.try_lock(key, token, ttl)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.unlock(key, token)
+
+    def describe(self):
+        return type(self).__name__
+
+    def close(self):
+        pass
+
+
+class FileBackend(CacheBackend):
+    """One file per key in ``directory`` (``<key><extension>``)."""
+
+    def __init__(self, directory, extension=".arrow"):
+        self.directory = directory
+        self.extension = extension
+        self.lock_dir = os.path.join(directory, ".locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}{self.extension}")
+
+    def get(self, key):
+        try:
+            with pa.memory_map(self.path(key), "r") as f:
+                # Buffer drží namapovanú oblasť aj po zatvorení súboru
+                return f.read_buffer()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, value):
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def _lock_path(self, key):
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    def try_lock(self, key, token, ttl):
+        path = self._lock_path(key)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            self._remove_stale_lock(path, ttl)
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+        return True
+
+    def _remove_stale_lock(self, path, ttl):
+        """
+        Removes the lock file at ``path`` if it is older than ``ttl`` (its
+        holder probably died); the next try_lock then takes it. The file is
+        first renamed to a unique name and deleted only if it still holds the
+        token seen as stale - another worker may have replaced it in between.
+        """
+        try:
+            if time.time() - os.path.getmtime(path) <= ttl:
+                return
+            with open(path) as f:
+                stale_token = f.read()
+        except FileNotFoundError:
+            return
+        moved = f"{path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(path, moved)
+        except FileNotFoundError:
+            return
+        try:
+            with open(moved) as f:
+                if f.read() != stale_token:
+                    # Odsunuli sme čerstvý zámok iného workera - vrátime ho, ak miesto medzitým nikto nezabral
+                    try:
+                        os.link(moved, path)
+                    except FileExistsError:
+                        pass
+        finally:
+            os.remove(moved)
+
+    def unlock(self, key, token):
+        path = self._lock_path(key)
+        try:
+            with open(path) as f:
+                if f.read() != token:
+                    return
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def describe(self):
+        return f"file://{os.path.abspath(self.directory)}"
+
+
+class SQLiteBackend(CacheBackend):
+    """Values and locks in one SQLite database; one connection per thread and process."""
+
+    compression = COMPACT_CODEC
+
+    def __init__(self, path, busy_timeout=30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                         "updated REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, "
+                         "expires REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Spojenie zdedené cez fork sa nesmie použiť
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key, value):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, updated) VALUES (?, ?, ?)",
+                         (key, sqlite3.Binary(value), time.time()))
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def exists(self, key):
+        return self._connect().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def try_lock(self, key, token, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires < ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO locks (key, token, expires) VALUES (?, ?, ?)",
+                                  (key, token, now + ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def unlock(self, key, token):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    def describe(self):
+        return f"sqlite:///{os.path.abspath(self.path)}"
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local = threading.local()
+
+
+class RedisBackend(CacheBackend):
+    """Any Redis-compatible server; keys are prefixed with ``prefix``."""
+
+    compression = COMPACT_CODEC
+
+    _UNLOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, prefix="unif1ed:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis:// needs the 'redis' package (pip install redis)") from e
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def put(self, key, value):
+        self.client.set(self.prefix + key, bytes(value))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def exists(self, key):
+        return bool(self.client.exists(self.prefix + key))
+
+    def try_lock(self, key, token, ttl):
+        return bool(self.client.set(f"{self.prefix}lock:{key}", token, nx=True, px=int(ttl * 1000)))
+
+    def unlock(self, key, token):
+        self.client.eval(self._UNLOCK, 1, f"{self.prefix}lock:{key}", token)
+
+    def describe(self):
+        return self.url
+
+    def close(self):
+        # Po forku si klient otvorí nové spojenia
+        self.client.connection_pool.disconnect()
+
+
+def from_url(url):
+    """Backend for a ``file://``, ``sqlite:///`` or ``redis://`` (``rediss://``) URL."""
+    if url.startswith("file://"):
+        return FileBackend(url[len("file://"):])
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_BACKEND {url!r} (use file://, sqlite:/// or redis://)")
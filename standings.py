@@ -0,0 +1,234 @@
+"""
+Memoized event schedule and championship standings for the home page.
+
+Both upstream calls behind ``/`` (the Ergast driver standings and the season
+schedule used for the points still available) are slow and change rarely, so
+:class:`StandingsService` keeps them in memory:
+
+* the schedule once per season,
+* the finished standings table once per (drivers/constructors, season, round).
+
+Entries are served stale-while-revalidate: after their TTL the cached value is
+still returned immediately and a single background thread fetches a fresh one.
+"No standings for this round yet" is cached as well, for a much shorter time,
+so the page keeps falling back to the previous round without asking Ergast on
+every hit. A new race result therefore shows up within ``missing_ttl``, or at
+once when :meth:`StandingsService.invalidate` is called (the warm-up does so
+after every race).
+
+:class:`CurrentRound` keeps the current (season, round) the same way, so the
+whole process agrees on it and it never blocks a request after startup.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "error", "fetched_at", "expires_at")
+
+    def __init__(self, value, error, fetched_at, expires_at):
+        self.value = value
+        self.error = error
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class StaleWhileRevalidateCache:
+    """
+    ``loader(key)`` results kept in memory. Expired entries are returned as
+    they are while one background refresh per key runs; only a missing entry
+    makes the caller wait (and concurrent callers share that one load).
+
+    Exceptions of the types in ``cache_errors`` are cached as negative results
+    for ``error_ttl`` seconds. Any other failure keeps the previous value (if
+    there is one) and retries after ``error_ttl``.
+    """
+
+    def __init__(self, loader, ttl, error_ttl=60.0, cache_errors=(), clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.cache_errors = tuple(cache_errors)
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def get(self, key, refresh=False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not refresh:
+                if self._clock() < entry.expires_at:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._revalidate(key)
+                return entry.result()
+            self.misses += 1
+        return self._load(key, entry if refresh else None).result()
+
+    def _load(self, key, previous=None):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            # Kým sme čakali na zámok, hodnotu mohol načítať iný request
+            if entry is not None and entry is not previous and self._clock() < entry.expires_at:
+                return entry
+            return self._fetch(key, entry)
+
+    def _fetch(self, key, previous):
+        now = self._clock()
+        try:
+            entry = _Entry(self.loader(key), None, now, now + self.ttl)
+        except self.cache_errors as e:
+            entry = _Entry(None, e, now, now + self.error_ttl)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            if previous is None:
+                raise
+            logger.exception("Refreshing %s failed, serving the cached result: %s", key, e)
+            entry = _Entry(previous.value, previous.error, previous.fetched_at, now + self.error_ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self.refreshes += 1
+        return entry
+
+    def _revalidate(self, key):
+        # Volá sa pod self._lock
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        def run():
+            try:
+                with self._lock:
+                    previous = self._entries.get(key)
+                self._load(key, previous)
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", key, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True, name=f"swr-refresh-{key}").start()
+
+    def invalidate(self, predicate=None):
+        """Drops all entries (or those whose key matches ``predicate``)."""
+        with self._lock:
+            for key in list(self._entries):
+                if predicate is None or predicate(key):
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+            }
+
+
+class StandingsUnavailable(ValueError):
+    """Ergast has no driver standings for the requested round (yet)."""
+
+
+class StandingsService:
+    """
+    ``fetch_schedule(season)`` returns the event schedule DataFrame,
+    ``fetch_standings(kind, season, round)`` the Ergast "drivers" or
+    "constructors" standings DataFrame (empty when the round has no results)
+    and ``build_table(kind, standings, schedule, season, round)`` turns both
+    into the records shown on the page.
+    """
+
+    def __init__(self, fetch_schedule, fetch_standings, build_table, schedule_ttl=6 * 3600.0,
+                 standings_ttl=900.0, missing_ttl=120.0, clock=time.monotonic):
+        self.fetch_standings = fetch_standings
+        self.build_table = build_table
+        self.schedules = StaleWhileRevalidateCache(fetch_schedule, schedule_ttl, error_ttl=missing_ttl,
+                                                   clock=clock)
+        self.tables = StaleWhileRevalidateCache(self._load_table, standings_ttl, error_ttl=missing_ttl,
+                                                cache_errors=(StandingsUnavailable,), clock=clock)
+
+    def schedule(self, season):
+        return self.schedules.get(season)
+
+    def _load_table(self, key):
+        kind, season, round = key
+        standings = self.fetch_standings(kind, season, round)
+        if standings is None or standings.empty:
+            raise StandingsUnavailable(f"No driver standings data available for round {round}.")
+        try:
+            schedule = self.schedule(season)
+        except Exception as e:
+            # Bez rozvrhu sa dá tabuľka stále zobraziť, len bez presného počtu zostávajúcich bodov
+            logger.warning("Error fetching the %s schedule: %s", season, e)
+            schedule = None
+        table = self.build_table(kind, standings, schedule, season, round)
+        if not table:
+            # Výpočet zlyhal - neukladáme prázdnu tabuľku ako platný výsledok
+            raise RuntimeError(f"Could not build the standings table for round {round}.")
+        return table
+
+    def table(self, season, round, refresh=False, kind="drivers"):
+        """Standings records for (season, round); raises StandingsUnavailable if there are none yet."""
+        return self.tables.get((kind, season, round), refresh=refresh)
+
+    def invalidate(self, season=None):
+        """Forgets the standings of a season (or all), e.g. after a new race result."""
+        self.tables.invalidate(None if season is None else (lambda key: key[1] == season))
+
+    def stats(self):
+        return {"schedules": self.schedules.stats(), "tables": self.tables.stats()}
+
+
+class RoundUnavailable(RuntimeError):
+    """The current round could not be determined (schedule unavailable)."""
+
+
+class CurrentRound:
+    """
+    (season, round) of the current race weekend from ``compute()``, kept in
+    memory and recomputed in the background every ``ttl`` seconds. When it
+    can't be determined, (current year, 0) is returned and the computation is
+    retried after ``retry`` seconds.
+    """
+
+    def __init__(self, compute, ttl=3600.0, retry=300.0, clock=time.monotonic):
+        self._cache = StaleWhileRevalidateCache(lambda key: compute(), ttl, error_ttl=retry,
+                                                cache_errors=(RoundUnavailable,), clock=clock)
+
+    def get(self):
+        try:
+            return self._cache.get("current")
+        except RoundUnavailable:
+            return datetime.now().year, 0
+
+    def refresh(self):
+        """Recomputes now; raises RoundUnavailable on failure."""
+        return self._cache.get("current", refresh=True)
+
+    def stats(self):
+        return self._cache.stats()
+
@@ -0,0 +1,211 @@
+"""
+Build step for static assets: fingerprinting, precompression and thumbnails.
+
+``flask build-static`` (:func:`build`) copies every file under ``static/`` to
+``static/dist/`` with a content hash in its name (``style.css`` ->
+``style.1a2b3c4d.css``), writes ``.gz`` and ``.br`` siblings of text assets
+when that makes them smaller, renders downsized thumbnails of the circuit
+images (AVIF if Pillow can write it, else WebP) and records everything in ``static/dist/manifest.json``.
+
+At runtime :class:`AssetManifest` maps logical paths to the fingerprinted
+files (``asset_url`` in templates) and ``/assets/<path>`` serves them with
+``Cache-Control: immutable``, picking the precompressed variant the client
+accepts. Without a build, templates fall back to the plain ``/static`` URLs.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+
+from compression import brotli, negotiate
+
+logger = logging.getLogger(__name__)
+
+DIST = "dist"
+MANIFEST = "manifest.json"
+TEXT_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+IMAGE_EXTENSIONS = (".avif", ".webp", ".png", ".jpg", ".jpeg")
+EXCLUDE_SUFFIXES = ("_backup.txt",)
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _fingerprint(data):
+    return hashlib.blake2b(data, digest_size=4).hexdigest()
+
+
+def _fingerprinted_name(relative, data, extension=None):
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{_fingerprint(data)}{extension or ext}".replace(os.sep, "/")
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _precompress(path, data, min_size):
+    """Writes path.gz / path.br when they are smaller than ``data``; returns the encodings written."""
+    written = []
+    if len(data) < min_size:
+        return written
+    variants = {"gzip": (".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants["br"] = (".br", lambda: brotli.compress(data, quality=11))
+    for encoding, (suffix, make) in variants.items():
+        compressed = make()
+        if len(compressed) < len(data):
+            _write(path + suffix, compressed)
+            written.append(encoding)
+    return written
+
+
+def thumbnail_format():
+    """"avif" when Pillow can encode it (the originals are AVIF already), else "webp"."""
+    from PIL import features
+
+    return "avif" if features.check("avif") else "webp"
+
+
+def _thumbnail(data, width, fmt, quality):
+    """
+    (thumbnail bytes, width) - at most ``width`` pixels wide, never upscaled -
+    or None if Pillow can't read the image.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == "webp":
+                image.save(out, "WEBP", quality=quality, method=4)
+            else:
+                image.save(out, fmt.upper(), quality=quality)
+            return out.getvalue(), image.width
+    except Exception as e:
+        logger.warning("Cannot create a thumbnail: %s", e)
+        return None
+
+
+def build(static_dir, thumbnail_dirs=("circuits",), thumbnail_width=480, thumbnail_format=None,
+          thumbnail_quality=None, min_size=512, progress=print):
+    """
+    Rebuilds ``<static_dir>/dist`` and its manifest. Returns the manifest:
+    {"assets": {path: {"file", "bytes", "encodings": {enc: bytes}}},
+     "thumbnails": {path: {"file", "bytes", "width"}}}.
+    """
+    fmt = thumbnail_format or globals()["thumbnail_format"]()
+    quality = thumbnail_quality or (60 if fmt == "avif" else 75)
+    dist = os.path.join(static_dir, DIST)
+    staging = dist + ".new"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {"assets": {}, "thumbnails": {}}
+
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d not in (DIST, DIST + ".new", DIST + ".old")]
+        for name in sorted(files):
+            if name.endswith(EXCLUDE_SUFFIXES):
+                continue
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            target_name = _fingerprinted_name(relative, data)
+            target = os.path.join(staging, target_name)
+            _write(target, data)
+            entry = {"file": target_name, "bytes": len(data), "encodings": {}}
+            if name.lower().endswith(TEXT_EXTENSIONS):
+                for encoding in _precompress(target, data, min_size):
+                    suffix = ".br" if encoding == "br" else ".gz"
+                    entry["encodings"][encoding] = os.path.getsize(target + suffix)
+            manifest["assets"][relative] = entry
+
+            top = relative.split("/", 1)[0]
+            if top in thumbnail_dirs and name.lower().endswith(IMAGE_EXTENSIONS):
+                result = _thumbnail(data, thumbnail_width, fmt, quality)
+                if result is not None:
+                    thumb, width = result
+                    thumb_name = _fingerprinted_name(f"{top}/thumbs/{relative.split('/', 1)[1]}", thumb, f".{fmt}")
+                    _write(os.path.join(staging, thumb_name), thumb)
+                    manifest["thumbnails"][relative] = {"file": thumb_name, "bytes": len(thumb), "width": width}
+            progress(f"{relative} -> {target_name} ({len(data)} B"
+                     + "".join(f", {e} {b} B" for e, b in entry["encodings"].items())
+                     + (f", thumbnail {manifest['thumbnails'][relative]['bytes']} B"
+                        if relative in manifest["thumbnails"] else "") + ")")
+
+    _write(os.path.join(staging, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    # Výmena celého adresára naraz, aby bežiaci server nevidel polovičný build
+    old = dist + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(dist):
+        os.replace(dist, old)
+    os.replace(staging, dist)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Fingerprinted asset lookup from ``<static_dir>/dist/manifest.json``, read
+    at startup; :meth:`load` re-reads it after a new build.
+    """
+
+    def __init__(self, static_dir, url_prefix="/assets"):
+        self.static_dir = static_dir
+        self.dist = os.path.join(static_dir, DIST)
+        self.url_prefix = url_prefix
+        self._manifest = {"assets": {}, "thumbnails": {}}
+        self._mtime = None
+        self.load()
+
+    def load(self):
+        path = os.path.join(self.dist, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest, self._mtime = {"assets": {}, "thumbnails": {}}, None
+            return False
+        if mtime == self._mtime:
+            return False
+        with open(path, encoding="utf-8") as f:
+            self._manifest = json.load(f)
+        self._mtime = mtime
+        return True
+
+    def url(self, path):
+        """URL of the fingerprinted asset for ``path`` (relative to static/), or None if not built."""
+        entry = self._manifest["assets"].get(path)
+        return f"{self.url_prefix}/{entry['file']}" if entry else None
+
+    def thumbnail(self, path):
+        """(URL, width) of the thumbnail of an image, or None."""
+        entry = self._manifest["thumbnails"].get(path)
+        return (f"{self.url_prefix}/{entry['file']}", entry["width"]) if entry else None
+
+    def send(self, filename):
+        """Response for /assets/<filename>: the precompressed variant the client accepts, cached forever."""
+        available = [e for e, suffix in (("br", ".br"), ("gzip", ".gz"))
+                     if (e != "br" or brotli is not None) and os.path.exists(os.path.join(self.dist, filename + suffix))]
+        encoding = negotiate(request.accept_encodings, tuple(available)) if available else None
+        if encoding is None:
+            response = send_from_directory(self.dist, filename, max_age=31536000)
+        else:
+            suffix = ".br" if encoding == "br" else ".gz"
+            response = send_from_directory(self.dist, filename + suffix, max_age=31536000)
+            response.headers["Content-Encoding"] = encoding
+            # Typ podľa pôvodnej prípony, nie .gz/.br
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if available:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
@@ -0,0 +1,206 @@
+"""
+Per-lap car telemetry (OpenF1 ``car_data`` and ``location``) with
+server-side downsampling.
+
+A driver's samples for a whole session are fetched once, in time windows of
+``chunk`` (several requests in parallel instead of one huge response), stored
+in the shared session cache and kept in memory as a :class:`Trace`: a sorted
+int64 timestamp array plus one float array per channel. A lap is then just a
+``searchsorted`` slice between the lap's ``date_start`` and the next lap's.
+
+Traces are far too long to send to a browser, so every response is
+downsampled to ``points`` samples with a vectorized variant of LTTB
+(Largest-Triangle-Three-Buckets): each bucket keeps the point that forms the
+largest triangle with the *averages* of its neighbouring buckets (the original
+uses the previously selected point, which forces a sequential loop). Min-max
+per bucket is available as well. All channels of a response share one set of
+sample indices (the union of each channel's selection), so the client gets a
+single time axis.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+CHANNELS = {
+    "car_data": ("speed", "throttle", "brake", "n_gear", "rpm", "drs"),
+    "location": ("x", "y", "z"),
+}
+DEFAULT_POINTS = 1500
+MAX_POINTS = 5000
+
+
+class Trace:
+    """
+    Samples of one driver and source: ``t`` (int64 ns since epoch, ascending)
+    and float arrays per channel; ``stored_at`` is when they were fetched (see session_store).
+    """
+
+    __slots__ = ("t", "channels", "nbytes", "stored_at")
+
+    def __init__(self, t, channels, stored_at=None):
+        order = np.argsort(t, kind="stable")
+        if len(t) and not np.all(order == np.arange(len(t))):
+            t = t[order]
+            channels = {name: values[order] for name, values in channels.items()}
+        self.t = t
+        self.channels = channels
+        self.stored_at = stored_at
+        self.nbytes = int(t.nbytes + sum(v.nbytes for v in channels.values()))
+
+    @classmethod
+    def from_frame(cls, df, names):
+        """From a DataFrame with a ``date`` column (datetime or ISO strings) and the channel columns."""
+        if df is None or df.empty:
+            return cls(np.empty(0, dtype=np.int64), {name: np.empty(0, dtype=np.float32) for name in names})
+        dates = pd.to_datetime(df["date"], utc=True, format="ISO8601") if df["date"].dtype == object else df["date"]
+        t = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        channels = {}
+        for name in names:
+            values = df[name] if name in df.columns else pd.Series(np.nan, index=df.index)
+            channels[name] = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float32)
+        valid = t != np.iinfo(np.int64).min  # NaT
+        if not valid.all():
+            t = t[valid]
+            channels = {name: values[valid] for name, values in channels.items()}
+        return cls(t, channels, df.attrs.get("stored_at"))
+
+    def __len__(self):
+        return len(self.t)
+
+    def window(self, start_ns=None, end_ns=None):
+        """Slice of samples with start_ns <= t < end_ns (open ends when None)."""
+        lo = 0 if start_ns is None else int(np.searchsorted(self.t, start_ns, side="left"))
+        hi = len(self.t) if end_ns is None else int(np.searchsorted(self.t, end_ns, side="left"))
+        return slice(lo, max(lo, hi))
+
+
+def lap_windows(laps):
+    """
+    {lap_number: (start_ns, end_ns or None)} from a driver's laps
+    (``lap_number``, ``date_start``, optionally ``lap_duration``). A lap ends
+    where the next one starts; the last one after its duration (open if unknown).
+    """
+    if laps is None or laps.empty:
+        return {}
+    laps = laps.dropna(subset=["date_start"]).sort_values("lap_number")
+    starts = pd.to_datetime(laps["date_start"], utc=True, format="ISO8601").to_numpy(dtype="datetime64[ns]").view(np.int64)
+    numbers = laps["lap_number"].to_numpy()
+    durations = pd.to_numeric(laps["lap_duration"], errors="coerce").to_numpy() if "lap_duration" in laps \
+        else np.full(len(laps), np.nan)
+    windows = {}
+    for i, number in enumerate(numbers):
+        if i + 1 < len(numbers):
+            end = int(starts[i + 1])
+        elif durations[i] == durations[i]:
+            end = int(starts[i] + durations[i] * 1e9)
+        else:
+            end = None
+        windows[int(number)] = (int(starts[i]), end)
+    return windows
+
+
+def _first_per_bucket(mask, bucket):
+    """Index (into mask) of the first True of every bucket; ``bucket`` is ascending."""
+    hits = np.flatnonzero(mask)
+    owners = bucket[hits]
+    return hits[np.flatnonzero(np.diff(owners, prepend=-1))]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of ``n_out`` samples chosen by vectorized LTTB (first and last
+    sample always kept). ``x`` must be ascending. NaNs in ``y`` count as 0.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # n_out - 2 vedierok pokrývajúcich body 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[ends] - cy[starts]) / counts
+    prev_x = np.concatenate(([x[0]], avg_x[:-1]))
+    prev_y = np.concatenate(([y[0]], avg_y[:-1]))
+    next_x = np.concatenate((avg_x[1:], [x[-1]]))
+    next_y = np.concatenate((avg_y[1:], [y[-1]]))
+
+    # Plocha trojuholníka (prev, bod, next) pre všetky body naraz; np.repeat je rýchlejší než indexovanie
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    px, py = np.repeat(prev_x, counts), np.repeat(prev_y, counts)
+    area = np.abs((px - np.repeat(next_x, counts)) * (y[1:-1] - py)
+                  - (px - x[1:-1]) * (np.repeat(next_y, counts) - py))
+    best = np.maximum.reduceat(area, starts - 1)
+    chosen = 1 + _first_per_bucket(area == np.repeat(best, counts), bucket)
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def minmax_indices(y, n_out):
+    """Indices of the minimum and maximum of each of ``n_out // 2`` equal buckets (plus both ends)."""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n_buckets = n_out // 2
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(n_buckets), counts)
+    lows = _first_per_bucket(y == np.repeat(np.minimum.reduceat(y, starts), counts), bucket)
+    highs = _first_per_bucket(y == np.repeat(np.maximum.reduceat(y, starts), counts), bucket)
+    return np.unique(np.concatenate(([0], lows, highs, [n - 1])))
+
+
+def downsample(t, channels, points=DEFAULT_POINTS, method="lttb"):
+    """
+    Shared sample indices for all ``channels`` ({name: array}) so that the
+    result has at most ``points`` samples: the union of each channel's own
+    selection with a ``points // len(channels)`` budget.
+    """
+    n = len(t)
+    if n <= points or not channels:
+        return np.arange(n)
+    budget = max(4, points // len(channels))
+    x = (t - t[0]) / 1e9
+    selections = []
+    for values in channels.values():
+        if method == "minmax":
+            selections.append(minmax_indices(values, budget))
+        else:
+            selections.append(lttb_indices(x, values, budget))
+    return np.unique(np.concatenate(selections))
+
+
+def fetch_chunked(fetch, start, end, chunk=timedelta(minutes=15), workers=4):
+    """
+    Records between ``start`` and ``end`` (aware datetimes) fetched in
+    windows of ``chunk``: ``fetch(filters)`` gets OpenF1 filters
+    [("date", ">=", a), ("date", "<", b)] and returns a list of records.
+    Without a time range everything is fetched in one request.
+    """
+    if start is None or end is None or end <= start:
+        return list(fetch([]))
+    bounds = []
+    a = start
+    while a < end:
+        b = min(a + chunk, end)
+        bounds.append((a, b))
+        a = b
+    filters = [[("date", ">=", a.isoformat()), ("date", "<", b.isoformat())] for a, b in bounds]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(filters)))) as pool:
+        chunks = list(pool.map(fetch, filters))
+    return [record for part in chunks for record in part]
+
+
+def encode_values(values, decimals=3):
+    """Float array -> JSON-ready list (rounded, NaN -> None)."""
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    if np.isnan(values).any():
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
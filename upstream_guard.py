@@ -0,0 +1,398 @@
+"""
+Guard layer in front of the OpenF1 client: request coalescing, a token-bucket
+budget per endpoint and a circuit breaker with stale fallback.
+
+Every upstream GET passes through :class:`UpstreamGuard`:
+
+1. **Coalescing** - identical requests (same endpoint and query) that are in
+   flight at the same time share one upstream call; the others wait for its
+   result (bounded by the read timeout).
+2. **Circuit breaker** - after ``failure_threshold`` consecutive failures
+   (connection errors, timeouts, 429 and 5xx after the client's retries) an
+   endpoint's circuit opens for ``reset_timeout`` seconds and calls are not
+   sent at all; then one trial call is let through (half-open).
+3. **Token bucket** - at most ``rate`` calls per second per endpoint with
+   bursts of ``burst``; a call waits for a token for up to ``max_wait``
+   seconds, otherwise it is throttled locally instead of provoking a 429.
+
+When a call is short-circuited, throttled or fails, the last good response
+for the same request is served instead (kept in a byte-bounded LRU) and
+marked stale: the response gets an ``X-OpenF1-Stale: <age in seconds>``
+header and the age is recorded in :data:`stale_marks` so the app can flag
+its own response. Without a stored response the caller gets
+:class:`UpstreamUnavailable`, a ``requests`` ConnectionError.
+
+Buckets and breakers are per worker process.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+STALE_HEADER = "X-OpenF1-Stale"
+
+# Vek (v sekundách) zastaraných odpovedí použitých počas aktuálneho requestu; app ho nastaví na [] pred requestom
+stale_marks = contextvars.ContextVar("openf1_stale_marks", default=None)
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """OpenF1 call not made or failed and no previous response to fall back to."""
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` stored. Thread-safe."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """
+        Takes a token, possibly one that is yet to come: returns how long the
+        caller must wait before using it, or None (nothing taken) if that
+        would be longer than ``max_wait``.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures -> half-open after ``reset_timeout``."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.opened = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Whether a call may go upstream now (in half-open state only one trial call at a time)."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._clock() - self.opened_at < self.reset_timeout or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def release(self):
+        """An allowed call was not made after all (throttled, cancelled) - lets the next one be the trial."""
+        with self._lock:
+            self.trial = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial:
+                    self.opened += 1
+                self.opened_at = self._clock()
+            self.trial = False
+
+
+class StaleCache:
+    """LRU of the last good response body (and headers) per request key, bounded by bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, clock=time.time):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    def put(self, key, content, headers):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self._entries[key] = (content, headers, self._clock())
+            self.bytes += len(content)
+            while self.bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def get(self, key):
+        """(content, headers, age in seconds) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        content, headers, stored = entry
+        return content, headers, self._clock() - stored
+
+
+class EndpointGuardStats:
+    __slots__ = ("requests", "upstream_calls", "coalesced", "stale_served", "throttled", "waited_seconds",
+                 "failures", "unavailable")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["waited_seconds"] = round(self.waited_seconds, 3)
+        # Ušetrené volania: zdieľané rozbehnuté requesty + odpovede zo zásoby bez volania
+        data["saved_calls"] = self.requests - self.upstream_calls
+        return data
+
+
+def is_upstream_failure(error):
+    """Connection errors, timeouts, 429 and 5xx count against the breaker; other 4xx do not."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class UpstreamGuard:
+    """See the module docstring. ``limits`` maps endpoint -> (rate, burst) overriding the default."""
+
+    def __init__(self, rate=5.0, burst=10, limits=None, max_wait=2.0, failure_threshold=5, reset_timeout=30.0,
+                 stale_bytes=64 * 1024 * 1024, wait_timeout=20.0, listener=None):
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.wait_timeout = wait_timeout
+        # listener(endpoint, counter name, value) - napr. export do Promethea
+        self.listener = listener
+        self.stale = StaleCache(stale_bytes)
+        self._buckets = {}
+        self._breakers = {}
+        self._stats = {}
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ, listener=None):
+        """OPENF1_RATE, OPENF1_BURST, OPENF1_RATE_LIMITS ("laps=2:5,position=4:8"), OPENF1_RATE_MAX_WAIT,
+        OPENF1_BREAKER_THRESHOLD, OPENF1_BREAKER_RESET, OPENF1_STALE_CACHE_MB."""
+        limits = {}
+        for item in environ.get("OPENF1_RATE_LIMITS", "").split(","):
+            if "=" in item:
+                endpoint, _, spec = item.partition("=")
+                rate, _, burst = spec.partition(":")
+                limits[endpoint.strip()] = (float(rate), float(burst or rate))
+        return cls(
+            rate=float(environ.get("OPENF1_RATE", 5)),
+            burst=float(environ.get("OPENF1_BURST", 10)),
+            limits=limits,
+            max_wait=float(environ.get("OPENF1_RATE_MAX_WAIT", 2)),
+            failure_threshold=int(environ.get("OPENF1_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(environ.get("OPENF1_BREAKER_RESET", 30)),
+            stale_bytes=int(float(environ.get("OPENF1_STALE_CACHE_MB", 64)) * 1024 * 1024),
+            listener=listener,
+        )
+
+    def _endpoint(self, endpoint):
+        """(bucket, breaker, stats) of an endpoint, created on first use."""
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                rate, burst = self.limits.get(endpoint, (self.rate, self.burst))
+                bucket = self._buckets[endpoint] = TokenBucket(rate, burst)
+                self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._stats[endpoint] = EndpointGuardStats()
+            return bucket, self._breakers[endpoint], self._stats[endpoint]
+
+    def _count(self, endpoint, name, value=1):
+        with self._lock:
+            stats = self._stats[endpoint]
+            setattr(stats, name, getattr(stats, name) + value)
+        if self.listener is not None:
+            self.listener(endpoint, name, value)
+
+    def _fallback(self, endpoint, key, make_response, error):
+        """The last good response for ``key`` marked stale, else raises UpstreamUnavailable from ``error``."""
+        entry = self.stale.get(key)
+        if entry is None:
+            self._count(endpoint, "unavailable")
+            if isinstance(error, UpstreamUnavailable):
+                raise error
+            raise UpstreamUnavailable(f"OpenF1 unavailable for {key}: {error}") from error
+        content, headers, age = entry
+        self._count(endpoint, "stale_served")
+        marks = stale_marks.get()
+        if marks is not None:
+            marks.append(age)
+        return make_response(content, {**headers, STALE_HEADER: str(int(age))})
+
+    def _admit(self, endpoint, key):
+        """Breaker and bucket checks before a call: (wait seconds, None) or (None, reason error)."""
+        bucket, breaker, _ = self._endpoint(endpoint)
+        if not breaker.allow():
+            return None, UpstreamUnavailable(f"OpenF1 circuit open for /{endpoint}")
+        wait = bucket.reserve(self.max_wait)
+        if wait is None:
+            # Skúšobné volanie v half-open stave sa neuskutočnilo, inak by breaker zostal zaseknutý
+            breaker.release()
+            self._count(endpoint, "throttled")
+            return None, UpstreamUnavailable(f"OpenF1 rate budget of /{endpoint} exhausted")
+        if wait:
+            self._count(endpoint, "waited_seconds", wait)
+        return wait, None
+
+    def _settle(self, endpoint, key, response=None, error=None):
+        """Breaker bookkeeping after a call; stores good responses. Returns whether to fall back."""
+        _, breaker, _ = self._endpoint(endpoint)
+        if error is None:
+            breaker.success()
+            self.stale.put(key, response.content, {"Content-Type": response.headers.get("Content-Type", "")})
+            return False
+        if is_upstream_failure(error):
+            self._count(endpoint, "failures")
+            breaker.failure()
+            return True
+        breaker.success()  # 4xx okrem 429 - upstream funguje, chyba je v requeste
+        return False
+
+    def call(self, endpoint, key, fetch, make_response):
+        """
+        Guarded ``fetch()`` (a sync GET returning a response with ``.content``
+        and ``.headers``); ``make_response(content, headers)`` builds the stale substitute.
+        """
+        self._endpoint(endpoint)
+        self._count(endpoint, "requests")
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self._count(endpoint, "coalesced")
+            if not flight.done.wait(self.wait_timeout):
+                return self._fallback(endpoint, key, make_response,
+                                      UpstreamUnavailable(f"Timed out waiting for a shared call to {key}"))
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call(endpoint, key, fetch, make_response)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _call(self, endpoint, key, fetch, make_response):
+        wait, refused = self._admit(endpoint, key)
+        if refused is not None:
+            return self._fallback(endpoint, key, make_response, refused)
+        if wait:
+            time.sleep(wait)
+        self._count(endpoint, "upstream_calls")
+        try:
+            response = fetch()
+        except Exception as e:
+            if self._settle(endpoint, key, error=e):
+                return self._fallback(endpoint, key, make_response, e)
+            raise
+        self._settle(endpoint, key, response=response)
+        return response
+
+    async def acall(self, endpoint, key, fetch, make_response):
+        """Async :meth:`call`: ``fetch`` is a coroutine function; coalesces per event loop."""
+        self._endpoint(endpoint)
+        self._count(endpoint, "requests")
+        flights = self._async_flights.setdefault(asyncio.get_running_loop(), {})
+        future = flights.get(key)
+        if future is not None:
+            self._count(endpoint, "coalesced")
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+            except asyncio.TimeoutError:
+                return self._fallback(endpoint, key, make_response,
+                                      UpstreamUnavailable(f"Timed out waiting for a shared call to {key}"))
+
+        future = flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._acall(endpoint, key, fetch, make_response)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # čakatelia si výnimku prevezmú, nie je "never retrieved"
+            raise
+        finally:
+            flights.pop(key, None)
+
+    async def _acall(self, endpoint, key, fetch, make_response):
+        wait, refused = self._admit(endpoint, key)
+        if refused is not None:
+            return self._fallback(endpoint, key, make_response, refused)
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            self._count(endpoint, "upstream_calls")
+            response = await fetch()
+        except asyncio.CancelledError:
+            _, breaker, _ = self._endpoint(endpoint)
+            breaker.release()
+            raise
+        except Exception as e:
+            if self._settle(endpoint, key, error=e):
+                return self._fallback(endpoint, key, make_response, e)
+            raise
+        self._settle(endpoint, key, response=response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: s.as_dict() for endpoint, s in self._stats.items()}
+            for endpoint, breaker in self._breakers.items():
+                endpoints[endpoint]["circuit"] = breaker.state
+                endpoints[endpoint]["circuit_opened"] = breaker.opened
+        totals = {name: sum(e[name] for e in endpoints.values())
+                  for name in ("requests", "upstream_calls", "saved_calls", "coalesced", "stale_served", "throttled")}
+        return {"endpoints": endpoints, "totals": totals, "stale_cache_bytes": self.stale.bytes}
@@ -0,0 +1,220 @@
+"""
+Background cache warm-up for the current race weekend.
+
+:class:`WarmupScheduler` watches the session catalogue and, once a session of
+the current meeting has ended (plus a settle delay, so OpenF1 has time to
+publish the final data), runs a fixed set of warm-up tasks for it: drivers,
+laps, radio, race control, standings. Every task goes through the same cached
+getters the routes use, so the data lands on disk and in the in-memory LRU
+before the first visitor asks for it; a copy the getters cached while the
+session was still running is fetched again (see ``final_dataset`` in app).
+
+Tasks are grouped into stages (later stages may rely on earlier ones, e.g.
+laps need the drivers); the tasks of one stage run on a small thread pool, so
+upstream concurrency stays bounded no matter how many sessions end at once.
+Failed tasks are retried on later checks, up to ``max_attempts`` times.
+
+The same machinery is used synchronously by the ``flask warm-cache`` CLI
+command (see :meth:`WarmupScheduler.warm`).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    """OpenF1 ISO 8601 date -> aware datetime (UTC), or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def current_weekend(sessions):
+    """Sessions of the meeting the latest session belongs to (catalogue order: newest first)."""
+    if not sessions:
+        return []
+    meeting_key = sessions[0].get("meeting_key")
+    if meeting_key is None:
+        return sessions[:1]
+    return [s for s in sessions if s.get("meeting_key") == meeting_key]
+
+
+class SessionStatus:
+    """Progress of warming one session."""
+
+    def __init__(self, session):
+        self.session = session
+        self.state = "pending"
+        self.attempts = 0
+        self.tasks = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def as_dict(self):
+        return {
+            "session_name": self.session.get("session_name"),
+            "date_end": self.session.get("date_end"),
+            "state": self.state,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tasks": {name: dict(task) for name, task in self.tasks.items()},
+        }
+
+
+class WarmupScheduler:
+    """
+    ``list_sessions()`` returns the session catalogue (newest first) and
+    ``stages`` is a list of {task_name: fn(session)} dicts run in order. A task
+    returns a short detail for the status page (e.g. a row count) or raises.
+    """
+
+    def __init__(self, list_sessions, stages, interval=300.0, settle=600.0, workers=2,
+                 max_attempts=3, clock=None):
+        self.list_sessions = list_sessions
+        self.stages = stages
+        self.interval = interval
+        self.settle = settle
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._clock = clock or (lambda: datetime.now(timezone.utc))
+        self._sessions = {}
+        self._lock = threading.Lock()  # chráni _sessions a stav
+        self._run_lock = threading.Lock()  # jedno zahrievanie naraz (vlákno aj CLI)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.checks = 0
+        self.last_check = None
+        self.last_error = None
+
+    # --- výber sessions ---
+
+    def due_sessions(self):
+        """Ended sessions of the current weekend that still need warming."""
+        now = self._clock()
+        due = []
+        for session in current_weekend(self.list_sessions()):
+            ended = parse_date(session.get("date_end"))
+            if ended is None or ended + timedelta(seconds=self.settle) > now:
+                continue
+            with self._lock:
+                status = self._sessions.get(session.get("session_key"))
+            if status is not None and (status.state == "done" or status.attempts >= self.max_attempts):
+                continue
+            due.append(session)
+        # Najstaršie najprv - kvalifikácia pred pretekmi
+        return sorted(due, key=lambda s: s.get("date_end") or "")
+
+    # --- samotné zahrievanie ---
+
+    def _status(self, session):
+        key = session.get("session_key")
+        with self._lock:
+            status = self._sessions.get(key)
+            if status is None:
+                status = self._sessions[key] = SessionStatus(session)
+            return status
+
+    def _run_task(self, status, name, fn):
+        task = status.tasks[name]
+        task.update(state="running", error=None)
+        started = time.perf_counter()
+        try:
+            task["detail"] = fn(status.session)
+            task["state"] = "done"
+        except Exception as e:
+            logger.exception("Warm-up task %s for session %s failed: %s", name, status.session.get("session_key"), e)
+            task.update(state="failed", error=str(e))
+        task["seconds"] = round(time.perf_counter() - started, 3)
+
+    def warm_session(self, session, force=False):
+        """Runs all pending (or, with ``force``, all) tasks for one session; returns its status dict."""
+        status = self._status(session)
+        with self._run_lock:
+            status.session = session
+            status.state = "running"
+            status.attempts += 1
+            status.started_at = self._clock().isoformat()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warmup") as pool:
+                for stage in self.stages:
+                    jobs = []
+                    for name, fn in stage.items():
+                        with self._lock:
+                            task = status.tasks.setdefault(name, {"state": "pending"})
+                        if task["state"] == "done" and not force:
+                            continue
+                        jobs.append(pool.submit(self._run_task, status, name, fn))
+                    for job in jobs:
+                        job.result()
+            failed = any(t["state"] == "failed" for t in status.tasks.values())
+            status.state = "failed" if failed else "done"
+            status.finished_at = self._clock().isoformat()
+        return status.as_dict()
+
+    def warm(self, sessions=None, force=False):
+        """
+        Warms the given sessions (default: every ended session of the current
+        weekend) synchronously. Returns {session_key: status dict}.
+        """
+        if sessions is None:
+            sessions = self.due_sessions()
+        return {s.get("session_key"): self.warm_session(s, force=force) for s in sessions}
+
+    def check(self):
+        """One scheduler pass: warms whatever became due since the last pass."""
+        try:
+            self.warm()
+            self.last_error = None
+        except Exception as e:
+            logger.exception("Warm-up check failed: %s", e)
+            self.last_error = str(e)
+        self.checks += 1
+        self.last_check = self._clock().isoformat()
+
+    # --- vlákno na pozadí ---
+
+    def start(self):
+        """Starts the background thread (idempotent; restarts it in a forked worker)."""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="warmup-scheduler")
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
+    def status(self):
+        with self._lock:
+            sessions = {str(k): s.as_dict() for k, s in self._sessions.items()}
+            running = self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+        return {
+            "running": running,
+            "interval": self.interval,
+            "settle": self.settle,
+            "workers": self.workers,
+            "checks": self.checks,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+            "sessions": sessions,
+        }